@@ -1,61 +1,77 @@
 import os
 import json
-import re
-import fitz  # PyMuPDF
-from typing import Optional, Dict, Any
+from typing import Dict, Any, List
 
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 
+from services import pdf_utils
+from services.chunker import count_measurements
+from services.section_index import SectionIndex
+from services.json_repair import parse_json
+from services.llm_cache import generate_json
+from services.llm_client import get_client
+from services.prompt_builder import get_template
+
 # -------------------------------------------------
 # ENV
 # -------------------------------------------------
 load_dotenv()
 
 # -------------------------------------------------
-# GEMINI CLIENT
+# GEMINI MODEL (client: services.llm_client)
 # -------------------------------------------------
-try:
-    client = genai.Client()
-    GEMINI_MODEL = "gemini-2.5-flash"   # ✅ WORKING MODEL
-except Exception as e:
-    raise RuntimeError("Failed to initialize Gemini client. Check API key.") from e
+GEMINI_MODEL = "gemini-2.5-flash"   # ✅ WORKING MODEL
+
+EXTRACTION_PROMPT = """
+{{INSTRUCTIONS}}
+
+JSON Schema (STRICTLY FOLLOW):
+{{SCHEMA}}
 
+RFP DOCUMENT TEXT:
+------------------
+{{RFP_TEXT}}
+------------------
+"""
 
 # -------------------------------------------------
-# PDF PROCESSOR
+# RELEVANCE FILTER
 # -------------------------------------------------
-class PDFProcessor:
-    @staticmethod
-    def extract_text(pdf_path: str) -> str:
-        text = ""
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                text += page.get_text("text") + "\n"
-        return text.strip()
+RELEVANCE_FILTER = os.getenv("RFP_EXTRACT_RELEVANCE_FILTER", "1").lower() not in ("0", "false", "off")
+# Documents at or below this size are sent whole
+FULL_TEXT_TOKEN_LIMIT = int(os.getenv("RFP_EXTRACT_FULL_TEXT_TOKENS", "8000"))
+# Total kept for larger documents, as a share of the document: sections
+# are added best match first until it is spent
+RELEVANCE_BUDGET_SHARE = float(os.getenv("RFP_EXTRACT_BUDGET_SHARE", "0.7"))
+# Sections with at least this many "<number> <unit>" values (scope
+# quantities, spec tables) are always kept, and count against the budget
+MIN_MEASUREMENTS = int(os.getenv("RFP_EXTRACT_MIN_MEASUREMENTS", "3"))
+
+# Extra query terms per top-level schema key (schema key names are added too)
+FIELD_GROUP_HINTS = {
+    "rfp_metadata": "tender title nit number issued authority date submission deadline "
+                    "bid due opening pre-bid meeting category estimated value cost",
+    "scope_of_supply": "scope supply item description quantity specification cable voltage "
+                       "conductor insulation cores sqmm armour pair diameter resistance "
+                       "capacitance sheath standard",
+    "eligibility_criteria": "eligibility qualification experience turnover bidder certificate "
+                            "iso documents required",
+    "terms_and_conditions": "delivery payment terms penalty liquidated damages warranty "
+                            "guarantee contract duration period",
+    "test_and_quality_requirements": "test testing inspection quality acceptance type routine "
+                                     "sample laboratory lab",
+    "attachments": "annexure attachment enclosure appendix format",
+}
 
 
 # -------------------------------------------------
-# JSON FIXER
+# PDF PROCESSOR
 # -------------------------------------------------
-class JSONFixer:
-    @staticmethod
-    def try_parse(text: str) -> Optional[Dict[str, Any]]:
-        try:
-            return json.loads(text)
-        except Exception:
-            return None
-
+class PDFProcessor:
     @staticmethod
-    def extract_json(text: str) -> Optional[Dict[str, Any]]:
-        match = re.search(r"\{[\s\S]*\}", text)
-        if match:
-            try:
-                return json.loads(match.group(0))
-            except Exception:
-                return None
-        return None
+    def extract_text(pdf_path: str) -> str:
+        return pdf_utils.extract_text(pdf_path)
 
 
 # -------------------------------------------------
@@ -67,42 +83,105 @@ class ExtractorAgent:
         self.schema = schema
 
     def build_prompt(self, rfp_text: str) -> str:
-        return f"""
-{self.prompt_template}
+        return get_template(
+            "extract_rfp",
+            EXTRACTION_PROMPT,
+            INSTRUCTIONS=self.prompt_template,
+            SCHEMA=self.schema,
+        ).render(RFP_TEXT=rfp_text)
+
+    def field_group_queries(self) -> Dict[str, str]:
+        def key_words(node) -> List[str]:
+            if isinstance(node, dict):
+                words = []
+                for key, value in node.items():
+                    words.extend(key.split("_"))
+                    words.extend(key_words(value))
+                return words
+            if isinstance(node, list):
+                return [w for item in node for w in key_words(item)]
+            return []
+
+        queries = {}
+        for group, node in self.schema.items():
+            queries[group] = " ".join(group.split("_") + key_words(node)) + " " + FIELD_GROUP_HINTS.get(group, "")
+            # One query per field too ("warranty", "payment terms"), so a
+            # field in its own short clause is not outranked by its group
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    queries[f"{group}.{key}"] = " ".join(key.split("_") + key_words(value))
+        return queries
 
-JSON Schema (STRICTLY FOLLOW):
-{json.dumps(self.schema, indent=2)}
+    @staticmethod
+    def relevance_budget(full_tokens: int) -> int:
+        return int(full_tokens * RELEVANCE_BUDGET_SHARE)
+
+    def select_relevant_text(self, pages: List[Dict[str, Any]]) -> str:
+        """
+        Keep only the sections that match a schema field group
+        (BM25 over local sections). Small documents pass through,
+        and so does everything with RFP_EXTRACT_RELEVANCE_FILTER=0.
+        """
+        if not RELEVANCE_FILTER:
+            return "\n".join(page["text"] for page in pages).strip()
+
+        index = SectionIndex.from_pages(pages)
+        full_tokens = index.total_tokens
+
+        if full_tokens <= FULL_TEXT_TOKEN_LIMIT:
+            return "\n".join(page["text"] for page in pages).strip()
+
+        sections = index.select(
+            self.field_group_queries(),
+            token_budget=self.relevance_budget(full_tokens),
+            required=[
+                section["section_id"] for section in index.sections
+                if count_measurements(section["text"]) >= MIN_MEASUREMENTS
+            ],
+        )
+        kept_tokens = sum(section["tokens"] for section in sections)
+        saved_pct = round(100 * (1 - kept_tokens / full_tokens), 1)
+        print(
+            f"📉 Relevance filter: {len(sections)}/{len(index.sections)} sections, "
+            f"~{kept_tokens}/{full_tokens} tokens ({saved_pct}% saved)"
+        )
 
-RFP DOCUMENT TEXT:
-------------------
-{rfp_text}
-------------------
-"""
+        return "\n\n".join(
+            f"[page {section['page_number']}]\n{section['text']}"
+            for section in sections
+        )
 
     def extract(self, pdf_path: str) -> Dict[str, Any]:
         print("📄 Extracting PDF text...")
-        document_text = PDFProcessor.extract_text(pdf_path)
+        pages = list(pdf_utils.iter_pages(pdf_path))
+        return self.extract_pages(pages)
+
+    def extract_pages(self, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """LLM extraction from already-parsed pages (see pdf_utils.iter_pages)."""
+        document_text = self.select_relevant_text(pages)
 
         print("🧠 Building prompt...")
         prompt = self.build_prompt(document_text)
 
         print("🚀 Calling Gemini...")
-        response = client.models.generate_content(
+        parsed = generate_json(
+            client=get_client(),
             model=GEMINI_MODEL,
-            contents=[prompt],
+            prompt=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json",
                 system_instruction="You are an expert RFP parser. Respond ONLY with valid JSON."
-            )
+            ),
+            parse=self.parse_response,
+            expect=dict,
         )
+        print("📦 Gemini Output received")
 
-        raw_output = response.text
-        print("📦 Raw Gemini Output received")
-
-        parsed = JSONFixer.try_parse(raw_output)
-        if not parsed:
-            parsed = JSONFixer.extract_json(raw_output)
+        return parsed
 
+    @staticmethod
+    def parse_response(raw_output: str) -> Dict[str, Any]:
+        parsed = parse_json(raw_output, expect=dict)
         if not parsed:
             raise ValueError("Failed to parse JSON from Gemini response")
 
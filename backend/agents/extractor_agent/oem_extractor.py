@@ -1,14 +1,17 @@
+import contextvars
 import os
 import json
-import re
-import time
-import fitz  # PyMuPDF
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
 
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
-from google.genai.errors import ServerError
+
+from services import chunker, pdf_utils
+from services.json_repair import parse_json
+from services.llm_cache import generate_json
+from services.llm_client import get_client
+from services.prompt_builder import get_template
 
 # -------------------------------------------------
 # ENV
@@ -16,35 +19,56 @@ from google.genai.errors import ServerError
 load_dotenv()
 
 # -------------------------------------------------
-# GEMINI CLIENT
+# GEMINI MODEL (client: services.llm_client)
 # -------------------------------------------------
-client = genai.Client()
 GEMINI_MODEL = "gemini-2.5-flash"  # fast + stable
 
 # -------------------------------------------------
 # CONSTANTS
 # -------------------------------------------------
-MAX_CHARS_PER_CHUNK = 10_000
-MAX_RETRIES = 5
+MAX_TOKENS_PER_CHUNK = int(os.getenv("OEM_CHUNK_TOKEN_BUDGET", "6000"))
+CHUNK_OVERLAP_TOKENS = 200
+MAX_CONCURRENT_CHUNKS = int(os.getenv("OEM_EXTRACT_CONCURRENCY", "4"))
 TIMEOUT_SECONDS = 30
 
+OEM_EXTRACTION_PROMPT = """
+{{INSTRUCTIONS}}
+
+JSON SCHEMA (follow strictly):
+{{SCHEMA}}
+
+DOCUMENT TEXT:
+--------------
+{{DOCUMENT_TEXT}}
+--------------
+"""
+
 # -------------------------------------------------
 # PDF PROCESSOR
 # -------------------------------------------------
 class PDFProcessor:
     @staticmethod
     def extract_text(pdf_path: str) -> str:
-        text = ""
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                text += page.get_text("text") + "\n"
-        return text.strip()
+        return pdf_utils.extract_text(pdf_path)
 
     @staticmethod
     def chunk_text(text: str) -> List[str]:
+        return chunker.chunk_text(
+            text,
+            token_budget=MAX_TOKENS_PER_CHUNK,
+            overlap_tokens=CHUNK_OVERLAP_TOKENS
+        )
+
+    @staticmethod
+    def chunk_pdf(pdf_path: str) -> List[str]:
+        # Chunks are packed while pages are still being parsed
         return [
-            text[i:i + MAX_CHARS_PER_CHUNK]
-            for i in range(0, len(text), MAX_CHARS_PER_CHUNK)
+            chunk["text"]
+            for chunk in chunker.chunk_pages(
+                pdf_utils.iter_pages(pdf_path),
+                token_budget=MAX_TOKENS_PER_CHUNK,
+                overlap_tokens=CHUNK_OVERLAP_TOKENS
+            )
         ]
 
 
@@ -53,97 +77,95 @@ class PDFProcessor:
 # -------------------------------------------------
 class JSONFixer:
     @staticmethod
-    def extract_json(text: str) -> Optional[Dict[str, Any]]:
-        match = re.search(r"\{[\s\S]*\}", text)
-        if not match:
-            return None
-        try:
-            return json.loads(match.group(0))
-        except Exception:
-            return None
+    def parse_strict(text: str) -> Dict[str, Any]:
+        # Shared recovery parser (first balanced object, truncation repair)
+        parsed = parse_json(text, expect=dict)
+        if not parsed:
+            raise ValueError("Invalid JSON returned")
+        return parsed
 
 
 # -------------------------------------------------
-# GEMINI CALL WITH RETRY
+# GEMINI CALL (503 / 429 retries: services.rate_limiter)
 # -------------------------------------------------
 def call_gemini(prompt: str) -> Dict[str, Any]:
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=[prompt],
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    system_instruction=(
-                        "You are an expert OEM datasheet parser. "
-                        "Extract ONLY fields found in the text. "
-                        "Return VALID JSON ONLY."
-                    )
-                )
+    return generate_json(
+        client=get_client(),
+        model=GEMINI_MODEL,
+        prompt=prompt,
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            system_instruction=(
+                "You are an expert OEM datasheet parser. "
+                "Extract ONLY fields found in the text. "
+                "Return VALID JSON ONLY."
             )
-
-            parsed = JSONFixer.extract_json(response.text)
-            if not parsed:
-                raise ValueError("Invalid JSON returned")
-
-            return parsed
-
-        except ServerError as e:
-            if "503" in str(e) or "UNAVAILABLE" in str(e):
-                wait = 2 ** attempt
-                print(f"⚠️ Gemini overloaded. Retry in {wait}s...")
-                time.sleep(wait)
-            else:
-                raise
-
-
-    raise RuntimeError("Gemini failed after retries")
+        ),
+        parse=JSONFixer.parse_strict,
+        expect=dict,
+    )
 
 
 # -------------------------------------------------
 # EXTRACTOR AGENT
 # -------------------------------------------------
 class OEMExtractorAgent:
-    def __init__(self, prompt_template: str, schema: Dict[str, Any]):
+    def __init__(
+        self,
+        prompt_template: str,
+        schema: Dict[str, Any],
+        max_concurrency: int = MAX_CONCURRENT_CHUNKS
+    ):
         self.prompt_template = prompt_template
         self.schema = schema
+        # 1 = sequential (old behaviour), N = up to N chunks in flight
+        self.max_concurrency = max(1, max_concurrency)
 
     def build_prompt(self, text_chunk: str) -> str:
-        return f"""
-{self.prompt_template}
-
-JSON SCHEMA (follow strictly):
-{json.dumps(self.schema, indent=2)}
-
-DOCUMENT TEXT:
---------------
-{text_chunk}
---------------
-"""
+        return get_template(
+            "extract_oem",
+            OEM_EXTRACTION_PROMPT,
+            INSTRUCTIONS=self.prompt_template,
+            SCHEMA=self.schema,
+        ).render(DOCUMENT_TEXT=text_chunk)
 
     def extract(self, pdf_path: str) -> Dict[str, Any]:
-        print("📄 Extracting PDF text...")
-        full_text = PDFProcessor.extract_text(pdf_path)
+        print("📄 Extracting + chunking PDF text...")
+        chunks = PDFProcessor.chunk_pdf(pdf_path)
 
-        print("✂️ Chunking document...")
-        chunks = PDFProcessor.chunk_text(full_text)
+        partial_results = self.extract_chunks(chunks)
 
-        partial_results = []
+        print("🧠 Merging partial results...")
+        return self.merge_results(partial_results)
 
-        for idx, chunk in enumerate(chunks):
+    def extract_chunks(self, chunks: List[str]) -> List[Dict[str, Any]]:
+        """
+        Run call_gemini on every chunk with at most `max_concurrency`
+        requests in flight. Results keep chunk order, so merge_results
+        stays deterministic.
+        """
+        def process(idx: int) -> Dict[str, Any]:
             print(f"🚀 Processing chunk {idx+1}/{len(chunks)}")
-            prompt = self.build_prompt(chunk)
-            partial = call_gemini(prompt)
-            partial_results.append(partial)
+            return call_gemini(self.build_prompt(chunks[idx]))
 
-        print("🧠 Merging partial results...")
-        return self.merge_results(partial_results)
+        if self.max_concurrency == 1 or len(chunks) <= 1:
+            return [process(idx) for idx in range(len(chunks))]
+
+        workers = min(self.max_concurrency, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oem-chunk") as pool:
+            # Each chunk runs in a copy of the caller's context, so a
+            # truncated response still marks the calling pipeline stage
+            futures = [
+                pool.submit(contextvars.copy_context().run, process, idx)
+                for idx in range(len(chunks))
+            ]
+            return [future.result() for future in futures]
 
     def merge_results(self, partials: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Simple deterministic merge:
         - First non-None value wins
-        - Lists are merged uniquely
+        - Lists are merged uniquely, in chunk order
         """
         final = {}
 
@@ -153,9 +175,15 @@ DOCUMENT TEXT:
                     continue
 
                 if key not in final:
-                    final[key] = value
-                elif isinstance(value, list):
-                    final[key] = list(set(final[key]) | set(value))
+                    final[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list) and isinstance(final[key], list):
+                    # Ordered union: chunk order decides element order
+                    seen = {json.dumps(v, sort_keys=True) for v in final[key]}
+                    for v in value:
+                        marker = json.dumps(v, sort_keys=True)
+                        if marker not in seen:
+                            seen.add(marker)
+                            final[key].append(v)
 
         return final
 
@@ -1,13 +1,23 @@
 # agents/main_agent.py
+#
+# Run locally from backend/:  python -m agents.main_agent.main_agent
 
 import json
-import subprocess
-import sys
+import os
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
 
+from agents.technical_agent.spec_scorer import build_comparison_table
+from agents.technical_agent.technical_agent import TechnicalAgent
+from services import resources
+from services.catalog import get_catalog
+from services.llm_cache import generate_json
+from services.llm_client import get_client
+from services.pipeline_dag import PipelineDAG, Stage, hash_artifact
+from services.prompt_builder import get_template
+
 # -------------------------------------------------
 # PATH SETUP
 # -------------------------------------------------
@@ -20,87 +30,85 @@ OUTPUT_DIR = PROJECT_ROOT / "outputs"
 # -------------------------------------------------
 load_dotenv()
 
-client = genai.Client()
 MODEL = "gemini-2.5-flash-lite"
 
+# Write intermediate JSON artifacts to outputs/ (debugging only;
+# concurrent runs overwrite each other's files)
+DEBUG_ARTIFACTS = os.getenv("RFP_DEBUG_ARTIFACTS", "0").lower() in ("1", "true", "on")
+
+# Stream the spec normalization response: each normalized spec is
+# enforced and scored against the catalog while the rest is generated
+STREAM_SPECS = os.getenv("RFP_LLM_STREAM", "0").lower() in ("1", "true", "on")
+
 
 # -------------------------------------------------
 # MAIN AGENT (ORCHESTRATOR)
 # -------------------------------------------------
 class MainAgent:
-    def __init__(self):
-        self.client = client
+    def __init__(self, debug_artifacts: bool = DEBUG_ARTIFACTS, client=None):
+        # Shared process-wide Gemini client (pooled connections)
+        self.client = client or get_client()
         self.model = MODEL
+        self.debug_artifacts = debug_artifacts
 
-        # ---- Prompts ----
-        with open(PROJECT_ROOT / "prompts" / "technical_summary_prompt.txt", encoding="utf-8") as f:
-            self.technical_prompt = f.read()
-
-        with open(PROJECT_ROOT / "prompts" / "pricing_summary_prompt.txt", encoding="utf-8") as f:
-            self.pricing_prompt = f.read()
+        # ---- Technical agent (in-process, shares the Gemini client) ----
+        self.technical_agent = TechnicalAgent(client=self.client)
 
-        # ---- Schemas ----
-        with open(PROJECT_ROOT / "schemas" / "technical_summary_schema.json", encoding="utf-8") as f:
-            self.technical_schema = json.load(f)
+        # ---- Prompts (cached in memory, re-read when edited) ----
+        self.technical_prompt = resources.prompt("technical_summary_prompt.txt")
+        self.pricing_prompt = resources.prompt("pricing_summary_prompt.txt")
 
-        with open(PROJECT_ROOT / "schemas" / "pricing_summary_schema.json", encoding="utf-8") as f:
-            self.pricing_schema = json.load(f)
+        # ---- Schemas (shared, read-only) ----
+        self.technical_schema = resources.schema("technical_summary_schema.json")
+        self.pricing_schema = resources.schema("pricing_summary_schema.json")
+        self.scope_schema = resources.schema("scope_of_supply_schema.json")
 
     # -------------------------------------------------
     # STEP 1: GENERATE TECHNICAL SUMMARY
     # -------------------------------------------------
     def generate_technical_summary(self, extracted_rfp_json: dict) -> dict:
-        prompt = (
-            self.technical_prompt
-            .replace(
-                "{{TECHNICAL_SUMMARY_SCHEMA}}",
-                json.dumps(self.technical_schema, indent=2)
-            )
-            .replace(
-                "{{EXTRACTED_RFP_JSON}}",
-                json.dumps(extracted_rfp_json, indent=2)
-            )
-        )
-
-        response = self.client.models.generate_content(
+        prompt = get_template(
+            "technical_summary",
+            self.technical_prompt,
+            TECHNICAL_SUMMARY_SCHEMA=self.technical_schema,
+        ).render(EXTRACTED_RFP_JSON=extracted_rfp_json)
+
+        return generate_json(
+            client=self.client,
             model=self.model,
-            contents=[prompt],
+            prompt=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
             )
         )
 
-        return json.loads(response.text)
-
     # -------------------------------------------------
-    # STEP 2: RUN EXTERNAL TECHNICAL AGENT (BLOCKING)
+    # STEP 2: RUN TECHNICAL AGENT (IN-PROCESS)
     # -------------------------------------------------
-    def run_external_technical_agent(self) -> dict:
-        tech_agent_path = PROJECT_ROOT/ "agents" / "technical_agent" / "technical_agent.py"
-        output_path = OUTPUT_DIR / "technical_agent_output.json"
-        
-        if not tech_agent_path.exists():
-            raise FileNotFoundError("❌ technical_agent/technical_agent.py not found")
-
-        # Run the external script (BLOCKING)
-        result = subprocess.run(
-                [sys.executable, str(tech_agent_path)],
-                cwd=str(PROJECT_ROOT),
-                text=True
+    def run_technical_agent(
+        self,
+        extracted_rfp_json: dict,
+        technical_summary_json: dict
+    ) -> dict:
+        # Current catalog snapshot (loaded once, hot-reloaded on change)
+        catalog = get_catalog()
+
+        return self.technical_agent.run(
+            extracted_rfp=extracted_rfp_json,
+            technical_summary=technical_summary_json,
+            scope_schema=self.scope_schema,
+            oem_repo=catalog.normalized,
+            engine=catalog.engine,
+            recommender=catalog.recommender,
         )
 
+    def _write_debug_artifact(self, filename: str, data) -> None:
+        if not self.debug_artifacts:
+            return
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        with open(OUTPUT_DIR / filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
 
-        if result.returncode != 0:
-            print("STDOUT:\n", result.stdout)
-            print("STDERR:\n", result.stderr)
-            raise RuntimeError("❌ Technical agent execution failed")
-
-        if not output_path.exists():
-            raise RuntimeError("❌ technical_agent_output.json not generated")
-
-        with open(output_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-        
     # -------------------------------------------------
     # STEP 3: GENERATE PRICING SUMMARY
     # -------------------------------------------------
@@ -110,60 +118,290 @@ class MainAgent:
         technical_agent_output_json: dict
     ) -> dict:
 
-        prompt = (
-            self.pricing_prompt
-            .replace(
-                "{{PRICING_SUMMARY_SCHEMA}}",
-                json.dumps(self.pricing_schema, indent=2)
-            )
-            .replace(
-                "{{EXTRACTED_RFP_JSON}}",
-                json.dumps(extracted_rfp_json, indent=2)
-            )
-            .replace(
-                "{{TECHNICAL_AGENT_OUTPUT_JSON}}",
-                json.dumps(technical_agent_output_json, indent=2)
-            )
+        prompt = get_template(
+            "pricing_summary",
+            self.pricing_prompt,
+            PRICING_SUMMARY_SCHEMA=self.pricing_schema,
+        ).render(
+            EXTRACTED_RFP_JSON=extracted_rfp_json,
+            TECHNICAL_AGENT_OUTPUT_JSON=technical_agent_output_json,
         )
 
-        response = self.client.models.generate_content(
+        return generate_json(
+            client=self.client,
             model=self.model,
-            contents=[prompt],
+            prompt=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
             )
         )
 
-        return json.loads(response.text)
-
     # -------------------------------------------------
     # FULL PIPELINE
     # -------------------------------------------------
-    def run_pipeline(self, extracted_rfp_json: dict) -> dict:
-        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-        # 1. Technical summary
-        technical_summary = self.generate_technical_summary(extracted_rfp_json)
+    def run_pipeline(self, extracted_rfp_json: dict, on_stage=None) -> dict:
+        # Same stage DAG as the API, starting from an extracted RFP:
+        # spec normalization runs alongside summary -> scope of supply
+        dag = build_rfp_dag(self, extractor=None, catalog=get_catalog())
+        artifacts = dag.run({"extracted_rfp": extracted_rfp_json}, on_stage=on_stage)
 
-        with open(OUTPUT_DIR / "technical_summary.json", "w", encoding="utf-8") as f:
-            json.dump(technical_summary, f, indent=2)
-
-        # 2. External technical agent (BLOCKING)
-        technical_agent_output = self.run_external_technical_agent()
-
-        # 3. Pricing summary
-        pricing_summary = self.generate_pricing_summary(
-            extracted_rfp_json,
-            technical_agent_output
-        )
+        self._write_debug_artifact("technical_summary.json", artifacts["technical_summary"])
+        self._write_debug_artifact("technical_agent_output.json", artifacts["technical_agent_output"])
 
         return {
-            "technical_summary": technical_summary,
-            "technical_agent_output": technical_agent_output,
-            "pricing_summary": pricing_summary
+            "technical_summary": artifacts["technical_summary"],
+            "technical_agent_output": artifacts["technical_agent_output"],
+            "pricing_summary": artifacts["pricing_summary"]
         }
 
 
+# -------------------------------------------------
+# PDF -> FULL PIPELINE (used by the API)
+# -------------------------------------------------
+def build_extractor():
+    """ExtractorAgent with the project's extraction prompt + schema."""
+    from agents.extractor_agent.extractor_agent import ExtractorAgent
+
+    return ExtractorAgent(
+        prompt_template=resources.prompt("extractor_prompt.txt"),
+        schema=resources.schema("extraction_schema.json")
+    )
+
+
+def finalize_results(extracted_rfp: dict, results: dict) -> dict:
+    """Add the extraction-level keys run_pipeline callers expect."""
+    results["extracted_rfp"] = extracted_rfp
+    results["rfp_metadata"] = extracted_rfp.get("rfp_metadata")
+    results["scope_of_supply_summary"] = results["technical_agent_output"]["scope_of_supply_summary"]
+    return results
+
+
+def build_rfp_dag(
+    agent: Optional["MainAgent"],
+    extractor,
+    catalog,
+    stream_specs: bool = STREAM_SPECS,
+) -> PipelineDAG:
+    """
+    The RFP pipeline as fingerprinted stages (see services.pipeline_dag).
+    Each stage names the code modules and prompt/schema files it
+    depends on; `catalog` is the OEM catalog snapshot used for scoring.
+    With `stream_specs`, normalized specs are enforced and scored as
+    they stream in (TechnicalAgent.SpecStream), same outputs.
+
+    `agent=None` (and `extractor=None`) builds a DAG that is only
+    fingerprinted, never run: no agents, no Gemini client.
+
+    Dependencies (independent branches run concurrently):
+        pdf -> extracted_rfp
+        extracted_rfp -> technical_summary -> scope_of_supply
+        extracted_rfp -> normalized_specs_llm -> enforced_specs
+        scope_of_supply + enforced_specs -> technical_agent_output
+        extracted_rfp + technical_agent_output -> pricing_summary
+    """
+    from agents.technical_agent import technical_agent as technical_module
+    from agents.technical_agent.technical_agent import SpecStream
+    from agents.technical_agent.enforce_normalize_specs import enforce_all
+    from agents.technical_agent.normalize_rfp_specs import normalize_rfp_specs
+
+    prompts = PROJECT_ROOT / "prompts"
+    schemas = PROJECT_ROOT / "schemas"
+    # Shared by every LLM stage: prompt rendering, response cache and parsing
+    llm_code = ["services.prompt_builder", "services.llm_cache", "services.json_repair"]
+    technical = agent.technical_agent if agent is not None else None
+    stream = SpecStream(catalog.engine) if stream_specs and agent is not None else None
+
+    return PipelineDAG([
+        Stage(
+            "extracted_rfp",
+            lambda pdf: extractor.extract(str(pdf)),
+            inputs=["pdf"],
+            code=[
+                "agents.extractor_agent.extractor_agent",
+                "services.pdf_utils",
+                "services.section_index",
+                "services.chunker",
+                *llm_code,
+            ],
+            files=[prompts / "extractor_prompt.txt", schemas / "extraction_schema.json"],
+        ),
+        Stage(
+            "technical_summary",
+            lambda extracted_rfp: agent.generate_technical_summary(extracted_rfp),
+            inputs=["extracted_rfp"],
+            code=[__name__, *llm_code],
+            files=[prompts / "technical_summary_prompt.txt", schemas / "technical_summary_schema.json"],
+        ),
+        Stage(
+            "scope_of_supply",
+            lambda extracted_rfp, technical_summary: technical.generate_scope_of_supply(
+                extracted_rfp, technical_summary, agent.scope_schema,
+            ),
+            inputs=["extracted_rfp", "technical_summary"],
+            code=["agents.technical_agent.technical_agent", *llm_code],
+            files=[schemas / "scope_of_supply_schema.json"],
+        ),
+        Stage(
+            "normalized_specs_llm",
+            lambda extracted_rfp: normalize_rfp_specs(
+                extracted_rfp,
+                client=agent.client,
+                on_spec=stream.add if stream else None,
+            ),
+            inputs=["extracted_rfp"],
+            code=["agents.technical_agent.normalize_rfp_specs", "services.json_stream", *llm_code],
+            files=[schemas / "canonical_spec_schema.json"],
+        ),
+        Stage(
+            "enforced_specs",
+            lambda normalized_specs_llm: (
+                stream.enforced_specs(normalized_specs_llm) if stream else enforce_all(normalized_specs_llm)
+            ),
+            inputs=["normalized_specs_llm"],
+            code=["agents.technical_agent.enforce_normalize_specs"],
+        ),
+        Stage(
+            "technical_agent_output",
+            lambda scope_of_supply, enforced_specs: technical.recommend(
+                raw_scope=scope_of_supply,
+                enforced_specs=enforced_specs,
+                oem_repo=catalog.normalized,
+                engine=catalog.engine,
+                recommender=catalog.recommender,
+                top_3_oems=stream.top_3_oems(enforced_specs) if stream else None,
+            ),
+            inputs=["scope_of_supply", "enforced_specs"],
+            code=[
+                "agents.technical_agent.technical_agent",
+                "agents.technical_agent.normalize_scope_of_summary",
+                "agents.technical_agent.spec_scorer",
+                "agents.technical_agent.scoring_engine",
+                "agents.technical_agent.topk_ranker",
+                "agents.technical_agent.product_recommender",
+                "agents.technical_agent.final_oem_recommender",
+            ],
+            version=lambda: json.dumps([
+                catalog.version,
+                technical_module.ENFORCE_MANDATORY_SPECS,
+                technical_module.PER_PRODUCT_RECOMMENDATIONS,
+            ]),
+        ),
+        Stage(
+            "pricing_summary",
+            lambda extracted_rfp, technical_agent_output: agent.generate_pricing_summary(
+                extracted_rfp, technical_agent_output,
+            ),
+            inputs=["extracted_rfp", "technical_agent_output"],
+            code=[__name__, *llm_code],
+            files=[prompts / "pricing_summary_prompt.txt", schemas / "pricing_summary_schema.json"],
+        ),
+    ])
+
+
+def stage_events(stage: str, value) -> list:
+    """
+    Dashboard events [(event, data)] for one finished pipeline stage.
+    Intermediate stages the dashboard does not show yield none.
+    """
+    if stage == "extracted_rfp":
+        return [("rfp_metadata", value.get("rfp_metadata"))]
+    if stage == "technical_summary":
+        return [("technical_summary", value)]
+    if stage == "scope_of_supply":
+        try:
+            return [("scope_of_supply", TechnicalAgent.unwrap_scope(value))]
+        except ValueError:
+            # Reported when the scoring stage fails on it
+            return []
+    if stage == "enforced_specs":
+        return [("normalized_specs", value)]
+    if stage == "technical_agent_output":
+        return [("top_3_oems", {
+            "top_3_oem_recommendations": value["top_3_oems"],
+            "final_recommendation_table": value["final_recommendation_table"],
+        })]
+    if stage == "pricing_summary":
+        return [("pricing_summary", value)]
+    return []
+
+
+def rfp_run_key(pdf_bytes: bytes) -> str:
+    """
+    Identity of a pipeline run: sha256 of the PDF plus the pipeline
+    version (stage code, prompt/schema files, catalog version and
+    ranking flags). Equal keys mean the same result can be reused.
+    """
+    dag = build_rfp_dag(agent=None, extractor=None, catalog=get_catalog())
+    return hash_artifact([hash_artifact(pdf_bytes), dag.version()])
+
+
+def run_pipeline(pdf_path: str, on_stage=None, on_event=None) -> dict:
+    """
+    Extract the RFP PDF and run the main agent pipeline on it.
+
+    Stages whose inputs, code and prompt/schema files are unchanged
+    since a previous run reuse their stored output. `on_stage(name)`
+    is called as each (re-)computed stage starts so callers (e.g. the
+    job manager) can publish progress; `on_event(event, data)` receives
+    each dashboard section (see stage_events) as soon as it is ready.
+    """
+    agent = MainAgent()
+    dag = build_rfp_dag(agent, build_extractor(), get_catalog())
+
+    def on_result(stage, value, cached):
+        if on_event is not None:
+            for event, data in stage_events(stage, value):
+                on_event(event, data)
+
+    artifacts = dag.run({"pdf": Path(pdf_path)}, on_stage=on_stage, on_result=on_result)
+
+    for name in ("extracted_rfp", "technical_summary", "technical_agent_output"):
+        agent._write_debug_artifact(f"{name}.json", artifacts[name])
+
+    results = {
+        "technical_summary": artifacts["technical_summary"],
+        "technical_agent_output": artifacts["technical_agent_output"],
+        "pricing_summary": artifacts["pricing_summary"],
+        "pipeline_stages": artifacts["_stages"],
+    }
+    return finalize_results(artifacts["extracted_rfp"], results)
+
+
+def build_rfp_response(pipeline_output: dict) -> dict:
+    """
+    Frontend-ready payload for one RFP: pipeline output plus the
+    spec match matrix against the current OEM catalog.
+    """
+    technical_output = pipeline_output["technical_agent_output"]
+    normalized_specs = technical_output["rfp_specs"]
+    top_3_skus = technical_output["top_3_oems"]
+
+    # Preloaded catalog snapshot
+    catalog = get_catalog()
+
+    spec_match_matrix = build_comparison_table(
+        rfp_specs=normalized_specs,
+        top_oems=top_3_skus,
+        oem_repo=catalog.normalized,
+        engine=catalog.engine
+    )
+
+    return {
+        "rfp_metadata": pipeline_output.get("rfp_metadata"),
+        "technical_summary": pipeline_output.get("technical_summary"),
+        "scope_of_supply_summary": pipeline_output["scope_of_supply_summary"],
+        "normalized_scope": technical_output["normalized_scope"],
+        "normalized_specs": normalized_specs,
+        "top_3_oem_recommendations": top_3_skus,
+        "final_recommendation_table": technical_output["final_recommendation_table"],
+        "spec_match_matrix": spec_match_matrix,
+        "pricing_summary": pipeline_output.get("pricing_summary"),
+        "oem_catalog_size": len(catalog.products),
+        "oem_catalog_version": catalog.version,
+        "pipeline_stages": pipeline_output.get("pipeline_stages"),
+    }
+
+
 # -------------------------------------------------
 # LOCAL EXECUTION
 # -------------------------------------------------
@@ -179,7 +417,7 @@ if __name__ == "__main__":
     with open(extracted_rfp_path, "r", encoding="utf-8") as f:
         extracted_rfp = json.load(f)
 
-    agent = MainAgent()
+    agent = MainAgent(debug_artifacts=True)
     results = agent.run_pipeline(extracted_rfp)
 
     with open(OUTPUT_DIR / "pricing_summary.json", "w", encoding="utf-8") as f:
@@ -9,7 +9,7 @@ Applies final enforcement rules on normalized RFP technical specs:
 """
 import json
 from copy import deepcopy
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # -----------------------------
 # Unit Canonicalization Map
@@ -98,49 +98,72 @@ def normalize_test_conditions(spec: Dict[str, Any]) -> None:
 # -----------------------------
 # Deduplicate Global Specs
 # -----------------------------
-def deduplicate_global_specs(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    global_specs = {}
-    final_specs = []
+def is_redundant(spec: Dict[str, Any], global_specs: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    Variant spec repeating the value + operator of an earlier global
+    spec. Global specs are recorded in `global_specs` (key -> spec).
+    """
+    key = spec["spec_key"]
 
-    for spec in specs:
-        key = spec["spec_key"]
+    if spec["applies_to"] == "all_variants":
+        global_specs[key] = spec
+        return False
 
-        if spec["applies_to"] == "all_variants":
-            global_specs[key] = spec
-            final_specs.append(spec)
-            continue
+    # specific variant
+    global_spec = global_specs.get(key)
+    if not global_spec:
+        return False
 
-        # specific variant
-        global_spec = global_specs.get(key)
-        if not global_spec:
-            final_specs.append(spec)
-            continue
+    # compare values
+    return spec.get("value") == global_spec.get("value") and spec.get("operator") == global_spec.get("operator")
 
-        # compare values
-        if spec.get("value") == global_spec.get("value") and spec.get("operator") == global_spec.get("operator"):
-            continue  # redundant
-        else:
-            final_specs.append(spec)
 
-    return final_specs
+def deduplicate_global_specs(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    global_specs = {}
+    return [spec for spec in specs if not is_redundant(spec, global_specs)]
 
 
 # -----------------------------
 # Main Enforcement Pipeline
 # -----------------------------
+def enforce_spec(spec: Dict[str, Any]) -> None:
+    enforce_operator(spec)
+    canonicalize_unit(spec)
+    normalize_test_conditions(spec)
+
+
 def enforce_all(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     enforced = deepcopy(specs)
 
     for spec in enforced:
-        enforce_operator(spec)
-        canonicalize_unit(spec)
-        normalize_test_conditions(spec)
+        enforce_spec(spec)
 
     enforced = deduplicate_global_specs(enforced)
 
     return enforced
 
 
+class SpecEnforcer:
+    """
+    enforce_all, one spec at a time (specs streamed from the LLM).
+    Deduplication only looks back at earlier specs, so after the last
+    add() `specs` equals enforce_all(all specs added).
+    """
+
+    def __init__(self):
+        self.specs: List[Dict[str, Any]] = []
+        self._global_specs: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Enforced copy of `spec`, or None when it is redundant."""
+        spec = deepcopy(spec)
+        enforce_spec(spec)
+        if is_redundant(spec, self._global_specs):
+            return None
+        self.specs.append(spec)
+        return spec
+
+
 # -----------------------------
 # Test / Demo
 # -----------------------------
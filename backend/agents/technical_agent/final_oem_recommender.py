@@ -1,5 +1,9 @@
+import heapq
 import json
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional
+
+from services.catalog_binary import load_normalized_catalog
 
 
 # ============================================================
@@ -20,19 +24,29 @@ def classify_rfp_product(product_name: str) -> str:
 
 
 
+FAMILY_KEYWORDS = {
+    "Switching": ["switch"],
+    "Wireless": ["wireless", "access point"],
+    "Telecom Cable": ["cable", "pijf"]
+}
+
+
+def families_for_product(oem_product: Dict) -> List[str]:
+    """RFP families an OEM product master row can serve."""
+    name = oem_product["product_family"].lower()
+    return [
+        family for family, keywords in FAMILY_KEYWORDS.items()
+        if any(k in name for k in keywords)
+    ]
+
+
 def filter_oems_by_family(
     oem_products: List[Dict],
     oem_specs: List[Dict],
     family: str
 ) -> List[Dict]:
 
-    keywords = {
-        "Switching": ["switch"],
-        "Wireless": ["wireless", "access point"],
-        "Telecom Cable": ["cable", "pijf"]
-    }
-
-    allowed = keywords.get(family, [])
+    allowed = FAMILY_KEYWORDS.get(family, [])
     if not allowed:
         return []
 
@@ -65,65 +79,233 @@ def extract_value(val):
     return None
 
 
-def score_specs(rfp_specs, oem_specs):
+def spec_passed(rfp, oem_val):
+    rfp_val = rfp["value"]
+    op = rfp["operator"]
+
+    if op == "==":
+        tol = rfp.get("tolerance")
+        return abs(oem_val - rfp_val["exact"]) <= (tol or 0)
+    if op == "<=":
+        return oem_val <= rfp_val["max"]
+    if op == ">=":
+        return oem_val >= rfp_val["min"]
+    return False
+
+
+def score_indexed_specs(
+    rfp_specs,
+    oem_index,
+    stop_below: Optional[float] = None,
+    enforce_mandatory: bool = False,
+) -> Optional[float]:
+    """
+    Equal-weight score against a spec_key → OEM row index.
+
+    Returns None as soon as the SKU is out: it fails a mandatory spec
+    (when enforce_mandatory), or even passing every remaining spec
+    would leave it below `stop_below`.
+    """
     score = 0
     total = len(rfp_specs)
+    if not total:
+        return 0.0
 
-    oem_index = {o["spec_key"]: o for o in oem_specs}
+    for position, rfp in enumerate(rfp_specs):
+        if stop_below is not None and round((score + total - position) / total, 4) < stop_below:
+            return None
 
-    for rfp in rfp_specs:
         oem = oem_index.get(rfp["spec_key"])
         if not oem:
             continue
 
-        rfp_val = rfp["value"]
         oem_val = extract_value(oem["value"])
         if oem_val is None:
             continue
 
-        op = rfp["operator"]
+        if spec_passed(rfp, oem_val):
+            score += 1
+        elif enforce_mandatory and rfp.get("mandatory"):
+            return None
 
-        passed = False
-        if op == "==":
-            tol = rfp.get("tolerance")
-            passed = abs(oem_val - rfp_val["exact"]) <= (tol or 0)
-        elif op == "<=":
-            passed = oem_val <= rfp_val["max"]
-        elif op == ">=":
-            passed = oem_val >= rfp_val["min"]
+    return round(score / total, 4)
 
-        if passed:
-            score += 1
 
-    return round(score / total, 4) if total else 0.0
+def score_specs(rfp_specs, oem_specs):
+    oem_index = {o["spec_key"]: o for o in oem_specs}
+    return score_indexed_specs(rfp_specs, oem_index)
 
 
 # ============================================================
 # 3️⃣ RANK OEMs FOR ONE RFP PRODUCT
 # ============================================================
 
-def rank_oems_for_product(rfp_specs, oem_repo):
-    from collections import defaultdict
+def rank_oems_for_product(rfp_specs, oem_repo, top_k=3, enforce_mandatory=False):
+    """
+    Top-k SKUs by equal-weight spec score (ties keep catalog order).
 
-    grouped = defaultdict(list)
+    Branch and bound: SKUs are visited best upper bound first (share
+    of RFP specs the SKU has a spec_key for), scoring stops once the
+    bound drops below the k-th best score, and a SKU is abandoned as
+    soon as it can no longer make the top k.
+    """
+    sku_indexes = {}
     for row in oem_repo:
-        grouped[row["product_sku"]].append(row)
+        sku_indexes.setdefault(row["product_sku"], {})[row["spec_key"]] = row
+
+    return rank_sku_indexes(rfp_specs, sku_indexes, top_k, enforce_mandatory)
+
+
+def rank_sku_indexes(
+    rfp_specs,
+    sku_indexes: Dict[str, Dict[str, Dict[str, Any]]],
+    top_k: int = 3,
+    enforce_mandatory: bool = False,
+):
+    """
+    rank_oems_for_product over pre-grouped SKUs
+    (SKU → spec_key → last OEM row, in catalog order).
+    """
+    from collections import Counter
+
+    if top_k <= 0:
+        return []
+
+    total = len(rfp_specs)
+    rfp_key_counts = Counter(rfp["spec_key"] for rfp in rfp_specs)
+
+    candidates = []
+    for position, (sku, oem_index) in enumerate(sku_indexes.items()):
+        covered = sum(rfp_key_counts[k] for k in rfp_key_counts.keys() & oem_index.keys())
+        bound = round(covered / total, 4) if total else 0.0
+        candidates.append((bound, position, sku, oem_index))
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+
+    # Min-heap of the current top k: (score, -position) is smallest
+    # for the entry that would be dropped first
+    heap = []
+    for bound, position, sku, oem_index in candidates:
+        full = len(heap) >= top_k
+        if full and bound < heap[0][0]:
+            break
+
+        s = score_indexed_specs(
+            rfp_specs,
+            oem_index,
+            stop_below=heap[0][0] if full else None,
+            enforce_mandatory=enforce_mandatory,
+        )
+        if s is None:
+            continue
+
+        entry = (s, -position, sku)
+        if not full:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
 
     ranked = []
-    for sku, specs in grouped.items():
-        s = score_specs(rfp_specs, specs)
+    for s, _, sku in sorted(heap, reverse=True):
         ranked.append({
             "product_sku": sku,
             "spec_match_score": s,
             "spec_match_pct": round(s * 100, 2)
         })
+    return ranked
+
 
-    ranked.sort(key=lambda x: x["spec_match_score"], reverse=True)
-    return ranked[:3]
+# ============================================================
+# 4️⃣ FAMILY-PARTITIONED RECOMMENDER
+# ============================================================
+
+class FamilyRecommender:
+    """
+    OEM catalog partitioned by RFP product family once, so a scope
+    with hundreds of line items costs one ranking per family instead
+    of a catalog scan per line item.
+    """
+
+    def __init__(self, oem_products: List[Dict], oem_specs: List[Dict]):
+        sku_families = {}
+        for p in oem_products:
+            for family in families_for_product(p):
+                sku_families.setdefault(p["product_sku"], []).append(family)
+
+        # family → SKU → spec_key → last spec row (catalog order),
+        # the same view filter_oems_by_family + rank_oems_for_product build
+        self.family_indexes: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {
+            family: {} for family in FAMILY_KEYWORDS
+        }
+        for row in oem_specs:
+            for family in sku_families.get(row["product_sku"], ()):
+                (
+                    self.family_indexes[family]
+                    .setdefault(row["product_sku"], {})
+                )[row["spec_key"]] = row
+
+    def skus(self, family: str) -> List[str]:
+        return list(self.family_indexes.get(family, {}))
+
+    def candidate_count(self, family: str) -> int:
+        return len(self.family_indexes.get(family, {}))
+
+    def rank_family(self, family, rfp_specs, top_k=3, enforce_mandatory=False):
+        sku_indexes = self.family_indexes.get(family)
+        if not sku_indexes:
+            return []
+        return rank_sku_indexes(rfp_specs, sku_indexes, top_k, enforce_mandatory)
+
+    @staticmethod
+    def group_scope_products(scope: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """family → [{"product_line", "product"}] in scope order."""
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        for line in scope["product_lines"]:
+            for product in line["products"]:
+                batches.setdefault(classify_rfp_product(product["product_name"]), []).append({
+                    "product_line": line["product_line_name"],
+                    "product": product,
+                })
+        return batches
+
+    def recommend(self, scope, rfp_specs, top_k=3, enforce_mandatory=False):
+        """
+        Final recommendation rows for every scope product with a
+        compatible OEM, in scope order. Each family batch is ranked
+        once and shared by all of its line items.
+        """
+        batches = self.group_scope_products(scope)
+
+        ranked_by_family = {}
+        for family, items in batches.items():
+            ranked_by_family[family] = self.rank_family(
+                family, rfp_specs, top_k=top_k, enforce_mandatory=enforce_mandatory,
+            )
+            print(
+                f"🔍 {family}: {len(items)} RFP line items, "
+                f"OEM candidates: {self.candidate_count(family)}"
+            )
+
+        final_table = []
+        for line in scope["product_lines"]:
+            for product in line["products"]:
+                top_oems = ranked_by_family[classify_rfp_product(product["product_name"])]
+                if not top_oems:
+                    continue
+
+                best = top_oems[0]
+                final_table.append({
+                    "product_line": line["product_line_name"],
+                    "rfp_product_name": product["product_name"],
+                    "rfp_product_code": product["product_code"],
+                    "quantity": product["quantity"],
+                    "recommended_oem_sku": best["product_sku"],
+                    "spec_match_pct": best["spec_match_pct"]
+                })
+        return final_table
 
 
 # ============================================================
-# 4️⃣ MAIN DRIVER
+# 5️⃣ MAIN DRIVER
 # ============================================================
 
 if __name__ == "__main__":
@@ -137,56 +319,18 @@ if __name__ == "__main__":
     with open("oem_datasheets/oem_products.json") as f:
         oem_products = json.load(f)
 
-    with open("oem_datasheets/normalized_oem.json") as f:
-        oem_specs = json.load(f)
-
-
-    final_table = []
+    # JSON or compiled (mmap) catalog
+    oem_specs = load_normalized_catalog(
+        os.getenv("RFP_NORMALIZED_CATALOG", "oem_datasheets/normalized_oem.json")
+    )
 
     print("\nFINAL OEM RECOMMENDATIONS\n")
 
+    recommender = FamilyRecommender(oem_products, oem_specs)
+    final_table = recommender.recommend(scope, rfp_specs)
 
-    for line in scope["product_lines"]:
-        product_line = line["product_line_name"]
-
-        for product in line["products"]:
-            rfp_name = product["product_name"]
-            rfp_code = product["product_code"]
-            quantity = product["quantity"]
-
-            # --- family filtering ---
-            compatible_oems = filter_oems_by_family(
-                oem_products=oem_products,
-                oem_specs=oem_specs,
-                family = classify_rfp_product(rfp_name)
-
-            )
-
-            if not compatible_oems:
-                continue
-            print(f"🔍 RFP: {rfp_name} → classified as {family}, OEM candidates: {len(compatible_oems)}")
-
-            # --- ranking ---
-            top_oems = rank_oems_for_product(
-                rfp_specs=rfp_specs,
-                oem_repo=compatible_oems
-            )
-
-
-            if not top_oems:
-                continue
-
-            best = top_oems[0]
-            print(f"✔ Matched {rfp_name} → {best['product_sku']} ({best['spec_match_pct']}%)")
-
-            final_table.append({
-                "product_line": product_line,
-                "rfp_product_name": rfp_name,
-                "rfp_product_code": rfp_code,
-                "quantity": quantity,
-                "recommended_oem_sku": best["product_sku"],
-                "spec_match_pct": best["spec_match_pct"]
-            })
+    for row in final_table:
+        print(f"✔ Matched {row['rfp_product_name']} → {row['recommended_oem_sku']} ({row['spec_match_pct']}%)")
 
     print("\nFINAL OEM RECOMMENDATION TABLE\n")
     for row in final_table:
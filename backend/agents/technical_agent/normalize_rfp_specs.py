@@ -1,43 +1,19 @@
 import json
-from typing import Dict, Any, List
-from google import genai
+from typing import Callable, Dict, Any, List, Optional
 from google.genai import types
 import os
 from dotenv import load_dotenv
 
+from services import resources
+from services.llm_cache import generate_json, generate_json_stream
+from services.llm_client import get_client
+from services.prompt_builder import get_template
+
 load_dotenv()
 
 MODEL_NAME = "gemini-2.5-flash-lite"
 
-
-class RFPTechSpecNormalizer:
-    """
-    Converts extracted RFP technical specifications into
-    canonical, OEM-comparable normalized specs.
-    """
-
-    def __init__(self):
-        self.client = genai.Client()
-
-    # -------------------------------------------------
-    # LLM STEP: Technical Spec Normalization
-    # -------------------------------------------------
-    def normalize_rfp_specs(
-        self,
-        extracted_rfp_technical_specs: List[str],
-        canonical_spec_schema: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
-        """
-        Inputs:
-        - extracted_rfp_technical_specs: list of raw RFP spec sentences
-        - canonical_spec_schema: allowed spec keys + expected structure
-        - technical_summary: optional context (non-authoritative)
-
-        Output:
-        - List of normalized technical spec constraints
-        """
-
-        prompt = f"""
+NORMALIZATION_PROMPT = """
 You are a TECHNICAL SPECIFICATION NORMALIZATION AGENT.
 
 Your task is to convert RFP technical requirements into
@@ -64,7 +40,7 @@ VARIANT SCOPE RULES (MANDATORY FOR EVERY SPEC OBJECT):
 - EVERY spec object MUST include a "variant_scope" field.
 - If a specification applies to ALL cable sizes or pair counts,
   you MUST still include "variant_scope" with:
-    {{ "pair_count": None }}
+    { "pair_count": None }
 - If the specification applies to a specific cable size, pair count,
   or variant, set the correct numeric "pair_count" value.
 - NEVER omit the "variant_scope" field.
@@ -73,25 +49,72 @@ VARIANT SCOPE RULES (MANDATORY FOR EVERY SPEC OBJECT):
   set "pair_count" to None.
 
 CANONICAL SPEC SCHEMA:
-{json.dumps(canonical_spec_schema, indent=2)}
+{{CANONICAL_SPEC_SCHEMA}}
 
 EXTRACTED RFP TECHNICAL SPECS:
-{json.dumps(extracted_rfp_technical_specs, indent=2)}
+{{EXTRACTED_RFP_TECHNICAL_SPECS}}
 
 OUTPUT FORMAT:
 Return a JSON array.
 Each item MUST strictly follow the canonical spec schema.
 """
 
-        response = self.client.models.generate_content(
-            model=MODEL_NAME,
-            contents=[prompt],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
+
+class RFPTechSpecNormalizer:
+    """
+    Converts extracted RFP technical specifications into
+    canonical, OEM-comparable normalized specs.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or get_client()
+
+    # -------------------------------------------------
+    # LLM STEP: Technical Spec Normalization
+    # -------------------------------------------------
+    def normalize_rfp_specs(
+        self,
+        extracted_rfp_technical_specs: List[str],
+        canonical_spec_schema: Dict[str, Any],
+        on_spec: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Inputs:
+        - extracted_rfp_technical_specs: list of raw RFP spec sentences
+        - canonical_spec_schema: allowed spec keys + expected structure
+        - technical_summary: optional context (non-authoritative)
+        - on_spec: when given, the response is streamed and each
+          normalized spec is passed to on_spec as soon as it is complete
+
+        Output:
+        - List of normalized technical spec constraints
+        """
+
+        prompt = get_template(
+            "normalize_specs",
+            NORMALIZATION_PROMPT,
+            CANONICAL_SPEC_SCHEMA=canonical_spec_schema,
+        ).render(EXTRACTED_RFP_TECHNICAL_SPECS=extracted_rfp_technical_specs)
+
+        config = types.GenerateContentConfig(
+            response_mime_type="application/json"
         )
 
-        return json.loads(response.text)
+        if on_spec is not None:
+            return generate_json_stream(
+                client=self.client,
+                model=MODEL_NAME,
+                prompt=prompt,
+                config=config,
+                on_event=lambda kind, key, value: on_spec(value) if kind == "item" else None,
+            )
+
+        return generate_json(
+            client=self.client,
+            model=MODEL_NAME,
+            prompt=prompt,
+            config=config
+        )
 
 # -------------------------------------------------
 # PUBLIC FUNCTION (Pipeline-friendly)
@@ -99,24 +122,23 @@ Each item MUST strictly follow the canonical spec schema.
 def normalize_rfp_specs(
     extracted_rfp_technical_specs,
     canonical_spec_schema=None,
+    client=None,
+    on_spec=None,
 ):
     """
     Wrapper for pipeline usage.
     """
 
     # Canonical spec schema (OEM-aligned)
-    with open("schemas/canonical_spec_schema.json") as f:
-        canonical_spec_schema = json.load(f)
-
-    # Technical summary (for context)
-    with open("outputs/technical_summary_by_main_agent.json") as f:
-        technical_summary = json.load(f)
+    if canonical_spec_schema is None:
+        canonical_spec_schema = resources.schema("canonical_spec_schema.json")
 
-    normalizer = RFPTechSpecNormalizer()
+    normalizer = RFPTechSpecNormalizer(client=client)
 
     return normalizer.normalize_rfp_specs(
         extracted_rfp_technical_specs=extracted_rfp_technical_specs,
-        canonical_spec_schema=canonical_spec_schema
+        canonical_spec_schema=canonical_spec_schema,
+        on_spec=on_spec,
     )
 
 def main():
@@ -0,0 +1,266 @@
+# backend/agents/technical_agent/product_recommender.py
+#
+# Per-product OEM recommendation.
+#
+# The global ranking scores all RFP specs once, so every scope product
+# gets the same best SKU. Here each scope product is ranked on its own
+# spec set (specs for all variants + specs scoped to its pair count)
+# against the SKUs of its product family. Products that resolve to the
+# same (family, spec set) share one ranking, and the distinct rankings
+# run on a process pool that keeps the scoring engine loaded between
+# RFPs.
+
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from agents.technical_agent.final_oem_recommender import (
+    FamilyRecommender,
+    classify_rfp_product,
+)
+from agents.technical_agent.scoring_engine import OEMScoringEngine
+from agents.technical_agent.topk_ranker import rank_top_k
+
+# -------------------------------------------------
+# CONSTANTS
+# -------------------------------------------------
+DEFAULT_WORKERS = int(os.getenv("RFP_RECOMMEND_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Below this many distinct rankings a process pool costs more than it saves
+PARALLEL_MIN_TASKS = 8
+
+_PAIR_COUNT_RE = re.compile(r"(\d+)\s*-?\s*(?:pairs?\b|p\b)", re.IGNORECASE)
+
+
+# -------------------------------------------------
+# PRODUCT → SPEC SET
+# -------------------------------------------------
+def product_pair_count(product: Dict[str, Any]) -> Optional[int]:
+    """Pair count of a scope product ("10 Pair ...", "TC-PIJF-200P-05"), if any."""
+    specs = product.get("technical_specifications") or {}
+    for key in ("pair_count", "pairs", "number_of_pairs"):
+        value = specs.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return int(value)
+        if isinstance(value, str):
+            match = re.search(r"\d+", value)
+            if match:
+                return int(match.group())
+
+    for text in (product.get("product_name"), product.get("product_code")):
+        match = _PAIR_COUNT_RE.search(text or "")
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def product_spec_indices(
+    product: Dict[str, Any],
+    rfp_specs: List[Dict[str, Any]],
+) -> Tuple[int, ...]:
+    """
+    Indices of the RFP specs that apply to `product`: specs for all
+    variants plus the ones scoped to its pair count / variant id.
+    Without a known pair count every spec applies (global ranking).
+    """
+    pair_count = product_pair_count(product)
+    code = product.get("product_code")
+
+    indices = []
+    for i, rfp in enumerate(rfp_specs):
+        scope = rfp.get("variant_scope") or {}
+        if scope.get("variant_id") is not None:
+            if scope["variant_id"] == code:
+                indices.append(i)
+        elif pair_count is None or scope.get("pair_count") is None:
+            indices.append(i)
+        elif scope["pair_count"] == pair_count:
+            indices.append(i)
+    return tuple(indices)
+
+
+# -------------------------------------------------
+# PROCESS POOL
+# -------------------------------------------------
+_worker_engine: Optional[OEMScoringEngine] = None
+
+
+def _init_worker(engine: OEMScoringEngine) -> None:
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _rank_task(
+    rfp_specs: List[Dict[str, Any]],
+    candidates: Optional[np.ndarray],
+    top_k: int,
+    enforce_mandatory: bool,
+) -> List[Dict[str, Any]]:
+    """Worker: rank one (family, spec set) against the preloaded engine."""
+    return rank_top_k(
+        _worker_engine,
+        rfp_specs,
+        top_k=top_k,
+        enforce_mandatory=enforce_mandatory,
+        candidates=candidates,
+    )
+
+
+class _EnginePool:
+    """A process pool whose workers hold one engine (catalog snapshot)."""
+
+    def __init__(self, engine: OEMScoringEngine, workers: int):
+        self.engine = engine
+        # spawn: safe when called from the API's worker threads. Workers
+        # only rank, so they get the columnar arrays, not the JSON rows
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(engine.columns_only(),),
+        )
+        self.users = 0
+
+
+# One pool per engine still in use; the newest engine's pool is current
+_pools: Dict[int, _EnginePool] = {}
+_current: Optional[_EnginePool] = None
+_pool_lock = threading.Lock()
+
+
+@contextmanager
+def _engine_pool(engine: OEMScoringEngine, workers: int) -> Iterator[ProcessPoolExecutor]:
+    """
+    Process pool whose workers hold `engine`, leased for one ranking.
+    The engine is shipped once per worker. A new catalog version gets
+    a fresh pool; the previous one is retired once its last job is
+    done, so jobs still ranking on the old snapshot finish normally.
+    """
+    global _current
+    with _pool_lock:
+        entry = _pools.get(id(engine))
+        if entry is None or entry.engine is not engine:
+            entry = _EnginePool(engine, workers)
+            _pools[id(engine)] = entry
+            _current = entry
+            _retire_idle()
+        entry.users += 1
+    try:
+        yield entry.pool
+    finally:
+        with _pool_lock:
+            entry.users -= 1
+            _retire_idle()
+
+
+def _retire_idle() -> None:
+    """Shut down pools that are no longer current and have no jobs (lock held)."""
+    for key, entry in list(_pools.items()):
+        if entry is not _current and entry.users == 0:
+            entry.pool.shutdown(wait=False)
+            del _pools[key]
+
+
+def shutdown_pool() -> None:
+    global _current
+    with _pool_lock:
+        for entry in _pools.values():
+            entry.pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+        _current = None
+
+
+# -------------------------------------------------
+# PER-PRODUCT RECOMMENDATION
+# -------------------------------------------------
+def recommend_per_product(
+    scope_summary: Dict[str, Any],
+    rfp_specs: List[Dict[str, Any]],
+    engine: OEMScoringEngine,
+    recommender: Optional[FamilyRecommender] = None,
+    top_k: int = 3,
+    enforce_mandatory: bool = False,
+    workers: int = DEFAULT_WORKERS,
+) -> List[Dict[str, Any]]:
+    """
+    Final recommendation table with one ranking per scope product.
+
+    Candidates are the SKUs of the product's family when `recommender`
+    is given (whole catalog without one). As in
+    FamilyRecommender.recommend, products of an unknown family, or of
+    a family with no OEM SKUs, get no row.
+    Same columns as build_final_recommendation_table, plus the
+    product's own top-k list.
+    """
+    family_candidates: Dict[str, Optional[np.ndarray]] = {}
+
+    def candidates_for(family: str) -> Optional[np.ndarray]:
+        if family not in family_candidates:
+            if recommender is None:
+                family_candidates[family] = None
+            else:
+                family_candidates[family] = np.array(
+                    [engine.sku_ids[s] for s in recommender.skus(family) if s in engine.sku_ids],
+                    dtype=np.int64,
+                )
+        return family_candidates[family]
+
+    # ---- One task per distinct (family, spec set) ----
+    rows = []
+    tasks: Dict[Tuple[str, Tuple[int, ...]], Any] = {}
+    for line in scope_summary["product_lines"]:
+        for product in line["products"]:
+            family = classify_rfp_product(product["product_name"])
+            candidates = candidates_for(family)
+            if candidates is not None and not len(candidates):
+                continue
+            key = (family, product_spec_indices(product, rfp_specs))
+            tasks.setdefault(key, None)
+            rows.append((line, product, key))
+
+    def task_args(key):
+        family, indices = key
+        return (
+            [rfp_specs[i] for i in indices],
+            candidates_for(family),
+            top_k,
+            enforce_mandatory,
+        )
+
+    if workers > 1 and len(tasks) >= PARALLEL_MIN_TASKS:
+        with _engine_pool(engine, workers) as pool:
+            futures = {key: pool.submit(_rank_task, *task_args(key)) for key in tasks}
+            results = {key: future.result() for key, future in futures.items()}
+    else:
+        results = {}
+        for key in tasks:
+            specs, candidates, k, mandatory = task_args(key)
+            results[key] = rank_top_k(
+                engine, specs, top_k=k, enforce_mandatory=mandatory, candidates=candidates,
+            )
+
+    print(f"🧮 Per-product ranking: {len(rows)} products, {len(tasks)} distinct spec sets")
+
+    # ---- Fan results back out in scope order ----
+    final_table = []
+    for line, product, key in rows:
+        ranked = results[key]
+        if not ranked:
+            continue
+
+        best = ranked[0]
+        final_table.append({
+            "product_line": line["product_line_name"],
+            "rfp_product_name": product["product_name"],
+            "rfp_product_code": product["product_code"],
+            "quantity": product["quantity"],
+            "recommended_oem_sku": best["product_sku"],
+            "spec_match_pct": best["spec_match_pct"],
+            "top_oems": ranked,
+        })
+    return final_table
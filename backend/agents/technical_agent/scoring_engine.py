@@ -0,0 +1,316 @@
+"""
+scoring_engine.py
+
+Columnar (NumPy) scoring of RFP specs against the whole OEM catalog.
+
+Same semantics as spec_scorer.score_sku, but the catalog is encoded
+once as arrays (SKU id, spec_key id, pair_count, numeric value) and
+each RFP spec is scored against every SKU in one vectorized pass:
+1. RFP specs deduplicated on (spec_key, pair_count), last wins
+2. First catalog row per SKU with the spec_key (and pair_count when
+   the RFP spec is variant-scoped) is the SKU's value
+3. Compliance + quality score per operator, averaged over RFP specs
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Operator Codes
+# -----------------------------
+OP_LE = 0
+OP_GE = 1
+OP_EQ = 2
+OP_OTHER = 3
+
+OP_CODES = {"<=": OP_LE, ">=": OP_GE, "==": OP_EQ}
+
+
+def _as_float(value: Any) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _raw_value(oem_value: Optional[Dict[str, Any]]) -> Any:
+    # Mirrors spec_scorer.extract_oem_numeric_value (exact > max > min)
+    if not oem_value:
+        return None
+    for field in ("exact", "max", "min"):
+        if oem_value.get(field) is not None:
+            return oem_value[field]
+    return None
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+class OEMScoringEngine:
+    """
+    Columnar view of normalized OEM spec rows.
+    """
+
+    def __init__(
+        self,
+        skus: List[str],
+        spec_keys: List[str],
+        row_sku: np.ndarray,
+        row_key: np.ndarray,
+        row_pair: np.ndarray,
+        row_value: np.ndarray,
+        rows: Optional[List[Dict[str, Any]]] = None,
+        row_value_int: Optional[np.ndarray] = None,
+    ):
+        # Source rows, when built from JSON, so lookups can return
+        # values exactly as they appear in the catalog
+        self.rows = rows
+        # Without rows (compiled catalog): True where row_value was an
+        # int in the source JSON, so 84 is not returned as 84.0
+        self.row_value_int = row_value_int
+        self.skus = skus
+        self.spec_keys = spec_keys
+        self.sku_ids = {sku: i for i, sku in enumerate(skus)}
+        self.key_ids = {key: i for i, key in enumerate(spec_keys)}
+
+        self.row_sku = row_sku
+        self.row_key = row_key
+        self.row_pair = row_pair
+        self.row_value = row_value
+
+        # Rows grouped by spec_key, then SKU, then catalog order
+        self._key_order = np.lexsort((np.arange(len(row_key)), row_sku, row_key))
+        self._key_bounds = np.searchsorted(
+            row_key[self._key_order],
+            np.arange(len(spec_keys) + 1),
+        )
+
+    @classmethod
+    def from_rows(cls, oem_rows: List[Dict[str, Any]]) -> "OEMScoringEngine":
+        sku_ids: Dict[str, int] = {}
+        key_ids: Dict[str, int] = {}
+        n = len(oem_rows)
+
+        row_sku = np.empty(n, dtype=np.int32)
+        row_key = np.empty(n, dtype=np.int32)
+        row_pair = np.empty(n, dtype=np.float64)
+        row_value = np.empty(n, dtype=np.float64)
+
+        for i, row in enumerate(oem_rows):
+            row_sku[i] = sku_ids.setdefault(row["product_sku"], len(sku_ids))
+            row_key[i] = key_ids.setdefault(row["spec_key"], len(key_ids))
+            row_pair[i] = _as_float((row.get("variant_scope") or {}).get("pair_count"))
+            row_value[i] = _as_float(_raw_value(row.get("value")))
+
+        return cls(
+            list(sku_ids), list(key_ids),
+            row_sku, row_key, row_pair, row_value,
+            rows=oem_rows,
+        )
+
+    def columns_only(self) -> "OEMScoringEngine":
+        """
+        The same engine without the source rows (cheap to pickle into
+        worker processes). Integer values stay integers in lookups.
+        """
+        if self.rows is None:
+            return self
+
+        row_value_int = np.fromiter(
+            (
+                isinstance(value, int) and not isinstance(value, bool)
+                for value in (_raw_value(row.get("value")) for row in self.rows)
+            ),
+            dtype=bool,
+            count=len(self.rows),
+        )
+        return OEMScoringEngine(
+            self.skus, self.spec_keys,
+            self.row_sku, self.row_key, self.row_pair, self.row_value,
+            row_value_int=row_value_int,
+        )
+
+    @property
+    def n_skus(self) -> int:
+        return len(self.skus)
+
+    # -----------------------------
+    # Row Lookup
+    # -----------------------------
+    def rows_for_key(self, spec_key: str) -> np.ndarray:
+        key_id = self.key_ids.get(spec_key)
+        if key_id is None:
+            return np.empty(0, dtype=np.int64)
+        return self._key_order[self._key_bounds[key_id]:self._key_bounds[key_id + 1]]
+
+    def first_values(
+        self,
+        spec_key: str,
+        pair_count: Optional[float],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(sku ids, value) of the first matching row per SKU."""
+        rows = self.rows_for_key(spec_key)
+        if pair_count is not None:
+            rows = rows[self.row_pair[rows] == _as_float(pair_count)]
+
+        if not len(rows):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        # Rows are sorted by (SKU, catalog order): keep each SKU's first
+        row_skus = self.row_sku[rows]
+        first = np.empty(len(rows), dtype=bool)
+        first[0] = True
+        np.not_equal(row_skus[1:], row_skus[:-1], out=first[1:])
+        return row_skus[first], self.row_value[rows[first]]
+
+    def last_value(self, sku: str, spec_key: str) -> Tuple[bool, Optional[float]]:
+        """
+        Value of the last row for (sku, spec_key), like the dict
+        index in build_comparison_table. Returns (found, value).
+        """
+        sku_id = self.sku_ids.get(sku)
+        rows = self.rows_for_key(spec_key)
+        if sku_id is None or not len(rows):
+            return False, None
+
+        rows = rows[self.row_sku[rows] == sku_id]
+        if not len(rows):
+            return False, None
+
+        row = int(rows[-1])
+        if self.rows is not None:
+            return True, _raw_value(self.rows[row]["value"])
+
+        value = self.row_value[row]
+        if np.isnan(value):
+            return True, None
+        if self.row_value_int is not None and self.row_value_int[row]:
+            return True, int(value)
+        return True, float(value)
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    @staticmethod
+    def spec_scores(rfp_spec: Dict[str, Any], values: np.ndarray) -> np.ndarray:
+        """Quality score per value; 0 where not compliant."""
+        passed, quality = OEMScoringEngine.spec_compliance(rfp_spec, values)
+        return np.where(passed, quality, 0.0)
+
+    @staticmethod
+    def spec_compliance(
+        rfp_spec: Dict[str, Any],
+        values: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(passed mask, quality score) per value."""
+        op = OP_CODES.get(rfp_spec["operator"], OP_OTHER)
+        bounds = rfp_spec["value"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if op == OP_LE:
+                limit = _as_float(bounds.get("max"))
+                passed = values <= limit
+                quality = np.minimum(1.0, limit / values)
+            elif op == OP_GE:
+                limit = _as_float(bounds.get("min"))
+                passed = values >= limit
+                quality = np.minimum(1.0, values / limit)
+            elif op == OP_EQ:
+                exact = _as_float(bounds.get("exact"))
+                tol = rfp_spec.get("tolerance")
+                if tol is None:
+                    passed = values == exact
+                    quality = np.ones_like(values)
+                else:
+                    delta = np.abs(values - exact)
+                    passed = delta <= tol
+                    quality = np.maximum(0.0, 1 - (delta / tol))
+            else:
+                return np.zeros(len(values), dtype=bool), np.zeros_like(values)
+
+        # 0/0 only happens on an exact boundary hit (e.g. 0 <= 0)
+        quality = np.where(np.isnan(quality), 1.0, quality)
+        return passed, quality
+
+    @staticmethod
+    def unique_specs(rfp_specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Deduplicate on (spec_key, pair_count), last wins (as score_sku)."""
+        unique = {}
+        for rfp in rfp_specs:
+            unique[(rfp["spec_key"], rfp["variant_scope"]["pair_count"])] = rfp
+        return list(unique.values())
+
+    def score_all(self, rfp_specs: List[Dict[str, Any]]) -> np.ndarray:
+        """Unrounded spec match fraction for every SKU (catalog order)."""
+        rfp_specs = self.unique_specs(rfp_specs)
+
+        totals = np.zeros(self.n_skus, dtype=np.float64)
+        if not rfp_specs:
+            return totals
+
+        for rfp in rfp_specs:
+            sku_ids, values = self.first_values(
+                rfp["spec_key"],
+                rfp["variant_scope"]["pair_count"],
+            )
+            if len(sku_ids):
+                totals[sku_ids] += self.spec_scores(rfp, values)
+
+        return totals / len(rfp_specs)
+
+    def rank(
+        self,
+        rfp_specs: List[Dict[str, Any]],
+        top_k: int = 3,
+    ) -> List[Dict[str, Any]]:
+        scores = self.score_all(rfp_specs)
+
+        # Stable descending sort on the rounded score keeps catalog
+        # order for ties, like list.sort(reverse=True). Only SKUs at or
+        # above the k-th best score are sorted.
+        keys = np.round(scores, 4)
+        candidates = np.arange(len(keys))
+        if 0 < top_k < len(keys):
+            kth = np.partition(keys, len(keys) - top_k)[len(keys) - top_k]
+            candidates = np.flatnonzero(keys >= kth)
+        order = candidates[np.argsort(-keys[candidates], kind="stable")][:max(top_k, 0)]
+
+        ranked = []
+        for i in order:
+            score = round(float(scores[i]), 4)
+            ranked.append({
+                "product_sku": self.skus[i],
+                "spec_match_score": score,
+                "spec_match_pct": round(score * 100, 2)
+            })
+        return ranked
+
+
+# -----------------------------
+# Engine Cache
+# -----------------------------
+_ENGINE_CACHE: Dict[int, Tuple[List[Dict[str, Any]], int, OEMScoringEngine]] = {}
+_ENGINE_CACHE_SIZE = 4
+
+
+def get_engine(oem_rows: List[Dict[str, Any]]) -> OEMScoringEngine:
+    """
+    Compiled engine for an OEM row list, reused while the same list
+    object (and length) is passed in. Rebuild explicitly with
+    OEMScoringEngine.from_rows after mutating rows in place.
+    """
+    cached = _ENGINE_CACHE.get(id(oem_rows))
+    if cached is not None and cached[0] is oem_rows and cached[1] == len(oem_rows):
+        return cached[2]
+
+    if hasattr(oem_rows, "to_engine"):
+        # Compiled (mmap) catalog: columns are used as-is
+        engine = oem_rows.to_engine()
+    else:
+        engine = OEMScoringEngine.from_rows(oem_rows)
+    if len(_ENGINE_CACHE) >= _ENGINE_CACHE_SIZE:
+        _ENGINE_CACHE.pop(next(iter(_ENGINE_CACHE)))
+    _ENGINE_CACHE[id(oem_rows)] = (oem_rows, len(oem_rows), engine)
+    return engine
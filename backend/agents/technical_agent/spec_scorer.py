@@ -2,6 +2,11 @@ import json
 from typing import Dict, List, Any, Tuple
 from pathlib import Path
 import csv
+import os
+
+from agents.technical_agent.scoring_engine import OEMScoringEngine, get_engine
+from agents.technical_agent.topk_ranker import rank_top_k
+from services.catalog_binary import load_normalized_catalog
 
 OUTPUT_DIR = Path("outputs")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -123,32 +128,25 @@ def score_sku(
 # OEM RANKING
 # =================================================
 
-def group_oem_by_sku(oem_rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
-    grouped = {}
-    for row in oem_rows:
-        grouped.setdefault(row["product_sku"], []).append(row)
-    return grouped
-
-
 def rank_oem_skus(
     rfp_specs: List[Dict[str, Any]],
     oem_repo: List[Dict[str, Any]],
-    top_k: int = 3
+    top_k: int = 3,
+    engine: OEMScoringEngine | None = None,
+    enforce_mandatory: bool = False
 ) -> List[Dict[str, Any]]:
 
-    ranked = []
-    grouped = group_oem_by_sku(oem_repo)
-
-    for sku, oem_specs in grouped.items():
-        score = score_sku(rfp_specs, oem_specs)
-        ranked.append({
-            "product_sku": sku,
-            "spec_match_score": score,
-            "spec_match_pct": round(score * 100, 2)
-        })
-
-    ranked.sort(key=lambda x: x["spec_match_score"], reverse=True)
-    return ranked[:top_k]
+    # Branch-and-bound over the columnar engine: only SKUs that can
+    # still reach the top k are scored (same results as score_sku over
+    # each SKU's rows). enforce_mandatory drops SKUs that fail a
+    # mandatory RFP spec they have a value for.
+    engine = engine or get_engine(oem_repo)
+    return rank_top_k(
+        engine,
+        rfp_specs,
+        top_k=top_k,
+        enforce_mandatory=enforce_mandatory,
+    )
 
 
 # =================================================
@@ -184,14 +182,12 @@ def build_final_recommendation_table(
 def build_comparison_table(
     rfp_specs: List[Dict[str, Any]],
     top_oems: List[Dict[str, Any]],
-    oem_repo: List[Dict[str, Any]]
+    oem_repo: List[Dict[str, Any]],
+    engine: OEMScoringEngine | None = None
 ) -> List[Dict[str, Any]]:
 
-    # index OEM specs as: SKU → spec_key → spec
-    oem_index = {}
-    for row in oem_repo:
-        sku = row["product_sku"]
-        oem_index.setdefault(sku, {})[row["spec_key"]] = row
+    # SKU → spec_key → spec lookups go through the columnar engine
+    engine = engine or get_engine(oem_repo)
 
     table = []
 
@@ -203,14 +199,12 @@ def build_comparison_table(
         }
 
         for i, oem in enumerate(top_oems, start=1):
-            sku = oem["product_sku"]
-            oem_spec = oem_index.get(sku, {}).get(rfp["spec_key"])
+            found, oem_value = engine.last_value(oem["product_sku"], rfp["spec_key"])
 
-            if not oem_spec:
+            if not found:
                 row[f"OEM_{i}"] = "N/A"
                 continue
 
-            oem_value = extract_oem_numeric_value(oem_spec["value"])
             passed = (
                 check_compliance(rfp, oem_value)
                 if oem_value is not None
@@ -236,8 +230,10 @@ if __name__ == "__main__":
     with open("outputs/enforced_normalized_specs.json", "r") as f:
         rfp_specs = json.load(f)["data"]
 
-    with open("oem_datasheets/normalized_oem.json", "r") as f:
-        oem_repo = json.load(f)
+    # JSON or compiled (mmap) catalog
+    oem_repo = load_normalized_catalog(
+        os.getenv("RFP_NORMALIZED_CATALOG", "oem_datasheets/normalized_oem.json")
+    )
 
     with open("outputs/scope_of_supply_summary.json", "r") as f:
         scope_summary = json.load(f)
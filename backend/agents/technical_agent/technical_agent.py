@@ -1,46 +1,42 @@
 # backend/agents/technical_agent/technical_agent.py
 
 import json
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 
 # ---- INTERNAL MODULES ----
-from normalize_scope_of_summary import normalize_scope
-from normalize_rfp_specs import normalize_rfp_specs
-from enforce_normalize_specs import enforce_all
-from spec_scorer import (
+from agents.technical_agent.normalize_scope_of_summary import normalize_scope
+from agents.technical_agent.normalize_rfp_specs import normalize_rfp_specs
+from agents.technical_agent.enforce_normalize_specs import SpecEnforcer, enforce_all
+from agents.technical_agent.scoring_engine import OEMScoringEngine, get_engine
+from agents.technical_agent.final_oem_recommender import FamilyRecommender
+from agents.technical_agent.product_recommender import recommend_per_product
+from agents.technical_agent.topk_ranker import IncrementalScorer
+from agents.technical_agent.spec_scorer import (
     rank_oem_skus,
     build_final_recommendation_table,
 )
 
 # ---- LLM ----
-from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
+from services.llm_cache import generate_json
+from services.llm_client import get_client
+from services.pipeline_dag import PipelineDAG, Stage
+from services.prompt_builder import get_template
+
 load_dotenv()
 MODEL_NAME = "gemini-2.5-flash"
 
+# Drop SKUs that fail an RFP spec marked mandatory
+ENFORCE_MANDATORY_SPECS = os.getenv("RFP_ENFORCE_MANDATORY_SPECS", "0") == "1"
+# Rank every scope product on its own specs / family instead of
+# giving all products the single best SKU
+PER_PRODUCT_RECOMMENDATIONS = os.getenv("RFP_PER_PRODUCT_RECOMMENDATIONS", "0") == "1"
 
-class TechnicalAgent:
-    """
-    End-to-end technical evaluation pipeline.
-    """
-
-    def __init__(self):
-        self.client = genai.Client()
-
-    # =================================================
-    # STEP 1️⃣ SCOPE OF SUPPLY (LLM)
-    # =================================================
-    def generate_scope_of_supply(
-        self,
-        extracted_rfp: Dict[str, Any],
-        technical_summary: Dict[str, Any],
-        scope_schema: Dict[str, Any],
-    ) -> Dict[str, Any]:
-
-        prompt = f"""
+SCOPE_PROMPT = """
 You are a TECHNICAL EVALUATION AGENT.
 
 Your task is to generate a STRUCTURED SCOPE OF SUPPLY SUMMARY.
@@ -51,92 +47,170 @@ RULES:
 - Exact specs only
 
 SCHEMA:
-{json.dumps(scope_schema, indent=2)}
+{{SCOPE_SCHEMA}}
 
 EXTRACTED RFP:
-{json.dumps(extracted_rfp, indent=2)}
+{{EXTRACTED_RFP_JSON}}
 
 TECHNICAL SUMMARY:
-{json.dumps(technical_summary, indent=2)}
+{{TECHNICAL_SUMMARY_JSON}}
 """
 
-        response = self.client.models.generate_content(
-            model=MODEL_NAME,
-            contents=[prompt],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            ),
-        )
 
-        return json.loads(response.text)
+class SpecStream:
+    """
+    Enforcement + OEM scoring of normalized specs while the LLM is
+    still generating them: pass `add` as the normalizer's on_spec.
+
+    The results are only used for the exact spec list they were built
+    from (a cached or re-generated response falls back to the batch
+    path), so streaming never changes the output.
+    """
+
+    def __init__(self, engine: OEMScoringEngine):
+        self.received: List[Dict[str, Any]] = []
+        self.enforcer = SpecEnforcer()
+        self.scorer = IncrementalScorer(engine)
+        self.failed = False
+
+    def add(self, spec: Dict[str, Any]) -> None:
+        self.received.append(spec)
+        if self.failed:
+            return
+        try:
+            enforced = self.enforcer.add(spec)
+            if enforced is not None:
+                self.scorer.add(enforced)
+        except (KeyError, TypeError, AttributeError):
+            # Malformed spec: enforce_all on the full list reports it
+            self.failed = True
+
+    def enforced_specs(self, normalized_specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self.failed and normalized_specs == self.received:
+            return self.enforcer.specs
+        return enforce_all(normalized_specs)
+
+    def top_3_oems(self, enforced_specs: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        if enforced_specs is not self.enforcer.specs:
+            return None
+        return self.scorer.rank(top_k=3, enforce_mandatory=ENFORCE_MANDATORY_SPECS)
+
+
+class TechnicalAgent:
+    """
+    End-to-end technical evaluation pipeline.
+    """
+
+    def __init__(self, client=None):
+        # Caller's client when running in-process, else the shared one
+        self.client = client or get_client()
 
     # =================================================
-    # STEP 2️⃣ FULL TECHNICAL PIPELINE
+    # STEP 1️⃣ SCOPE OF SUPPLY (LLM)
     # =================================================
-    def run(
+    def generate_scope_of_supply(
         self,
         extracted_rfp: Dict[str, Any],
         technical_summary: Dict[str, Any],
         scope_schema: Dict[str, Any],
-        oem_repo: List[Dict[str, Any]],
     ) -> Dict[str, Any]:
 
-        # -----------------------------
-        # 1️⃣ Scope of Supply
-        # -----------------------------
-        raw_scope = self.generate_scope_of_supply(
-            extracted_rfp=extracted_rfp,
-            technical_summary=technical_summary,
-            scope_schema=scope_schema,
+        prompt = get_template(
+            "scope_of_supply",
+            SCOPE_PROMPT,
+            SCOPE_SCHEMA=scope_schema,
+        ).render(
+            EXTRACTED_RFP_JSON=extracted_rfp,
+            TECHNICAL_SUMMARY_JSON=technical_summary,
         )
 
+        return generate_json(
+            client=self.client,
+            model=MODEL_NAME,
+            prompt=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json"
+            ),
+        )
+
+    # =================================================
+    # STEP 2️⃣ NORMALIZED RFP SPECS (LLM + ENFORCEMENT)
+    # =================================================
+    def normalize_specs(self, extracted_rfp: Dict[str, Any]) -> List[Dict[str, Any]]:
+        normalized_specs_llm = normalize_rfp_specs(
+            extracted_rfp_technical_specs=extracted_rfp,
+            client=self.client,
+        )
+        return enforce_all(normalized_specs_llm)
+
+    @staticmethod
+    def unwrap_scope(raw_scope: Dict[str, Any]) -> Dict[str, Any]:
         if "product_lines" in raw_scope:
-            scope_summary = raw_scope
-        elif "scope_of_supply_input" in raw_scope:
-            scope_summary = raw_scope["scope_of_supply_input"]
-        elif "data" in raw_scope:
-            scope_summary = raw_scope["data"]
-        else:
-            raise ValueError("Invalid scope_of_supply structure from LLM")
+            return raw_scope
+        if "scope_of_supply_input" in raw_scope:
+            return raw_scope["scope_of_supply_input"]
+        if "data" in raw_scope:
+            return raw_scope["data"]
+        raise ValueError("Invalid scope_of_supply structure from LLM")
 
+    # =================================================
+    # STEP 3️⃣ OEM RANKING + RECOMMENDATION TABLE
+    # =================================================
+    def recommend(
+        self,
+        raw_scope: Dict[str, Any],
+        enforced_specs: List[Dict[str, Any]],
+        oem_repo: List[Dict[str, Any]],
+        engine: Optional[OEMScoringEngine] = None,
+        recommender: Optional[FamilyRecommender] = None,
+        per_product: Optional[bool] = None,
+        top_3_oems: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        `top_3_oems`, when already ranked while the specs streamed in
+        (see SpecStream), skips ranking here.
+        """
 
-        # -----------------------------
-        # 2️⃣ Normalize Scope
-        # -----------------------------
-        normalized_scope = normalize_scope(scope_summary)
+        if per_product is None:
+            per_product = PER_PRODUCT_RECOMMENDATIONS
 
-        # -----------------------------
-        # 3️⃣ Normalize RFP Specs (LLM)
-        # -----------------------------
-        normalized_specs_llm = normalize_rfp_specs(
-            extracted_rfp_technical_specs=extracted_rfp
-        )
+        scope_summary = self.unwrap_scope(raw_scope)
 
         # -----------------------------
-        # 4️⃣ Enforce Normalized Specs
+        # Normalize Scope
         # -----------------------------
-        enforced_specs = enforce_all(normalized_specs_llm)
+        normalized_scope = normalize_scope(scope_summary)
 
         # -----------------------------
-        # 5️⃣ Rank OEMs
+        # Rank OEMs
         # -----------------------------
-        top_3_oems = rank_oem_skus(
-            rfp_specs=enforced_specs,
-            oem_repo=oem_repo,
-            top_k=3,
-        )
+        if top_3_oems is None:
+            top_3_oems = rank_oem_skus(
+                rfp_specs=enforced_specs,
+                oem_repo=oem_repo,
+                top_k=3,
+                engine=engine,
+                enforce_mandatory=ENFORCE_MANDATORY_SPECS,
+            )
 
         # -----------------------------
-        # 6️⃣ Final OEM Recommendation Table
+        # Final OEM Recommendation Table
         # -----------------------------
-        final_table = build_final_recommendation_table(
-            scope_summary=raw_scope,
-            ranked_oems=top_3_oems,
-        )
+        if per_product:
+            final_table = recommend_per_product(
+                scope_summary=scope_summary,
+                rfp_specs=enforced_specs,
+                engine=engine or get_engine(oem_repo),
+                recommender=recommender,
+                top_k=3,
+                enforce_mandatory=ENFORCE_MANDATORY_SPECS,
+            )
+        else:
+            final_table = build_final_recommendation_table(
+                scope_summary=raw_scope,
+                ranked_oems=top_3_oems,
+            )
 
-        # -----------------------------
-        # 7️⃣ RETURN TO MAIN AGENT
-        # -----------------------------
         return {
             "scope_of_supply_summary": scope_summary,
             "normalized_scope": normalized_scope,
@@ -145,6 +219,60 @@ TECHNICAL SUMMARY:
             "final_recommendation_table": final_table,
         }
 
+    # =================================================
+    # FULL TECHNICAL PIPELINE
+    # =================================================
+    def run(
+        self,
+        extracted_rfp: Dict[str, Any],
+        technical_summary: Dict[str, Any],
+        scope_schema: Dict[str, Any],
+        oem_repo: List[Dict[str, Any]],
+        engine: Optional[OEMScoringEngine] = None,
+        recommender: Optional[FamilyRecommender] = None,
+        per_product: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+
+        # 1️⃣ Scope of Supply and 2️⃣ normalized specs are independent
+        # LLM calls on the extracted RFP: run them concurrently, then
+        # 3️⃣ rank OEMs + build the recommendation table
+        dag = PipelineDAG([
+            Stage(
+                "raw_scope",
+                lambda extracted_rfp, technical_summary: self.generate_scope_of_supply(
+                    extracted_rfp=extracted_rfp,
+                    technical_summary=technical_summary,
+                    scope_schema=scope_schema,
+                ),
+                inputs=["extracted_rfp", "technical_summary"],
+            ),
+            Stage(
+                "enforced_specs",
+                lambda extracted_rfp: self.normalize_specs(extracted_rfp),
+                inputs=["extracted_rfp"],
+            ),
+            Stage(
+                "technical_agent_output",
+                lambda raw_scope, enforced_specs: self.recommend(
+                    raw_scope=raw_scope,
+                    enforced_specs=enforced_specs,
+                    oem_repo=oem_repo,
+                    engine=engine,
+                    recommender=recommender,
+                    per_product=per_product,
+                ),
+                inputs=["raw_scope", "enforced_specs"],
+            ),
+        ], enabled=False)
+
+        artifacts = dag.run({
+            "extracted_rfp": extracted_rfp,
+            "technical_summary": technical_summary,
+        })
+
+        # Returned to the main agent
+        return artifacts["technical_agent_output"]
+
 
 # =================================================
 # LOCAL TEST RUNNER
@@ -0,0 +1,213 @@
+"""
+topk_ranker.py
+
+Branch-and-bound top-k ranking over the columnar scoring engine.
+
+Same ranking as OEMScoringEngine.rank (rounded score, catalog order
+for ties), but without scoring the whole catalog:
+1. Per RFP spec, look up the matching SKU values (one row per SKU)
+2. Per-SKU upper bound = specs the SKU has a value for / total specs
+   (a spec contributes at most 1.0)
+3. SKUs are scored exactly in growing batches, best upper bound first; once
+   the best remaining bound can no longer reach the current k-th
+   score, the rest of the catalog is never scored
+4. Optionally, SKUs that have a value for a `mandatory` spec and fail
+   it are rejected before any scoring
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from agents.technical_agent.scoring_engine import OEMScoringEngine
+
+BATCH_SIZE = 256
+# Exact scoring switches to one dense pass once a batch would cover
+# more than 1/SPARSE_FRACTION of the remaining candidates
+SPARSE_FRACTION = 16
+
+
+def _ranked_entry(sku: str, score: float) -> Dict[str, Any]:
+    score = round(float(score), 4)
+    return {
+        "product_sku": sku,
+        "spec_match_score": score,
+        "spec_match_pct": round(score * 100, 2)
+    }
+
+
+def rank_top_k(
+    engine: OEMScoringEngine,
+    rfp_specs: List[Dict[str, Any]],
+    top_k: int = 3,
+    enforce_mandatory: bool = False,
+    candidates: Optional[np.ndarray] = None,
+    batch_size: int = BATCH_SIZE,
+    stats: Optional[Dict[str, int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Top-k SKUs for `rfp_specs`. With enforce_mandatory=False the
+    result is identical to engine.rank(rfp_specs, top_k).
+
+    `candidates` (engine SKU ids) restricts ranking to those SKUs.
+
+    `stats`, when given, is filled with scored / pruned / rejected
+    SKU counts.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({"skus": engine.n_skus if candidates is None else len(candidates), "scored": 0, "pruned": 0, "rejected": 0})
+
+    if top_k <= 0 or not engine.n_skus:
+        return []
+
+    rfp_specs = engine.unique_specs(rfp_specs)
+    n_specs = len(rfp_specs)
+    allowed = np.ones(engine.n_skus, dtype=bool)
+    if candidates is not None:
+        allowed[:] = False
+        allowed[candidates] = True
+
+    if not n_specs:
+        # Every SKU scores 0.0: catalog order decides
+        return [_ranked_entry(engine.skus[i], 0.0) for i in np.flatnonzero(allowed)[:top_k]]
+
+    # -----------------------------
+    # Bounds + mandatory rejection
+    # -----------------------------
+    lookups = []
+    rejected = np.zeros(engine.n_skus, dtype=bool)
+
+    for rfp in rfp_specs:
+        sku_ids, values = engine.first_values(
+            rfp["spec_key"],
+            rfp["variant_scope"]["pair_count"],
+        )
+        lookups.append((rfp, sku_ids, values))
+
+        if enforce_mandatory and rfp.get("mandatory") and len(sku_ids):
+            passed, _ = engine.spec_compliance(rfp, values)
+            rejected[sku_ids[~passed]] = True
+
+    coverage = np.bincount(
+        np.concatenate([sku_ids for _, sku_ids, _ in lookups]),
+        minlength=engine.n_skus,
+    )
+
+    eligible = np.flatnonzero(allowed & ~rejected)
+    stats["rejected"] = int((allowed & rejected).sum())
+
+    # Best bound first, catalog order within a bound
+    order = eligible[np.argsort(-coverage[eligible], kind="stable")]
+    bound_keys = np.round(coverage / n_specs, 4)
+
+    # -----------------------------
+    # Branch and bound
+    # -----------------------------
+    best_ids = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float64)
+
+    pos = 0
+    while pos < len(order):
+        kth_key = np.round(best_scores[-1], 4) if len(best_ids) == top_k else None
+        bound = bound_keys[order[pos]]
+
+        # Remaining SKUs can only tie on catalog order, never exceed
+        if kth_key is not None and bound < kth_key:
+            break
+
+        if coverage[order[pos]] == 0:
+            # No values at all: score is exactly 0, catalog order decides
+            batch = order[pos:pos + top_k]
+            scores = np.zeros(len(batch), dtype=np.float64)
+            pos = len(order)
+        else:
+            remaining = order[pos:]
+            if batch_size * SPARSE_FRACTION < len(remaining):
+                batch = remaining[:batch_size]
+                batch = batch[coverage[batch] > 0]
+                # Geometric growth: a weak bound reaches the dense
+                # pass after a few rounds, not one round per small batch
+                batch_size *= 2
+
+                totals = np.zeros(len(batch), dtype=np.float64)
+                for rfp, sku_ids, values in lookups:
+                    if not len(sku_ids):
+                        continue
+                    # sku_ids are sorted: binary search the batch members
+                    idx = np.searchsorted(sku_ids, batch)
+                    idx[idx == len(sku_ids)] = 0
+                    found = sku_ids[idx] == batch
+                    if found.any():
+                        totals[found] += engine.spec_scores(rfp, values[idx[found]])
+            else:
+                # Bound is too weak to pay off: one dense pass over the rest
+                batch = remaining[coverage[remaining] > 0]
+                dense = np.zeros(engine.n_skus, dtype=np.float64)
+                for rfp, sku_ids, values in lookups:
+                    if len(sku_ids):
+                        dense[sku_ids] += engine.spec_scores(rfp, values)
+                totals = dense[batch]
+
+            pos += len(batch)
+            scores = totals / n_specs
+
+        stats["scored"] += len(batch)
+
+        # Keep the k best by (rounded score desc, catalog order)
+        best_ids = np.concatenate([best_ids, batch])
+        best_scores = np.concatenate([best_scores, scores])
+        keep = np.lexsort((best_ids, -np.round(best_scores, 4)))[:top_k]
+        best_ids, best_scores = best_ids[keep], best_scores[keep]
+
+    stats["pruned"] = len(eligible) - stats["scored"]
+
+    return [
+        _ranked_entry(engine.skus[i], score)
+        for i, score in zip(best_ids, best_scores)
+    ]
+
+
+class IncrementalScorer:
+    """
+    Scores RFP specs one at a time as they arrive (e.g. streamed from
+    the LLM), so the catalog lookup and compliance scoring overlap
+    with generation; rank() then only sums the per-spec scores.
+
+    Same result as rank_top_k over the specs added (deduplicated on
+    (spec_key, pair_count), last wins, summed in the same order).
+    """
+
+    def __init__(self, engine: OEMScoringEngine):
+        self.engine = engine
+        # (spec_key, pair_count) -> (sku ids, scores, SKUs failing it if mandatory)
+        self._specs: Dict[Any, Any] = {}
+
+    def add(self, rfp_spec: Dict[str, Any]) -> None:
+        sku_ids, values = self.engine.first_values(
+            rfp_spec["spec_key"],
+            rfp_spec["variant_scope"]["pair_count"],
+        )
+        passed, quality = self.engine.spec_compliance(rfp_spec, values)
+        failed = sku_ids[~passed] if rfp_spec.get("mandatory") else sku_ids[:0]
+        key = (rfp_spec["spec_key"], rfp_spec["variant_scope"]["pair_count"])
+        self._specs[key] = (sku_ids, np.where(passed, quality, 0.0), failed)
+
+    def rank(self, top_k: int = 3, enforce_mandatory: bool = False) -> List[Dict[str, Any]]:
+        engine = self.engine
+        if top_k <= 0 or not engine.n_skus:
+            return []
+
+        n_specs = len(self._specs)
+        allowed = np.ones(engine.n_skus, dtype=bool)
+        totals = np.zeros(engine.n_skus, dtype=np.float64)
+        for sku_ids, scores, failed in self._specs.values():
+            if len(sku_ids):
+                totals[sku_ids] += scores
+            if enforce_mandatory:
+                allowed[failed] = False
+
+        scores = totals / n_specs if n_specs else totals
+        eligible = np.flatnonzero(allowed)
+        keys = np.round(scores[eligible], 4)
+        order = eligible[np.argsort(-keys, kind="stable")][:top_k]
+        return [_ranked_entry(engine.skus[i], scores[i]) for i in order]
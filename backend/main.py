@@ -1,70 +1,295 @@
 # backend/main.py
 
-from fastapi import FastAPI, UploadFile, File
+import asyncio
 import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
 
-from agents.main_agent.main_agent import run_pipeline
-from agents.technical_agent.normalize_scope_of_summary import normalize_scope
-from agents.technical_agent.normalize_rfp_specs import normalize_rfp_specs
-from agents.technical_agent.sku_matcher import SKUMatcher
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+# Heavy modules (agents, PyMuPDF, google-genai, NumPy) are imported
+# where used; services.startup loads them up front (GET /ready)
+from services.jobs import JobManager, JobQueueFull, SUCCEEDED, FAILED
+from services.startup import readiness
 
 app = FastAPI(title="RFP BidAssist AI Backend")
 
-@app.post("/run-rfp")
-async def run_rfp(file: UploadFile = File(...)):
+# Bounded pool: the event loop only enqueues, workers run the pipeline
+jobs = JobManager(
+    max_workers=int(os.getenv("RFP_MAX_WORKERS", "4")),
+    max_pending=int(os.getenv("RFP_MAX_PENDING_JOBS", "100")),
+)
+
+# Coalesce uploads of the same PDF (same prompts / catalog) into one run
+DEDUP_UPLOADS = os.getenv("RFP_DEDUP", "1").lower() not in ("0", "false", "off")
+
+# Server-sent events: how often a stream checks its job for new
+# events, and how long it may stay silent before a keep-alive comment
+SSE_POLL_INTERVAL_S = float(os.getenv("RFP_SSE_POLL_INTERVAL", "0.2"))
+SSE_KEEPALIVE_S = float(os.getenv("RFP_SSE_KEEPALIVE", "15"))
+
+
+def upload_key(pdf_bytes: bytes) -> str:
+    from agents.main_agent.main_agent import rfp_run_key
+    return rfp_run_key(pdf_bytes)
+
+
+def run_rfp_job(pdf_bytes: bytes, filename: str, report_stage, publish) -> dict:
     """
-    Full RFP Pipeline:
+    Full RFP Pipeline (runs on a worker thread):
     1. Extract RFP
     2. Create technical + pricing summaries
     3. Normalize scope & specs
     4. Match OEM SKUs
     5. Return everything for frontend
+
+    Each dashboard section is published as soon as its stage finishes
+    (GET /jobs/{job_id}/events).
     """
 
+    from agents.main_agent.main_agent import run_pipeline, build_rfp_response
+
     # ----------------------------
     # 1. Run main extraction pipeline
     # ----------------------------
-    pipeline_output = run_pipeline(file)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = Path(tmp_dir) / (Path(filename or "").name or "rfp.pdf")
+        pdf_path.write_bytes(pdf_bytes)
 
-    # Expected keys from run_pipeline
-    scope_summary = pipeline_output["scope_of_supply_summary"]
-    extracted_rfp = pipeline_output["extracted_rfp"]
+        pipeline_output = run_pipeline(
+            str(pdf_path),
+            on_stage=report_stage,
+            on_event=publish,
+        )
 
     # ----------------------------
-    # 2. Normalize for matching
+    # 2. SKU comparison + API Response (Frontend-ready)
     # ----------------------------
-    normalized_scope = normalize_scope(scope_summary)
-    normalized_specs = normalize_rfp_specs(extracted_rfp)
+    report_stage("comparison_table")
+    return build_rfp_response(pipeline_output)
 
-    # ----------------------------
-    # 3. Load OEM data
-    # ----------------------------
-    with open("oem_datasheets/oem_products.json") as f:
-        oem_products = json.load(f)
 
-    with open("oem_datasheets/oem_product_sku.json") as f:
-        oem_specs = json.load(f)
+@app.post("/run-rfp", status_code=202)
+async def run_rfp(file: UploadFile = File(...)):
+    """
+    Enqueue the RFP pipeline and return a job id immediately.
+    Poll GET /jobs/{job_id} for stage status and
+    GET /jobs/{job_id}/result for the final payload, or stream
+    GET /jobs/{job_id}/events to get each section as it is ready.
 
-    # ----------------------------
-    # 4. SKU Matching
-    # ----------------------------
-    matcher = SKUMatcher(
-        normalized_scope=normalized_scope,
-        oem_products=oem_products,
-        oem_specs=oem_specs
-    )
+    Uploading a PDF that is already being processed (or was processed
+    recently with the same prompts, schemas and catalog) returns the
+    existing job (`deduplicated: true`) instead of re-running Gemini.
+    """
+    pdf_bytes = await file.read()
+    # Hashing + pipeline version: off the event loop
+    key = await run_in_threadpool(upload_key, pdf_bytes) if DEDUP_UPLOADS else None
 
-    top_3_skus, spec_match_matrix = matcher.recommend_top_skus(normalized_specs)
+    try:
+        job, created = jobs.submit_once(key, run_rfp_job, pdf_bytes, file.filename, filename=file.filename)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "deduplicated": not created,
+        "status_url": f"/jobs/{job.job_id}",
+        "result_url": f"/jobs/{job.job_id}/result",
+        "events_url": f"/jobs/{job.job_id}/events",
+    }
+
+
+def run_rfp_batch_job(uploads: List[Tuple[bytes, str]], report_stage, publish) -> dict:
+    """Pipelined batch run over several uploaded PDFs (one job)."""
+    from services.batch import BatchRunner
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i, (pdf_bytes, filename) in enumerate(uploads):
+            # Index prefix keeps duplicate upload names apart
+            path = Path(tmp_dir) / f"{i:04d}_{Path(filename or '').name or 'rfp.pdf'}"
+            path.write_bytes(pdf_bytes)
+            paths.append(path)
+
+        finished = []
+
+        def on_document(doc):
+            finished.append(doc["filename"])
+            report_stage(f"{len(finished)}/{len(paths)} documents")
+            publish("document", {
+                "filename": uploads[doc["index"]][1],
+                "status": doc["status"],
+                "error": doc["error"],
+            })
+
+        batch = BatchRunner(on_document=on_document).run(paths)
 
-    # ----------------------------
-    # 5. API Response (Frontend-ready)
-    # ----------------------------
     return {
-        "rfp_metadata": pipeline_output.get("rfp_metadata"),
-        "technical_summary": pipeline_output.get("technical_summary"),
-        "scope_of_supply_summary": scope_summary,
-        "normalized_scope": normalized_scope,
-        "normalized_specs": normalized_specs,
-        "top_3_oem_recommendations": top_3_skus,
-        "spec_match_matrix": spec_match_matrix
+        "report": batch["report"],
+        "documents": [
+            {
+                "filename": uploads[d["index"]][1],
+                "status": d["status"],
+                "error": d["error"],
+                "timings": d["timings"],
+                "result": d["result"],
+            }
+            for d in batch["documents"]
+        ],
     }
+
+
+@app.post("/run-rfp-batch", status_code=202)
+async def run_rfp_batch(files: List[UploadFile] = File(...)):
+    """
+    Enqueue one pipelined batch job for several RFP PDFs. The result
+    holds every document's payload plus a throughput report.
+    """
+    uploads = [(await f.read(), f.filename) for f in files]
+
+    try:
+        job = jobs.submit(run_rfp_batch_job, uploads, filename=f"{len(uploads)} files")
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}",
+        "result_url": f"/jobs/{job.job_id}/result",
+        "events_url": f"/jobs/{job.job_id}/events",
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+
+    if job.status != SUCCEEDED:
+        # Not ready yet: 202 with the current status
+        return JSONResponse(status_code=202, content=job.to_dict())
+
+    return job.result
+
+
+def format_sse(event: dict) -> str:
+    data = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-sent events for a job: `stage` progress, one event per
+    dashboard section as soon as it is ready (`rfp_metadata`,
+    `technical_summary`, `scope_of_supply`, `normalized_specs`,
+    `top_3_oems`, `pricing_summary`), then `result` or `error`.
+    Reconnecting clients resume after their Last-Event-ID.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+
+    try:
+        last_id = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_id = 0
+
+    async def event_stream():
+        nonlocal last_id
+        idle_s = 0.0
+        while True:
+            events, finished = jobs.events_since(job, last_id)
+            for event in events:
+                yield format_sse(event)
+                last_id = event["id"]
+            if finished:
+                return
+
+            if events:
+                idle_s = 0.0
+            elif idle_s >= SSE_KEEPALIVE_S:
+                yield ": keep-alive\n\n"
+                idle_s = 0.0
+            if await request.is_disconnected():
+                return
+
+            await asyncio.sleep(SSE_POLL_INTERVAL_S)
+            idle_s += SSE_POLL_INTERVAL_S
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/catalog")
+async def catalog_summary():
+    from services.catalog import get_catalog
+    return get_catalog().summary()
+
+
+@app.get("/llm-cache/stats")
+async def llm_cache_stats():
+    from services.llm_cache import get_cache
+    return get_cache().stats()
+
+
+@app.get("/llm-rate/stats")
+async def llm_rate_stats():
+    from services.rate_limiter import get_limiter
+    return get_limiter().stats()
+
+
+@app.get("/llm-prompts/stats")
+async def llm_prompt_stats():
+    """Characters / estimated tokens of the prompts sent, per stage."""
+    from services.prompt_builder import prompt_stats
+    return prompt_stats()
+
+
+@app.get("/ready")
+async def ready():
+    """200 once prewarm finished (modules, prompts, catalog, client), else 503."""
+    state = readiness.to_dict()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
+@app.on_event("startup")
+def prewarm():
+    # Imports, prompts/schemas, OEM catalog index + Gemini client;
+    # in the background unless RFP_PREWARM_BACKGROUND=0
+    readiness.start()
+
+
+@app.on_event("shutdown")
+def shutdown_jobs():
+    from agents.technical_agent.product_recommender import shutdown_pool
+    from services.catalog import get_catalog_service
+    from services.llm_client import close_client
+    from services import pdf_utils
+
+    jobs.shutdown(wait=False)
+    get_catalog_service().stop()
+    shutdown_pool()
+    pdf_utils.shutdown_pool()
+    close_client()
@@ -0,0 +1,346 @@
+# backend/services/batch.py
+#
+# Batch RFP processing with stage-level pipelining.
+#
+#   python -m services.batch samples/                      # every PDF in a directory
+#   python -m services.batch a.pdf b.pdf --out outputs/batch
+#
+# Each document flows through the stages below; every stage has its
+# own worker pool, so while one tender is waiting on Gemini the next
+# one is already being parsed. PDF parsing goes through the shared
+# pdf_utils process pool (CPU); the other stages are slices of the
+# API's stage DAG (build_rfp_dag), so unchanged outputs are reused.
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services import pdf_utils
+
+# -------------------------------------------------
+# STAGES + CONCURRENCY LIMITS
+# -------------------------------------------------
+STAGES = ["parse", "extract", "summarize", "score", "pricing"]
+
+DEFAULT_LIMITS = {
+    "parse": int(os.getenv("RFP_BATCH_PARSE_WORKERS", str(pdf_utils.DEFAULT_WORKERS))),
+    "extract": int(os.getenv("RFP_BATCH_EXTRACT_CONCURRENCY", "4")),
+    "summarize": int(os.getenv("RFP_BATCH_SUMMARIZE_CONCURRENCY", "4")),
+    "score": int(os.getenv("RFP_BATCH_SCORE_CONCURRENCY", "2")),
+    "pricing": int(os.getenv("RFP_BATCH_PRICING_CONCURRENCY", "4")),
+}
+
+# Pipeline DAG artifacts each batch stage produces (with whatever
+# upstream stages they need that an earlier batch stage did not run)
+DAG_TARGETS = {
+    "extract": ["extracted_rfp"],
+    "summarize": ["technical_summary"],
+    "score": ["technical_agent_output"],
+    "pricing": ["pricing_summary"],
+}
+
+
+class _ParsedExtractor:
+    """
+    Extractor for one batch document: the DAG's extraction stage reads
+    the pages the parse stage already produced instead of parsing the
+    PDF again.
+    """
+
+    def __init__(self, extractor, state: Dict[str, Any]):
+        self.extractor = extractor
+        self.state = state
+
+    def extract(self, pdf_path: str) -> Dict[str, Any]:
+        pages = self.state.pop("pages", None)
+        if pages is None:
+            return self.extractor.extract(pdf_path)
+        return self.extractor.extract_pages(pages)
+
+
+def collect_pdfs(inputs: Iterable[str]) -> List[Path]:
+    """Expand directories to their *.pdf files (sorted); keep files as given."""
+    paths: List[Path] = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            paths.extend(sorted(p for p in path.iterdir() if p.suffix.lower() == ".pdf"))
+        else:
+            paths.append(path)
+    return paths
+
+
+# -------------------------------------------------
+# BATCH RUNNER
+# -------------------------------------------------
+class BatchRunner:
+    """
+    Pipelined runner for many RFP PDFs.
+
+    `on_document(doc)` is called (from a worker thread) as each
+    document finishes, successfully or not.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        on_document: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.on_document = on_document
+
+        # Imported here so pdf_utils pool workers (spawned, re-importing
+        # this module under `python -m`) never load the agents / Gemini client
+        from agents.main_agent.main_agent import MainAgent, build_extractor
+
+        self.extractor = build_extractor()
+        self.agent = MainAgent()
+
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._remaining = 0
+        self._busy: Dict[str, float] = {}
+
+    # ---- stage functions: value in -> value out ----
+    def _parse(self, doc, pdf_path):
+        from agents.main_agent.main_agent import build_rfp_dag
+        from services.catalog import get_catalog
+
+        # One DAG (and catalog snapshot) per document for all its stages
+        state = {"artifacts": {"pdf": Path(pdf_path)}, "stages": []}
+        state["dag"] = build_rfp_dag(self.agent, _ParsedExtractor(self.extractor, state), get_catalog())
+
+        # No need to parse when the extraction is reused
+        if state["dag"].stored_output("extracted_rfp", state["artifacts"]) is None:
+            state["pages"] = list(pdf_utils.iter_pages(pdf_path))
+        return state
+
+    def _run_dag(self, stage, state):
+        artifacts = state["dag"].run(
+            state["artifacts"],
+            targets=DAG_TARGETS[stage],
+            # Not stored in an earlier step: neither is anything built on it
+            incomplete=[s["stage"] for s in state["stages"] if s["incomplete"]],
+        )
+        state["stages"].extend(artifacts.pop("_stages"))
+        state["artifacts"] = artifacts
+        return state
+
+    def _pricing(self, doc, state):
+        from agents.main_agent.main_agent import build_rfp_response, finalize_results
+
+        artifacts = self._run_dag("pricing", state)["artifacts"]
+        results = {
+            "technical_summary": artifacts["technical_summary"],
+            "technical_agent_output": artifacts["technical_agent_output"],
+            "pricing_summary": artifacts["pricing_summary"],
+            "pipeline_stages": state["stages"],
+        }
+        return build_rfp_response(finalize_results(artifacts["extracted_rfp"], results))
+
+    # ---- scheduling ----
+    def run(self, pdf_paths: Iterable[str]) -> Dict[str, Any]:
+        paths = [Path(p) for p in pdf_paths]
+        docs = [
+            {
+                "index": i,
+                "filename": path.name,
+                "path": str(path),
+                "status": "queued",
+                "stage": None,
+                "timings": {},
+                "result": None,
+                "error": None,
+            }
+            for i, path in enumerate(paths)
+        ]
+
+        self._busy = {stage: 0.0 for stage in STAGES}
+        self._remaining = len(docs)
+
+        self._executors = {
+            stage: ThreadPoolExecutor(
+                max_workers=self.limits[stage],
+                thread_name_prefix=f"rfp-batch-{stage}",
+            )
+            for stage in STAGES
+        }
+        self._handlers = {
+            "parse": self._parse,
+            "extract": lambda doc, state: self._run_dag("extract", state),
+            "summarize": lambda doc, state: self._run_dag("summarize", state),
+            "score": lambda doc, state: self._run_dag("score", state),
+            "pricing": self._pricing,
+        }
+
+        print(f"📚 Batch: {len(docs)} documents, limits {self.limits}")
+        started = time.time()
+        try:
+            for doc in docs:
+                self._submit(doc, 0, doc["path"])
+
+            with self._done:
+                while self._remaining:
+                    self._done.wait()
+        finally:
+            for executor in self._executors.values():
+                executor.shutdown(wait=True)
+
+        wall_s = time.time() - started
+        return {
+            "documents": docs,
+            "report": self.throughput_report(docs, wall_s),
+        }
+
+    def _submit(self, doc: Dict[str, Any], stage_index: int, value: Any) -> None:
+        stage = STAGES[stage_index]
+        queued_at = time.time()
+
+        def call():
+            started = time.time()
+            doc["status"], doc["stage"] = "running", stage
+            try:
+                return started, self._handlers[stage](doc, value)
+            except Exception as e:
+                e.stage_started = started
+                raise
+
+        future = self._executors[stage].submit(call)
+        future.add_done_callback(
+            lambda f: self._on_stage_done(doc, stage_index, queued_at, f)
+        )
+
+    def _on_stage_done(
+        self,
+        doc: Dict[str, Any],
+        stage_index: int,
+        queued_at: float,
+        future: Future,
+    ) -> None:
+        stage = STAGES[stage_index]
+        finished = time.time()
+        error = future.exception()
+
+        if error is None:
+            started, value = future.result()
+        else:
+            value = None
+            started = getattr(error, "stage_started", queued_at)
+
+        with self._lock:
+            self._busy[stage] += finished - started
+        doc["timings"][stage] = {
+            "wait_s": round(started - queued_at, 3),
+            "run_s": round(finished - started, 3),
+        }
+
+        if error is not None:
+            doc["status"] = "failed"
+            doc["error"] = f"{stage}: {type(error).__name__}: {error}"
+            print(f"❌ {doc['filename']} failed in {stage}: {error}")
+            self._finish(doc)
+        elif stage_index + 1 < len(STAGES):
+            try:
+                self._submit(doc, stage_index + 1, value)
+            except Exception as e:
+                doc["status"] = "failed"
+                doc["error"] = f"{STAGES[stage_index + 1]}: {type(e).__name__}: {e}"
+                self._finish(doc)
+        else:
+            doc["status"] = "succeeded"
+            doc["stage"] = "done"
+            doc["result"] = value
+            print(f"✅ {doc['filename']} done")
+            self._finish(doc)
+
+    def _finish(self, doc: Dict[str, Any]) -> None:
+        if self.on_document is not None:
+            try:
+                self.on_document(doc)
+            except Exception as e:
+                print(f"⚠️ on_document callback failed: {e}")
+        with self._done:
+            self._remaining -= 1
+            self._done.notify_all()
+
+    # ---- reporting ----
+    def throughput_report(self, docs: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+        """docs/hour plus per-stage busy time and utilization (busy / (wall × limit))."""
+        succeeded = sum(1 for d in docs if d["status"] == "succeeded")
+        stages = {}
+        for stage in STAGES:
+            runs = [d["timings"][stage] for d in docs if stage in d["timings"]]
+            busy = self._busy.get(stage, 0.0)
+            stages[stage] = {
+                "concurrency": self.limits[stage],
+                "documents": len(runs),
+                "busy_s": round(busy, 3),
+                "avg_run_s": round(busy / len(runs), 3) if runs else 0.0,
+                "avg_wait_s": round(sum(r["wait_s"] for r in runs) / len(runs), 3) if runs else 0.0,
+                "utilization": round(busy / (wall_s * self.limits[stage]), 3) if wall_s else 0.0,
+            }
+
+        return {
+            "documents": len(docs),
+            "succeeded": succeeded,
+            "failed": len(docs) - succeeded,
+            "wall_s": round(wall_s, 3),
+            "docs_per_hour": round(succeeded * 3600 / wall_s, 2) if wall_s else 0.0,
+            "stages": stages,
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"📊 {report['succeeded']}/{report['documents']} documents in {report['wall_s']}s "
+        f"({report['docs_per_hour']} docs/hour)",
+        f"{'stage':<10} {'limit':>5} {'docs':>5} {'busy s':>9} {'avg run':>9} {'avg wait':>9} {'util':>6}",
+    ]
+    for stage, s in report["stages"].items():
+        lines.append(
+            f"{stage:<10} {s['concurrency']:>5} {s['documents']:>5} {s['busy_s']:>9} "
+            f"{s['avg_run_s']:>9} {s['avg_wait_s']:>9} {s['utilization']:>6.0%}"
+        )
+    return "\n".join(lines)
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the RFP pipeline over many PDFs")
+    parser.add_argument("inputs", nargs="+", help="PDF files and/or directories of PDFs")
+    parser.add_argument("--out", default="outputs/batch", help="Directory for per-document results")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}-workers", type=int, default=DEFAULT_LIMITS[stage])
+    args = parser.parse_args()
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def save(doc):
+        if doc["result"] is not None:
+            with open(out_dir / f"{Path(doc['filename']).stem}.json", "w", encoding="utf-8") as f:
+                json.dump(doc["result"], f, indent=2)
+
+    runner = BatchRunner(
+        limits={stage: getattr(args, f"{stage}_workers") for stage in STAGES},
+        on_document=save,
+    )
+    batch = runner.run(collect_pdfs(args.inputs))
+
+    with open(out_dir / "batch_report.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "report": batch["report"],
+            "documents": [
+                {k: d[k] for k in ("filename", "status", "error", "timings")}
+                for d in batch["documents"]
+            ],
+        }, f, indent=2)
+
+    print(format_report(batch["report"]))
@@ -0,0 +1,211 @@
+# backend/services/catalog.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agents.technical_agent.final_oem_recommender import FamilyRecommender
+from agents.technical_agent.scoring_engine import OEMScoringEngine
+from services.catalog_binary import MAGIC, CompiledCatalog
+
+# -------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATASHEET_DIR = PROJECT_ROOT / "oem_datasheets"
+
+CATALOG_FILES = {
+    "products": DATASHEET_DIR / "oem_products.json",
+    "product_specs": DATASHEET_DIR / "oem_product_sku.json",
+    # Either normalized_oem.json or a file compiled with
+    # `python -m services.catalog_binary compile ...`
+    "normalized": Path(os.getenv(
+        "RFP_NORMALIZED_CATALOG",
+        str(DATASHEET_DIR / "normalized_oem.json"),
+    )),
+}
+
+POLL_SECONDS = float(os.getenv("RFP_CATALOG_POLL_SECONDS", "5"))
+
+
+# -------------------------------------------------
+# IMMUTABLE CATALOG SNAPSHOT
+# -------------------------------------------------
+class CatalogIndex:
+    """
+    One parsed + indexed version of the OEM datasheet files.
+    Never mutated after construction, so readers can hold a
+    reference for a whole request while a reload swaps in a new one.
+    """
+
+    def __init__(
+        self,
+        products: List[Dict[str, Any]],
+        product_specs: List[Dict[str, Any]],
+        normalized,
+        version: str,
+    ):
+        self.products = products
+        self.product_specs = product_specs
+        self.normalized = normalized
+        self.version = version
+        self.loaded_at = time.time()
+
+        # Columnar scoring engine over the normalized rows
+        # (zero-copy mmap columns for a compiled catalog)
+        if isinstance(normalized, CompiledCatalog):
+            self.engine = normalized.to_engine()
+        else:
+            self.engine = OEMScoringEngine.from_rows(normalized)
+
+    # SKU → spec_key lookups go through the engine, family → SKUs
+    # through the recommender; no row-level dict index is kept
+    @cached_property
+    def recommender(self) -> FamilyRecommender:
+        """Catalog partitioned by RFP product family (built once per version)."""
+        return FamilyRecommender(self.products, self.normalized)
+
+    @classmethod
+    def load(cls, files: Dict[str, Path] = CATALOG_FILES) -> "CatalogIndex":
+        files = {name: Path(path) for name, path in files.items()}
+        digest = hashlib.sha256()
+
+        with open(files["normalized"], "rb") as f:
+            compiled = f.read(len(MAGIC)) == MAGIC
+
+        if compiled:
+            normalized = CompiledCatalog.open(files["normalized"])
+            stat = files["normalized"].stat()
+            digest.update(f"compiled:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+            json_files = ("products", "product_specs")
+        else:
+            json_files = ("products", "product_specs", "normalized")
+
+        payloads = {name: files[name].read_bytes() for name in json_files}
+        for name in sorted(payloads):
+            digest.update(name.encode("utf-8"))
+            digest.update(payloads[name])
+
+        if not compiled:
+            normalized = json.loads(payloads["normalized"])
+
+        return cls(
+            products=json.loads(payloads["products"]),
+            product_specs=json.loads(payloads["product_specs"]),
+            normalized=normalized,
+            version=digest.hexdigest()[:16],
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "products": len(self.products),
+            "normalized_rows": len(self.normalized),
+            "skus": self.engine.n_skus,
+            "families": len({p["product_family"] for p in self.products}),
+        }
+
+
+# -------------------------------------------------
+# HOT-RELOADING SERVICE
+# -------------------------------------------------
+class CatalogService:
+    """
+    Holds the current CatalogIndex and swaps in a new one when the
+    datasheet files change on disk (mtime/size polling). A failed
+    reload keeps serving the previous index.
+    """
+
+    def __init__(
+        self,
+        files: Dict[str, Path] = CATALOG_FILES,
+        poll_seconds: float = POLL_SECONDS,
+    ):
+        self.files = {name: Path(path) for name, path in files.items()}
+        self.poll_seconds = poll_seconds
+
+        self._index: Optional[CatalogIndex] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> CatalogIndex:
+        index = self._index
+        if index is None:
+            self.reload()
+            index = self._index
+        return index
+
+    def _file_stamp(self):
+        return tuple(
+            (name, path.stat().st_mtime_ns, path.stat().st_size)
+            for name, path in sorted(self.files.items())
+        )
+
+    def reload(self) -> bool:
+        """(Re)build the index if the files changed. Returns True on swap."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if self._index is not None and stamp == self._stamp:
+                return False
+
+            index = CatalogIndex.load(self.files)
+            # Single reference assignment: readers see old or new, never half
+            self._index = index
+            self._stamp = stamp
+
+        print(f"📚 OEM catalog loaded (version {index.version}, {index.engine.n_skus} SKUs)")
+        return True
+
+    def start(self) -> None:
+        self.current
+        if self._watcher is not None or self.poll_seconds <= 0:
+            return
+
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch,
+            name="catalog-watcher",
+            daemon=True,
+        )
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_seconds + 1)
+            self._watcher = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"⚠️ OEM catalog reload failed, keeping previous version: {e}")
+
+
+# -------------------------------------------------
+# PROCESS-WIDE SERVICE
+# -------------------------------------------------
+_service: Optional[CatalogService] = None
+_service_lock = threading.Lock()
+
+
+def get_catalog_service() -> CatalogService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CatalogService()
+        return _service
+
+
+def get_catalog() -> CatalogIndex:
+    return get_catalog_service().current
@@ -0,0 +1,362 @@
+# backend/services/catalog_binary.py
+#
+# Compact columnar file for the normalized OEM catalog.
+#
+#   python -m services.catalog_binary compile oem_datasheets/normalized_oem.json oem_datasheets/normalized_oem.rfpcat
+#   python -m services.catalog_binary dump    oem_datasheets/normalized_oem.rfpcat normalized_oem.debug.json
+#
+# Layout:
+#   MAGIC (8 bytes) | header length (uint64) | JSON header | padding | columns
+# Every column is a little-endian array aligned to 8 bytes, so a mmap of
+# the file gives zero-copy NumPy views. String fields are interned into
+# per-field tables (ids in first-appearance order, -1 = null).
+
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from agents.technical_agent.scoring_engine import OEMScoringEngine
+
+# -------------------------------------------------
+# FORMAT
+# -------------------------------------------------
+MAGIC = b"RFPCAT01"
+FORMAT_VERSION = 1
+ALIGN = 8
+
+STRING_FIELDS = [
+    "oem_id",
+    "product_sku",
+    "spec_key",
+    "operator",
+    "unit",
+    "variant_id",
+    "test_conditions",   # canonical JSON text
+    "source",
+    "datasheet_ref",
+    "extra",             # JSON of any non-standard keys
+]
+
+NUMERIC_FIELDS = [
+    "value_exact",
+    "value_min",
+    "value_max",
+    "tolerance",
+    "pair_count",
+]
+
+KNOWN_KEYS = {
+    "oem_id", "product_sku", "spec_key", "operator", "unit", "value",
+    "tolerance", "test_conditions", "variant_scope", "source", "datasheet_ref",
+}
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _numeric(value: Any, field: str) -> float:
+    if value is None:
+        return np.nan
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field}: expected a number, got {value!r}")
+    return float(value)
+
+
+# -------------------------------------------------
+# COMPILER
+# -------------------------------------------------
+def compile_catalog(rows: List[Dict[str, Any]], output_path: Path) -> Dict[str, Any]:
+    """Write normalized OEM rows to the columnar format. Returns the header."""
+    n = len(rows)
+
+    tables: Dict[str, Dict[str, int]] = {field: {} for field in STRING_FIELDS}
+    string_ids = {field: np.full(n, -1, dtype=np.int32) for field in STRING_FIELDS}
+    numbers = {field: np.full(n, np.nan, dtype=np.float64) for field in NUMERIC_FIELDS}
+    # bit i set = NUMERIC_FIELDS[i] was an int in the source JSON
+    int_mask = np.zeros(n, dtype=np.uint8)
+    # exact > max > min, precomputed for the scoring engine
+    score_value = np.full(n, np.nan, dtype=np.float64)
+
+    def intern(field: str, i: int, text: Optional[str]) -> None:
+        if text is None:
+            return
+        table = tables[field]
+        string_ids[field][i] = table.setdefault(text, len(table))
+
+    for i, row in enumerate(rows):
+        value = row.get("value") or {}
+        scope = row.get("variant_scope") or {}
+        test_conditions = row.get("test_conditions")
+        extra = {k: v for k, v in row.items() if k not in KNOWN_KEYS}
+
+        intern("oem_id", i, row.get("oem_id"))
+        intern("product_sku", i, row["product_sku"])
+        intern("spec_key", i, row["spec_key"])
+        intern("operator", i, row.get("operator"))
+        intern("unit", i, row.get("unit"))
+        intern("variant_id", i, scope.get("variant_id"))
+        intern("source", i, row.get("source"))
+        intern("datasheet_ref", i, row.get("datasheet_ref"))
+        if test_conditions is not None:
+            intern("test_conditions", i, json.dumps(test_conditions, separators=(",", ":")))
+        if extra:
+            intern("extra", i, json.dumps(extra, separators=(",", ":")))
+
+        raw = {
+            "value_exact": value.get("exact"),
+            "value_min": value.get("min"),
+            "value_max": value.get("max"),
+            "tolerance": row.get("tolerance"),
+            "pair_count": scope.get("pair_count"),
+        }
+        for bit, field in enumerate(NUMERIC_FIELDS):
+            numbers[field][i] = _numeric(raw[field], field)
+            if isinstance(raw[field], int):
+                int_mask[i] |= 1 << bit
+
+        for field in ("exact", "max", "min"):
+            if value.get(field) is not None:
+                score_value[i] = float(value[field])
+                break
+
+    # ---- Column payloads ----
+    arrays: Dict[str, np.ndarray] = {}
+    for field in STRING_FIELDS:
+        arrays[f"{field}.ids"] = string_ids[field]
+        encoded = [s.encode("utf-8") for s in tables[field]]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+        arrays[f"{field}.offsets"] = offsets
+        arrays[f"{field}.blob"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    for field in NUMERIC_FIELDS:
+        arrays[field] = numbers[field]
+    arrays["int_mask"] = int_mask
+    arrays["score_value"] = score_value
+
+    columns = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        arrays[name] = array
+        columns[name] = {
+            "dtype": array.dtype.str,
+            "offset": offset,
+            "count": int(array.size),
+        }
+        offset = _align(offset + array.nbytes)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "rows": n,
+        "columns": columns,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + columns[name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+
+    # Atomic replace: readers never see a half-written file
+    tmp_path.replace(output_path)
+    return header
+
+
+# -------------------------------------------------
+# MMAP READER
+# -------------------------------------------------
+class CompiledCatalog:
+    """
+    Read-only, memory-mapped view of a compiled catalog.
+
+    Behaves like a list of normalized OEM row dicts (len / index /
+    iterate; rows are materialized on access), and exposes the
+    columns directly for the scoring engine.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a compiled OEM catalog")
+
+        (header_len,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[header_start:header_start + header_len])
+        if self.header["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog format {self.header['format_version']}")
+
+        data_start = _align(header_start + header_len)
+        self.n_rows = self.header["rows"]
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.frombuffer(
+                self._mmap,
+                dtype=np.dtype(spec["dtype"]),
+                count=spec["count"],
+                offset=data_start + spec["offset"],
+            )
+            for name, spec in self.header["columns"].items()
+        }
+        self._tables: Dict[str, List[str]] = {}
+
+    @classmethod
+    def open(cls, path: Path) -> "CompiledCatalog":
+        return cls(path)
+
+    def close(self) -> None:
+        self.columns = {}
+        self._mmap.close()
+        self._file.close()
+
+    # ---- interned strings ----
+    def strings(self, field: str) -> List[str]:
+        table = self._tables.get(field)
+        if table is None:
+            offsets = self.columns[f"{field}.offsets"]
+            blob = self.columns[f"{field}.blob"]
+            table = [
+                blob[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+                for i in range(len(offsets) - 1)
+            ]
+            self._tables[field] = table
+        return table
+
+    def _string(self, field: str, i: int) -> Optional[str]:
+        sid = int(self.columns[f"{field}.ids"][i])
+        return None if sid < 0 else self.strings(field)[sid]
+
+    def _number(self, field: str, i: int) -> Any:
+        value = float(self.columns[field][i])
+        if np.isnan(value):
+            return None
+        if self.columns["int_mask"][i] & (1 << NUMERIC_FIELDS.index(field)):
+            return int(value)
+        return value
+
+    # ---- list-of-dicts protocol ----
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if i < 0:
+            i += self.n_rows
+        if not 0 <= i < self.n_rows:
+            raise IndexError(i)
+
+        test_conditions = self._string("test_conditions", i)
+        extra = self._string("extra", i)
+
+        row = {
+            "oem_id": self._string("oem_id", i),
+            "product_sku": self._string("product_sku", i),
+            "spec_key": self._string("spec_key", i),
+            "operator": self._string("operator", i),
+            "unit": self._string("unit", i),
+            "value": {
+                "exact": self._number("value_exact", i),
+                "min": self._number("value_min", i),
+                "max": self._number("value_max", i),
+            },
+            "tolerance": self._number("tolerance", i),
+            "test_conditions": json.loads(test_conditions) if test_conditions is not None else None,
+            "variant_scope": {
+                "pair_count": self._number("pair_count", i),
+                "variant_id": self._string("variant_id", i),
+            },
+            "source": self._string("source", i),
+            "datasheet_ref": self._string("datasheet_ref", i),
+        }
+        if extra is not None:
+            row.update(json.loads(extra))
+        return row
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.n_rows):
+            yield self[i]
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    # ---- scoring ----
+    def _score_value_int(self) -> np.ndarray:
+        """int_mask bit of the field score_value was taken from (exact > max > min)."""
+        mask = self.columns["int_mask"]
+        result = np.zeros(self.n_rows, dtype=bool)
+        pending = np.ones(self.n_rows, dtype=bool)
+        for field in ("value_exact", "value_max", "value_min"):
+            present = pending & ~np.isnan(self.columns[field])
+            result[present] = (mask[present] & (1 << NUMERIC_FIELDS.index(field))) != 0
+            pending &= ~present
+        return result
+
+    def to_engine(self) -> OEMScoringEngine:
+        """Scoring engine over the mmap'd columns (no row dicts built)."""
+        return OEMScoringEngine(
+            skus=self.strings("product_sku"),
+            spec_keys=self.strings("spec_key"),
+            row_sku=self.columns["product_sku.ids"],
+            row_key=self.columns["spec_key.ids"],
+            row_pair=self.columns["pair_count"],
+            row_value=self.columns["score_value"],
+            row_value_int=self._score_value_int(),
+        )
+
+
+# -------------------------------------------------
+# JSON <-> BINARY
+# -------------------------------------------------
+def compile_json(json_path: Path, output_path: Path) -> Dict[str, Any]:
+    with open(json_path, "r", encoding="utf-8") as f:
+        rows = json.load(f)
+    return compile_catalog(rows, output_path)
+
+
+def load_normalized_catalog(path: Path):
+    """normalized_oem.json rows, or a CompiledCatalog for a compiled file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) == MAGIC:
+            return CompiledCatalog.open(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dump_json(catalog_path: Path, json_path: Path) -> None:
+    catalog = CompiledCatalog.open(catalog_path)
+    try:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(catalog.to_rows(), f, indent=2)
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("compile", "dump"):
+        print("usage: python -m services.catalog_binary compile|dump <input> <output>")
+        sys.exit(2)
+
+    command, src, dst = sys.argv[1:]
+    if command == "compile":
+        header = compile_json(Path(src), Path(dst))
+        print(f"✅ Compiled {header['rows']} rows → {dst} ({Path(dst).stat().st_size} bytes)")
+    else:
+        dump_json(Path(src), Path(dst))
+        print(f"✅ Dumped {src} → {dst}")
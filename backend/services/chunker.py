@@ -0,0 +1,279 @@
+# backend/services/chunker.py
+
+import math
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+# -------------------------------------------------
+# CONSTANTS
+# -------------------------------------------------
+DEFAULT_TOKEN_BUDGET = 6_000
+DEFAULT_OVERLAP_TOKENS = 200
+CHARS_PER_TOKEN = 4
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# "1. Scope", "4.2.1 Delivery", "A. Part I", "(a) Product", "SECTION 3", "ANNEXURE-II", ...
+_HEADING_RE = re.compile(
+    r"^\s*("
+    r"\d+(\.\d+)*\.?\s+(?P<title>\S.*)"
+    r"|[A-Z]\.\s+\S"
+    r"|\([a-z0-9]{1,3}\)\s+\S"
+    r"|(SECTION|CHAPTER|CLAUSE|ANNEXURE|APPENDIX|SCHEDULE|PART)\b"
+    r")",
+    re.IGNORECASE,
+)
+# Units of measure: "<number> <unit>" is a quantity or a spec value
+MEASURE_UNITS = {
+    "km", "kms", "mtr", "mtrs", "meter", "meters", "metre", "metres", "mm", "cm", "sq",
+    "sqmm", "kg", "kgs", "pair", "pairs", "core", "cores", "ohm", "ohms", "hz", "khz",
+    "mhz", "kv", "kvdc", "volt", "volts", "db", "nf", "pf", "mohm", "mohms", "kw", "ma", "deg",
+}
+# Words that make "<number> <word>" a quantity / measurement
+# (table cells such as "1.5 km", "86 Ohms/ km", "200 Pair, 0.5mm"),
+# not a numbered heading
+_UNIT_WORDS = MEASURE_UNITS | {
+    "m", "g", "nos", "no", "set", "sets", "p", "v", "w", "a", "to", "x", "c",
+    "days", "months", "years", "rs", "inr", "lakh", "lakhs", "cr", "crore", "percent",
+}
+# "1.5 km", "0.5mm", "3C X 400 SQ. MM", "52 ± 3 nF/km" (unit after the last number)
+_MEASUREMENT_RE = re.compile(r"\d[\d.,]*\s*(?:[x×]\s*\d[\d.,]*\s*)?([A-Za-z]+)", re.IGNORECASE)
+_FIRST_WORD_RE = re.compile(r"[A-Za-z]+")
+_CAPS_WORD_RE = re.compile(r"[A-Z]{3,}")
+# "... 86 Ohms/km", "... 1.5 km", "... 52 nF": a table row ending in its value
+_TRAILING_VALUE_RE = re.compile(r"\d[\d.,]*\s*(?P<unit>[A-Za-z]+)?[/A-Za-z%]*\s*$")
+# Table rows: pipe/tab separated or several wide gaps between cells
+_TABLE_ROW_RE = re.compile(r"\||\t|\S\s{3,}\S.*\S\s{3,}\S")
+
+
+# -------------------------------------------------
+# TOKEN ESTIMATION
+# -------------------------------------------------
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate (no tokenizer download / API call).
+    Words and punctuation count as one token each; long words
+    count one token per ~4 characters, like BPE vocabularies.
+    """
+    return sum(
+        max(1, math.ceil(len(piece) / CHARS_PER_TOKEN))
+        for piece in _TOKEN_RE.findall(text)
+    )
+
+
+# -------------------------------------------------
+# STRUCTURE-AWARE BLOCKS
+# -------------------------------------------------
+def _is_numbered_title(title: str) -> bool:
+    """Text after a clause number reads like a title, not a value."""
+    word = _FIRST_WORD_RE.match(title)
+    if word is None or not word.group(0)[0].isupper():
+        return False  # "2.0 to 2.4mm", "1 ( avg)", "3 kms"
+    if word.group(0).lower() in _UNIT_WORDS:
+        return False  # "86 Ohms/ km", "200 Pair, 0.5mm"
+    value = _TRAILING_VALUE_RE.search(title)
+    return value is None or (value.group("unit") or "").lower() not in _UNIT_WORDS
+
+
+def is_heading(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > 120:
+        return False
+    match = _HEADING_RE.match(stripped)
+    if match:
+        return match.group("title") is None or _is_numbered_title(match.group("title"))
+    letters = [c for c in stripped if c.isalpha()]
+    return len(letters) >= 4 and stripped.isupper() and bool(_CAPS_WORD_RE.search(stripped))
+
+
+def count_measurements(text: str) -> int:
+    """Numbers followed by a unit of measure: scope quantities, spec values."""
+    return sum(
+        1 for match in _MEASUREMENT_RE.finditer(text)
+        if match.group(1).lower() in MEASURE_UNITS
+    )
+
+
+def _is_table_row(line: str) -> bool:
+    return bool(_TABLE_ROW_RE.search(line))
+
+
+def split_blocks(page_text: str) -> List[str]:
+    """
+    Split one page into blocks that should never be cut:
+    a heading starts a new block, consecutive table rows stay
+    together, blank lines end a paragraph.
+    """
+    blocks: List[str] = []
+    current: List[str] = []
+    in_table = False
+
+    def flush():
+        if current:
+            block = "\n".join(current).strip()
+            if block:
+                blocks.append(block)
+            current.clear()
+
+    for line in page_text.splitlines():
+        if not line.strip():
+            if not in_table:
+                flush()
+            continue
+
+        table_row = _is_table_row(line)
+        if is_heading(line) and not table_row:
+            flush()
+        elif table_row != in_table:
+            flush()
+
+        in_table = table_row
+        current.append(line.rstrip())
+
+    flush()
+    return blocks
+
+
+def _slice_chars(text: str, token_budget: int) -> List[str]:
+    """Hard fallback for text without line breaks or spaces to split on."""
+    pieces: List[str] = []
+    pos = 0
+    while pos < len(text):
+        size = token_budget * CHARS_PER_TOKEN
+        piece = text[pos:pos + size]
+        while size > 1 and estimate_tokens(piece) > token_budget:
+            size //= 2
+            piece = text[pos:pos + size]
+        pieces.append(piece)
+        pos += len(piece)
+    return pieces
+
+
+def _split_oversized(block: str, token_budget: int) -> List[str]:
+    """Last resort for a single block over budget: lines, then words, then characters."""
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    units = block.splitlines()
+    if len(units) == 1:
+        units = block.split(" ")
+    joiner = "\n" if "\n" in block else " "
+
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if unit_tokens > token_budget:
+            if current:
+                pieces.append(joiner.join(current))
+                current, current_tokens = [], 0
+            if joiner == "\n":
+                pieces.extend(_split_oversized(unit, token_budget))
+            else:
+                pieces.extend(_slice_chars(unit, token_budget))
+            continue
+        if current and current_tokens + unit_tokens > token_budget:
+            pieces.append(joiner.join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+
+    if current:
+        pieces.append(joiner.join(current))
+    return pieces
+
+
+# -------------------------------------------------
+# TOKEN-BUDGET PACKING
+# -------------------------------------------------
+def chunk_pages(
+    pages: Iterable[Union[str, Dict[str, Any]]],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Pack page blocks into chunks close to `token_budget`.
+
+    `pages` may be plain strings or the page dicts yielded by
+    services.pdf_utils.iter_pages, so chunks are produced while
+    the PDF is still being parsed.
+
+    The trailing blocks of a chunk (up to `overlap_tokens`) are
+    repeated at the start of the next one so a clause split across
+    the boundary is seen whole; duplicate facts are removed when
+    the partial results are merged.
+
+    Yields {"text", "tokens", "first_page", "last_page"}.
+    """
+    blocks: List[str] = []
+    block_tokens: List[int] = []
+    block_pages: List[int] = []
+    total = 0
+    new_blocks = 0
+
+    def emit():
+        return {
+            "text": "\n\n".join(blocks),
+            "tokens": total,
+            "first_page": block_pages[0],
+            "last_page": block_pages[-1],
+        }
+
+    for page_index, page in enumerate(pages, start=1):
+        if isinstance(page, dict):
+            page_number, page_text = page.get("page_number", page_index), page["text"]
+        else:
+            page_number, page_text = page_index, page
+
+        for block in split_blocks(page_text):
+            tokens = estimate_tokens(block)
+            parts = (
+                [(p, estimate_tokens(p)) for p in _split_oversized(block, token_budget)]
+                if tokens > token_budget
+                else [(block, tokens)]
+            )
+
+            for part, part_tokens in parts:
+                if new_blocks and total + part_tokens > token_budget:
+                    yield emit()
+
+                    # Carry the tail of this chunk into the next one
+                    carried, carried_tokens = 0, 0
+                    for t in reversed(block_tokens):
+                        if (
+                            carried_tokens + t > overlap_tokens
+                            or carried_tokens + t + part_tokens > token_budget
+                        ):
+                            break
+                        carried += 1
+                        carried_tokens += t
+                    if carried:
+                        blocks[:] = blocks[-carried:]
+                        block_tokens[:] = block_tokens[-carried:]
+                        block_pages[:] = block_pages[-carried:]
+                    else:
+                        blocks.clear()
+                        block_tokens.clear()
+                        block_pages.clear()
+                    total = carried_tokens
+                    new_blocks = 0
+
+                blocks.append(part)
+                block_tokens.append(part_tokens)
+                block_pages.append(page_number)
+                total += part_tokens
+                new_blocks += 1
+
+    if new_blocks:
+        yield emit()
+
+
+def chunk_text(
+    text: str,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> List[str]:
+    """Plain-text convenience wrapper around chunk_pages."""
+    return [
+        chunk["text"]
+        for chunk in chunk_pages([text], token_budget, overlap_tokens)
+    ]
@@ -0,0 +1,468 @@
+# backend/services/gemini_standin.py
+#
+# Local stand-in for the Gemini API, for offline, repeatable runs.
+#
+#   python -m services.gemini_standin --port 8765 \
+#       --latency lognormal:0.8,0.5 --burst-every 40 --burst-length 4 \
+#       --truncate-rate 0.05 --seed 7
+#   RFP_LLM_BASE_URL=http://127.0.0.1:8765 uvicorn main:app
+#
+# Serves generateContent and streamGenerateContent (SSE) the way the
+# google-genai SDK calls them, so the shared client (services.llm_client)
+# only needs a different base URL. Responses are replayed:
+#   1. exact recordings: <recordings>/<sha256(prompt)>.json
+#   2. per-agent routes: a marker in the prompt picks the agent's
+#      recorded output (DEFAULT_ROUTES: the sample outputs/ files)
+# With --upstream, prompts without an exact recording are forwarded to
+# the real API (the caller's API key header is passed on) and recorded.
+#
+# Injected faults:
+#   - latency drawn from a distribution (+ delay per streamed chunk)
+#   - 503 (or --burst-status) bursts: --burst-length requests out of
+#     every --burst-every, plus a random --error-rate
+#   - truncated JSON (finishReason MAX_TOKENS) at --truncate-rate
+# Per-call randomness is seeded from (seed, prompt, how often that
+# prompt was seen), so the same call gets the same latency / fault
+# whatever order concurrent requests arrive in.
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+OUTPUT_DIR = PROJECT_ROOT / "outputs"
+
+# First route whose marker appears in the prompt wins.
+# "select": key path into the recorded JSON file.
+DEFAULT_ROUTES: List[Dict[str, Any]] = [
+    {"stage": "normalize_specs", "contains": "TECHNICAL SPECIFICATION NORMALIZATION AGENT",
+     "file": OUTPUT_DIR / "normalize_specs_llm.json", "select": ["data"]},
+    {"stage": "scope_of_supply", "contains": "STRUCTURED SCOPE OF SUPPLY SUMMARY",
+     "file": OUTPUT_DIR / "scope_of_supply_summary.json"},
+    {"stage": "pricing_summary", "contains": "PRICING SUMMARY",
+     "file": OUTPUT_DIR / "pricing_summary.json"},
+    {"stage": "technical_summary", "contains": "MAIN ORCHESTRATION AGENT",
+     "file": OUTPUT_DIR / "technical_summary.json"},
+    {"stage": "extract_rfp", "contains": "RFP DOCUMENT TEXT",
+     "file": OUTPUT_DIR / "extracted_rfp.json"},
+    {"stage": "extract_oem", "contains": "DOCUMENT TEXT",
+     "file": PROJECT_ROOT / "samples" / "OEM.json", "select": [0]},
+]
+
+_PATH_RE = re.compile(r"^/(?P<version>[^/]+)/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)")
+
+
+# -------------------------------------------------
+# LATENCY DISTRIBUTIONS
+# -------------------------------------------------
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    "0.5" (fixed seconds), "uniform:lo,hi", "normal:mean,sd",
+    "lognormal:median,sigma", "exp:mean". Negative draws become 0.
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        fixed = float(kind)
+        return lambda rng: fixed
+
+    params = [float(a) for a in args.split(",")]
+    if kind == "uniform":
+        lo, hi = params
+        draw = lambda rng: rng.uniform(lo, hi)
+    elif kind == "normal":
+        mean, sd = params
+        draw = lambda rng: rng.gauss(mean, sd)
+    elif kind == "lognormal":
+        median, sigma = params
+        draw = lambda rng: rng.lognormvariate(math.log(median), sigma)
+    elif kind == "exp":
+        (mean,) = params
+        draw = lambda rng: rng.expovariate(1.0 / mean)
+    else:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return lambda rng: max(0.0, draw(rng))
+
+
+# -------------------------------------------------
+# RECORDINGS
+# -------------------------------------------------
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class Recordings:
+    def __init__(self, directory: Optional[Path] = None, routes: Optional[List[Dict[str, Any]]] = None):
+        self.directory = Path(directory) if directory else None
+        self.routes = DEFAULT_ROUTES if routes is None else routes
+        self._route_text: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def route(self, prompt: str) -> Optional[Dict[str, Any]]:
+        for route in self.routes:
+            if route["contains"] in prompt:
+                return route
+        return None
+
+    def _route_response(self, route: Dict[str, Any]) -> str:
+        with self._lock:
+            text = self._route_text.get(route["stage"])
+            if text is None:
+                with open(route["file"], "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                for key in route.get("select", []):
+                    value = value[key]
+                text = json.dumps(value, indent=2, ensure_ascii=False)
+                self._route_text[route["stage"]] = text
+            return text
+
+    def lookup(self, prompt: str) -> Tuple[Optional[str], str, str]:
+        """(response text or None, stage, source) for a prompt."""
+        route = self.route(prompt)
+        stage = route["stage"] if route else "unknown"
+
+        if self.directory is not None:
+            path = self.directory / f"{prompt_hash(prompt)}.json"
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)["response"], stage, "exact"
+
+        if route is not None:
+            return self._route_response(route), stage, "route"
+        return None, stage, "none"
+
+    def save(self, prompt: str, model: str, stage: str, response: str) -> None:
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{prompt_hash(prompt)}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "stage": stage, "response": response}, f, ensure_ascii=False)
+
+
+# -------------------------------------------------
+# STAND-IN STATE
+# -------------------------------------------------
+class Standin:
+    def __init__(
+        self,
+        recordings: Optional[Recordings] = None,
+        latency: str = "0",
+        chunk_delay_s: float = 0.0,
+        chunk_chars: int = 400,
+        burst_every: int = 0,
+        burst_length: int = 0,
+        burst_status: int = 503,
+        error_rate: float = 0.0,
+        retry_after_s: Optional[float] = None,
+        truncate_rate: float = 0.0,
+        truncate_at: float = 0.6,
+        seed: int = 0,
+        upstream: Optional[str] = None,
+    ):
+        self.recordings = recordings or Recordings()
+        self.latency = parse_latency(latency)
+        self.chunk_delay_s = chunk_delay_s
+        self.chunk_chars = max(1, chunk_chars)
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.burst_status = burst_status
+        self.error_rate = error_rate
+        self.retry_after_s = retry_after_s
+        self.truncate_rate = truncate_rate
+        self.truncate_at = truncate_at
+        self.seed = seed
+        self.upstream = upstream.rstrip("/") if upstream else None
+
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._seen: Dict[str, int] = {}
+        self._stats: Dict[str, Any] = {
+            "requests": 0, "streamed": 0, "errors_injected": 0, "truncated": 0,
+            "replayed_exact": 0, "replayed_route": 0, "recorded": 0, "unmatched": 0,
+            "by_stage": {},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def _count(self, key: str, stage: Optional[str] = None) -> None:
+        with self._lock:
+            self._stats[key] += 1
+            if stage is not None:
+                self._stats["by_stage"][stage] = self._stats["by_stage"].get(stage, 0) + 1
+
+    def plan(self, prompt: str) -> Dict[str, Any]:
+        """Latency and faults for one request (deterministic per prompt + occurrence)."""
+        digest = prompt_hash(prompt)
+        with self._lock:
+            sequence = self._sequence
+            self._sequence += 1
+            occurrence = self._seen.get(digest, 0)
+            self._seen[digest] = occurrence + 1
+
+        rng = random.Random(f"{self.seed}:{digest}:{occurrence}")
+        in_burst = (
+            self.burst_every > 0
+            and sequence % self.burst_every < self.burst_length
+        )
+        return {
+            "latency_s": self.latency(rng),
+            "error": in_burst or rng.random() < self.error_rate,
+            "truncate": rng.random() < self.truncate_rate,
+        }
+
+    def respond(self, model: str, body: Dict[str, Any], api_key: Optional[str]) -> Tuple[Optional[str], str]:
+        """Response text (None when nothing matches) and the agent stage."""
+        prompt = extract_prompt(body)
+        text, stage, source = self.recordings.lookup(prompt)
+
+        if source != "exact" and self.upstream is not None:
+            text = self._forward(model, body, api_key)
+            self.recordings.save(prompt, model, stage, text)
+            source = "recorded"
+
+        self._count({"exact": "replayed_exact", "route": "replayed_route",
+                     "recorded": "recorded", "none": "unmatched"}[source], stage)
+        return text, stage
+
+    def _forward(self, model: str, body: Dict[str, Any], api_key: Optional[str]) -> str:
+        response = httpx.post(
+            f"{self.upstream}/v1beta/models/{model}:generateContent",
+            json=body,
+            headers={"x-goog-api-key": api_key or ""},
+            timeout=300,
+        )
+        response.raise_for_status()
+        return response_text(response.json())
+
+
+def extract_prompt(body: Dict[str, Any]) -> str:
+    return "".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+def response_text(payload: Dict[str, Any]) -> str:
+    return "".join(
+        part.get("text", "")
+        for candidate in payload.get("candidates", [])[:1]
+        for part in candidate.get("content", {}).get("parts", [])
+    )
+
+
+def _candidate(model: str, text: str, finish_reason: Optional[str], prompt_chars: int) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "index": 0,
+        }],
+        "modelVersion": model,
+    }
+    if finish_reason is not None:
+        payload["candidates"][0]["finishReason"] = finish_reason
+        payload["usageMetadata"] = {
+            "promptTokenCount": prompt_chars // 4,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": (prompt_chars + len(text)) // 4,
+        }
+    return payload
+
+
+# -------------------------------------------------
+# HTTP HANDLER
+# -------------------------------------------------
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    standin: Standin  # set by make_server
+
+    def log_message(self, format, *args):  # noqa: A002 (BaseHTTPRequestHandler API)
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.standin.stats())
+        elif self.path == "/health":
+            self._send_json(200, {"ok": True})
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        match = _PATH_RE.match(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if match is None:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        standin = self.standin
+        model = match.group("model")
+        stream = match.group("method") == "streamGenerateContent"
+        body = json.loads(raw or b"{}")
+        prompt = extract_prompt(body)
+
+        standin._count("requests")
+        plan = standin.plan(prompt)
+        time.sleep(plan["latency_s"])
+
+        if plan["error"]:
+            standin._count("errors_injected")
+            status = standin.burst_status
+            headers = {}
+            if standin.retry_after_s is not None:
+                headers["Retry-After"] = f"{standin.retry_after_s:g}"
+            self._send_json(status, {"error": {
+                "code": status,
+                "message": "The model is overloaded. Please try again later.",
+                "status": "UNAVAILABLE" if status == 503 else "RESOURCE_EXHAUSTED",
+            }}, headers)
+            return
+
+        try:
+            text, _ = standin.respond(model, body, self.headers.get("x-goog-api-key"))
+        except httpx.HTTPError as e:
+            self._send_json(502, {"error": {"code": 502, "message": f"Upstream failed: {e}", "status": "UNAVAILABLE"}})
+            return
+        if text is None:
+            self._send_json(400, {"error": {
+                "code": 400,
+                "message": "No recorded response for this prompt",
+                "status": "INVALID_ARGUMENT",
+            }})
+            return
+
+        finish_reason = "STOP"
+        if plan["truncate"]:
+            standin._count("truncated")
+            text = text[:int(len(text) * standin.truncate_at)]
+            finish_reason = "MAX_TOKENS"
+
+        if not stream:
+            self._send_json(200, _candidate(model, text, finish_reason, len(prompt)))
+            return
+
+        standin._count("streamed")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        size = standin.chunk_chars
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for n, piece in enumerate(pieces):
+            if n and standin.chunk_delay_s:
+                time.sleep(standin.chunk_delay_s)
+            last = n == len(pieces) - 1
+            event = _candidate(model, piece, finish_reason if last else None, len(prompt))
+            self._write_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+        self._write_chunk(b"")
+
+
+# -------------------------------------------------
+# SERVER
+# -------------------------------------------------
+class StandinServer:
+    """Stand-in on a background thread (port 0 = any free port)."""
+
+    def __init__(self, standin: Optional[Standin] = None, host: str = "127.0.0.1", port: int = 0):
+        self.standin = standin or Standin()
+        handler = type("Handler", (StandinHandler,), {"standin": self.standin})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="gemini-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--recordings", help="Directory of exact prompt recordings (<sha256>.json)")
+    parser.add_argument("--upstream", help="Forward + record prompts without an exact recording, "
+                                           "e.g. https://generativelanguage.googleapis.com")
+    parser.add_argument("--latency", default="0", help='"0.5", "uniform:lo,hi", "normal:mean,sd", '
+                                                       '"lognormal:median,sigma", "exp:mean"')
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--chunk-chars", type=int, default=400, help="Characters per streamed chunk")
+    parser.add_argument("--burst-every", type=int, default=0, help="Fault burst period, in requests")
+    parser.add_argument("--burst-length", type=int, default=0, help="Failing requests per burst")
+    parser.add_argument("--burst-status", type=int, default=503, help="503 or 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Random failure probability")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with failures")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Probability of a cut-off response")
+    parser.add_argument("--truncate-at", type=float, default=0.6, help="Fraction of the response kept")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def standin_from_args(args: argparse.Namespace) -> Standin:
+    return Standin(
+        recordings=Recordings(args.recordings),
+        latency=args.latency,
+        chunk_delay_s=args.chunk_delay,
+        chunk_chars=args.chunk_chars,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        burst_status=args.burst_status,
+        error_rate=args.error_rate,
+        retry_after_s=args.retry_after,
+        truncate_rate=args.truncate_rate,
+        truncate_at=args.truncate_at,
+        seed=args.seed,
+        upstream=args.upstream,
+    )
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = StandinServer(standin_from_args(args), host=args.host, port=args.port)
+    print(f"🧪 Gemini stand-in on {server.base_url} (RFP_LLM_BASE_URL={server.base_url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
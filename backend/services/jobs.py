@@ -0,0 +1,237 @@
+# backend/services/jobs.py
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# -------------------------------------------------
+# JOB STATES
+# -------------------------------------------------
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+# How long a succeeded job's result is handed to later duplicates
+# (submit_once); 0 = only coalesce with runs still in flight
+DEDUP_RESULT_TTL_S = float(os.getenv("RFP_DEDUP_RESULT_TTL", str(6 * 3600)))
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the pool already holds `max_pending` unfinished jobs."""
+
+
+# -------------------------------------------------
+# JOB
+# -------------------------------------------------
+class Job:
+    def __init__(self, job_id: str, filename: Optional[str] = None, key: Optional[str] = None):
+        self.job_id = job_id
+        self.filename = filename
+        # Single-flight key (submit_once) and how many duplicate
+        # submissions were attached to this job
+        self.key = key
+        self.duplicates = 0
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        # Published results, in order: {"id", "event", "data", "at"}
+        self.events: List[Dict[str, Any]] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status view (without the result payload)."""
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": list(self.stages),
+            "duplicates": self.duplicates,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# -------------------------------------------------
+# JOB MANAGER (BOUNDED WORKER POOL)
+# -------------------------------------------------
+class JobManager:
+    """
+    Runs blocking pipeline functions on a bounded thread pool so the
+    FastAPI event loop only ever enqueues work and reads job state.
+
+    The submitted function receives a `report_stage(name)` keyword
+    argument it can call to publish stage-by-stage progress, and a
+    `publish(event, data)` keyword argument for partial results.
+    Both, plus the final result / error, are appended to the job's
+    event log (see events_since) for streaming to clients.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_pending: int = 100,
+        max_finished_jobs: int = 500,
+        dedup_result_ttl_s: float = DEDUP_RESULT_TTL_S,
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished_jobs = max_finished_jobs
+        self.dedup_result_ttl_s = dedup_result_ttl_s
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="rfp-job",
+        )
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        filename: Optional[str] = None,
+    ) -> Job:
+        return self.submit_once(None, fn, *args, filename=filename)[0]
+
+    def submit_once(
+        self,
+        key: Optional[str],
+        fn: Callable[..., Any],
+        *args: Any,
+        filename: Optional[str] = None,
+    ) -> Tuple[Job, bool]:
+        """
+        Single-flight submit. If a job with the same `key` is queued or
+        running, or succeeded within dedup_result_ttl_s, that job is
+        returned instead of starting a new one. Returns (job, created).
+        """
+        job = Job(uuid.uuid4().hex, filename=filename, key=key)
+
+        with self._lock:
+            existing = self._by_key.get(key) if key is not None else None
+            if existing is not None and self._reusable(existing):
+                existing.duplicates += 1
+                return existing, False
+
+            pending = sum(
+                1 for j in self._jobs.values()
+                if j.status not in FINISHED_STATES
+            )
+            if pending >= self.max_pending:
+                raise JobQueueFull(
+                    f"{pending} jobs already queued or running"
+                )
+
+            self._jobs[job.job_id] = job
+            if key is not None:
+                self._by_key[key] = job
+            self._evict_finished()
+
+        self._executor.submit(self._run, job, fn, args)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def events_since(self, job: Job, last_id: int = 0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        (events with id > last_id, finished). When `finished` is True
+        the returned events are the last ones the job will publish.
+        """
+        with self._lock:
+            return job.events[last_id:], job.status in FINISHED_STATES
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    # -------------------------------------------------
+    # INTERNALS
+    # -------------------------------------------------
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple) -> None:
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+
+        try:
+            result = fn(
+                *args,
+                report_stage=lambda stage: self._set_stage(job, stage),
+                publish=lambda event, data: self._publish(job, event, data),
+            )
+        except Exception as e:
+            with self._lock:
+                job.status = FAILED
+                job.error = f"{type(e).__name__}: {e}"
+                job.finished_at = time.time()
+                self._append_event(job, "error", {"error": job.error})
+            print(f"❌ Job {job.job_id} failed: {job.error}")
+            return
+
+        with self._lock:
+            job.result = result
+            job.status = SUCCEEDED
+            job.stage = "done"
+            job.finished_at = time.time()
+            self._append_event(job, "result", result)
+
+    def _set_stage(self, job: Job, stage: str) -> None:
+        with self._lock:
+            job.stage = stage
+            job.stages.append({"stage": stage, "started_at": time.time()})
+            self._append_event(job, "stage", {"stage": stage})
+
+    def _publish(self, job: Job, event: str, data: Any) -> None:
+        with self._lock:
+            self._append_event(job, event, data)
+
+    def _append_event(self, job: Job, event: str, data: Any) -> None:
+        # Caller holds self._lock. Ids are 1-based positions in the log.
+        job.events.append({
+            "id": len(job.events) + 1,
+            "event": event,
+            "data": data,
+            "at": time.time(),
+        })
+
+    def _reusable(self, job: Job) -> bool:
+        # Caller holds self._lock
+        if job.status == FAILED:
+            return False
+        if job.status == SUCCEEDED:
+            return time.time() - job.finished_at <= self.dedup_result_ttl_s
+        return True
+
+    def _evict_finished(self) -> None:
+        # Caller holds self._lock. Drop the oldest finished jobs first.
+        finished = [
+            j for j in self._jobs.values()
+            if j.status in FINISHED_STATES
+        ]
+        overflow = len(finished) - self.max_finished_jobs
+        if overflow <= 0:
+            return
+
+        finished.sort(key=lambda j: j.finished_at or 0)
+        for j in finished[:overflow]:
+            del self._jobs[j.job_id]
+            if j.key is not None and self._by_key.get(j.key) is j:
+                del self._by_key[j.key]
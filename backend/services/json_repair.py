@@ -0,0 +1,197 @@
+# backend/services/json_repair.py
+#
+# JSON parsing for LLM responses, shared by every agent.
+#
+#   - Fast path: the whole response parsed with orjson when installed
+#     (stdlib json otherwise)
+#   - Recovery: one linear scan finds the first balanced JSON object /
+#     array (ignoring prose or code fences around it), drops trailing
+#     commas and, when the output was cut off, closes it after the last
+#     complete value
+#
+# A response that can be recovered is used as-is: no re-generation.
+
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is the fallback
+    orjson = None
+
+_CLOSERS = {"{": "}", "[": "]"}
+# One token: string (group 1 set when terminated), bracket / separator,
+# or a scalar (number, true / false / null) up to the next delimiter
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*(")?|[{}\[\]:,]|[^\s{}\[\]:,"]+', re.S)
+
+
+# -------------------------------------------------
+# FAST BACKEND
+# -------------------------------------------------
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
+
+
+def loads(text: str) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except ValueError:
+            pass  # NaN, 64-bit+ integers: stdlib json accepts them
+    return json.loads(text)
+
+
+# -------------------------------------------------
+# SCAN + REPAIR
+# -------------------------------------------------
+def extract_json_text(text: str, openers: str = "{[") -> Optional[Tuple[str, bool]]:
+    """
+    Text of the first JSON value in `text` that starts with one of
+    `openers`, as (json_text, repaired), or None when there is none.
+    """
+    found = _scan(text, openers)
+    return None if found is None else found[:2]
+
+
+def _scan(text: str, openers: str) -> Optional[Tuple[str, bool, bool]]:
+    """
+    extract_json_text plus whether the value was cut short
+    (json_text, repaired, truncated).
+
+    Single pass, O(len(text)). Tracks the open brackets and whether
+    the next string is an object key; remembers the last point where
+    a value was complete, so a truncated or mismatched tail can be cut
+    there and closed. Objects inside arrays are records (one spec, one
+    product line): a partial record is dropped, not kept half-filled.
+    """
+    starts = [i for i in (text.find(ch) for ch in openers) if i >= 0]
+    if not starts:
+        return None
+    start = min(starts)
+
+    stack: List[List[Any]] = []   # [closer, expecting_key, in_record]
+    drops: List[int] = []         # trailing commas to remove
+    pending_comma: Optional[int] = None
+    safe: Optional[Tuple[int, int]] = None  # (cut position, open brackets)
+    end = None
+
+    # Strings and scalars are matched whole by the regex, so the Python
+    # loop only runs once per token, not per character
+    for match in _TOKEN_RE.finditer(text, start):
+        token = match.group(0)
+        ch = token[0]
+
+        if ch == '"':
+            pending_comma = None
+            if match.group(1) is None:
+                break  # unterminated string: output was cut off
+            is_key = stack[-1][0] == "}" and stack[-1][1]
+            if not is_key and not stack[-1][2]:
+                safe = (match.end(), len(stack))
+        elif ch in _CLOSERS:
+            in_record = bool(stack) and (stack[-1][2] or (ch == "{" and stack[-1][0] == "]"))
+            stack.append([_CLOSERS[ch], ch == "{", in_record])
+            pending_comma = None
+            if not in_record:
+                safe = (match.end(), len(stack))
+        elif ch in "}]":
+            if pending_comma is not None:
+                drops.append(pending_comma)
+                pending_comma = None
+            if ch != stack[-1][0]:
+                break  # mismatched bracket: repair from the last safe point
+            stack.pop()
+            if not stack:
+                end = match.end()
+                break
+            if not stack[-1][2]:
+                safe = (match.end(), len(stack))
+        elif ch == ":":
+            stack[-1][1] = False
+        elif ch == ",":
+            pending_comma = match.start()
+            if stack[-1][0] == "}":
+                stack[-1][1] = True
+        else:
+            pending_comma = None
+            if match.end() == len(text):
+                break  # number / literal may be cut short
+            if not stack[-1][2]:
+                safe = (match.end(), len(stack))
+
+    if end is not None:
+        return _without(text, start, end, drops), bool(drops), False
+
+    # Truncated / mismatched: keep everything up to the last complete
+    # value, then close the brackets that were open at that point
+    if safe is None:
+        return None
+    cut, depth = safe
+    closers = "".join(entry[0] for entry in reversed(stack[:depth]))
+    return _without(text, start, cut, drops) + closers, True, True
+
+
+def _without(text: str, start: int, end: int, drops: List[int]) -> str:
+    parts, pos = [], start
+    for index in drops:
+        if index >= end:
+            break
+        parts.append(text[pos:index])
+        pos = index + 1
+    parts.append(text[pos:end])
+    return "".join(parts)
+
+
+# -------------------------------------------------
+# PUBLIC PARSER
+# -------------------------------------------------
+def parse_json(text: str, expect: Optional[type] = None) -> Any:
+    """
+    Parse an LLM response. `expect` (dict / list) also picks which
+    bracket the recovery scan looks for. Raises ValueError when no
+    JSON value can be recovered.
+    """
+    try:
+        value = loads(text)
+        if expect is None or isinstance(value, expect):
+            return value
+    except ValueError:
+        pass
+
+    found = _scan(text, _openers(expect))
+    if found is None:
+        raise ValueError("No JSON value found in LLM response")
+
+    body, repaired, truncated = found
+    value = loads(body)
+    if expect is not None and not isinstance(value, expect):
+        raise ValueError(f"Expected a JSON {expect.__name__}, got {type(value).__name__}")
+    if repaired:
+        kind = "truncated" if truncated else "malformed"
+        print(f"🩹 Repaired {kind} JSON response ({len(text)} -> {len(body)} chars)")
+    return value
+
+
+def is_truncated(text: str, expect: Optional[type] = None) -> bool:
+    """
+    True when parse_json would have to drop content to recover `text`
+    (output cut off mid-value). Such a response is usable for this run
+    but must not be cached: retrying may return the complete output.
+    """
+    try:
+        value = loads(text)
+        if expect is None or isinstance(value, expect):
+            return False
+    except ValueError:
+        pass
+    found = _scan(text, _openers(expect))
+    return found is not None and found[2]
+
+
+def _openers(expect: Optional[type]) -> str:
+    return "{" if expect is dict else "[" if expect is list else "{["
+
+
+def parse_json_object(text: str) -> Any:
+    return parse_json(text, expect=dict)
@@ -0,0 +1,148 @@
+# backend/services/json_stream.py
+#
+# Incremental JSON event parser for streamed LLM responses.
+#
+# Text chunks are fed as they arrive; every top-level element is
+# reported as soon as its closing bracket / quote / delimiter has been
+# seen, while the rest of the response is still being generated:
+#
+#   ("item", index, value)   element of a top-level array
+#   ("field", key, value)    member of a top-level object
+#
+# Each character is scanned once. Text before the first bracket
+# (prose, a ```json fence) and after the root value is ignored.
+
+from typing import Any, List, Optional, Tuple
+
+from services.json_repair import loads
+
+_CLOSERS = {"{": "}", "[": "]"}
+_DELIMITERS = frozenset(",:]} \t\r\n")
+
+Event = Tuple[str, Any, Any]
+
+
+class JSONStreamParser:
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._stack: List[str] = []
+        self._started = False
+        self._done = False
+        self._root_is_object = False
+        self._expect_key = False
+
+        self._in_string = False
+        self._escape = False
+        self._in_scalar = False
+
+        # Top-level element being read: text from earlier chunks +
+        # start offset in the current chunk
+        self._elem_parts: Optional[List[str]] = None
+        self._elem_from = 0
+        self._elem_is_key = False
+        self._key: Any = None
+        self._count = 0
+
+    @property
+    def done(self) -> bool:
+        """True once the root object / array has been closed."""
+        return self._done
+
+    def text(self) -> str:
+        """Everything fed so far (the raw response)."""
+        return "".join(self._chunks)
+
+    # -------------------------------------------------
+    # ELEMENTS
+    # -------------------------------------------------
+    def _begin(self, pos: int, is_key: bool = False) -> None:
+        self._elem_parts = []
+        self._elem_from = pos
+        self._elem_is_key = is_key
+
+    def _finish(self, chunk: str, end: int, events: List[Event]) -> None:
+        raw = "".join(self._elem_parts) + chunk[self._elem_from:end]
+        self._elem_parts = None
+        try:
+            value = loads(raw)
+        except ValueError:
+            return  # malformed element: left to the full-response parser
+
+        if self._elem_is_key:
+            self._key = value
+        elif self._root_is_object:
+            events.append(("field", self._key, value))
+        else:
+            events.append(("item", self._count, value))
+            self._count += 1
+
+    # -------------------------------------------------
+    # SCAN
+    # -------------------------------------------------
+    def feed(self, chunk: str) -> List[Event]:
+        """Consume the next chunk; returns the events it completed."""
+        events: List[Event] = []
+        if not chunk:
+            return events
+        self._chunks.append(chunk)
+        if self._done:
+            return events
+
+        stack = self._stack
+        for i, ch in enumerate(chunk):
+            if not self._started:
+                if ch in _CLOSERS:
+                    self._started = True
+                    stack.append(_CLOSERS[ch])
+                    self._root_is_object = self._expect_key = ch == "{"
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(stack) == 1:
+                        self._finish(chunk, i + 1, events)
+                continue
+
+            if self._in_scalar:
+                if ch not in _DELIMITERS:
+                    continue
+                self._in_scalar = False
+                self._finish(chunk, i, events)
+
+            depth = len(stack)
+            if ch == '"':
+                self._in_string = True
+                if depth == 1:
+                    self._begin(i, is_key=self._root_is_object and self._expect_key)
+            elif ch in _CLOSERS:
+                if depth == 1:
+                    self._begin(i)
+                stack.append(_CLOSERS[ch])
+            elif ch in "}]":
+                stack.pop()
+                if not stack:
+                    self._done = True
+                    break
+                if len(stack) == 1:
+                    self._finish(chunk, i + 1, events)
+            elif ch == ":":
+                if depth == 1:
+                    self._expect_key = False
+            elif ch == ",":
+                if depth == 1:
+                    self._expect_key = self._root_is_object
+            elif ch not in _DELIMITERS and depth == 1:
+                self._begin(i)
+                self._in_scalar = True
+
+        # Element continues in the next chunk
+        if self._elem_parts is not None:
+            self._elem_parts.append(chunk[self._elem_from:])
+            self._elem_from = 0
+
+        return events
@@ -0,0 +1,342 @@
+# backend/services/llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Type
+
+from services.json_repair import is_truncated, parse_json
+from services.json_stream import JSONStreamParser
+from services.pipeline_dag import mark_incomplete
+from services.rate_limiter import get_limiter
+
+# -------------------------------------------------
+# PATH SETUP
+# -------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CACHE_PATH = PROJECT_ROOT / ".cache" / "llm_cache.sqlite"
+
+# -------------------------------------------------
+# CONSTANTS
+# -------------------------------------------------
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+# -------------------------------------------------
+# CACHE KEY
+# -------------------------------------------------
+def _config_to_dict(config: Any) -> Dict[str, Any]:
+    if config is None:
+        return {}
+    if hasattr(config, "model_dump"):
+        return config.model_dump(mode="json", exclude_none=True)
+    return dict(config)
+
+
+def make_cache_key(model: str, prompt: str, config: Any = None) -> str:
+    """
+    Content address of one LLM call:
+    sha256(model, system instruction, remaining config, sha256(prompt)).
+    """
+    config_dict = _config_to_dict(config)
+    system_instruction = config_dict.pop("system_instruction", None)
+
+    payload = json.dumps(
+        {
+            "model": model,
+            "system_instruction": system_instruction,
+            "config": config_dict,
+            "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------
+# SQLITE RESPONSE CACHE
+# -------------------------------------------------
+class LLMCache:
+    """
+    On-disk LLM response cache (SQLite).
+
+    - Entries expire after `ttl_seconds`
+    - When the stored text exceeds `max_bytes`, least recently
+      used entries are evicted
+    - Hit / miss / eviction counters are kept per process
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key: str, accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Stored response for `key`. An entry that fails `accept` is
+        dropped and counted as a miss, like an expired one.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if now - created_at > self.ttl_seconds or (accept is not None and not accept(response)):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                self.evictions += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+            self._conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _evict(self, now: float) -> None:
+        # Caller holds self._lock.
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?",
+            (now - self.ttl_seconds,),
+        ).rowcount
+        self.evictions += max(expired, 0)
+
+        (total_bytes,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        if total_bytes <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total_bytes -= size
+            self.evictions += 1
+
+
+# -------------------------------------------------
+# PROCESS-WIDE CACHE
+# -------------------------------------------------
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    return os.getenv("RFP_LLM_CACHE", "1").lower() not in ("0", "false", "off")
+
+
+def get_cache() -> LLMCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(
+                path=Path(os.getenv("RFP_LLM_CACHE_PATH", str(DEFAULT_CACHE_PATH))),
+                ttl_seconds=float(os.getenv("RFP_LLM_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                max_bytes=int(os.getenv("RFP_LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            )
+        return _cache
+
+
+# -------------------------------------------------
+# CACHED GEMINI CALL
+# -------------------------------------------------
+def _complete(expect: Optional[Type]) -> Callable[[str], bool]:
+    """Cache check: the response was not cut off (read as `expect`, like the parser)."""
+    return lambda raw_output: not is_truncated(raw_output, expect)
+
+
+def _keep(key: str, model: str, raw_output: str, use_cache: bool, expect: Optional[Type]) -> None:
+    """
+    Cache a parsed response, unless it was cut off: repair dropped
+    its unfinished records, so it is used for this run only and the
+    pipeline stage using it is not stored either.
+    """
+    if is_truncated(raw_output, expect):
+        print("⚠️ Truncated Gemini response: used for this run only, not cached")
+        mark_incomplete("truncated LLM response")
+    elif use_cache:
+        get_cache().set(key, model, raw_output)
+
+
+def generate_json(
+    client: Any,
+    model: str,
+    prompt: str,
+    config: Any = None,
+    parse: Callable[[str], Any] = parse_json,
+    expect: Optional[Type] = None,
+) -> Any:
+    """
+    Single entry point for JSON-returning Gemini calls.
+
+    The default `parse` (services.json_repair) recovers JSON wrapped
+    in prose, with trailing commas or cut off mid-output, so those
+    responses are used instead of re-generated. The raw response text
+    is cached only after `parse` succeeds and only when it was not cut
+    off, so neither an unrecoverable nor a partial response is ever
+    replayed. A custom `parse` that reads a dict / list should pass
+    it as `expect`, so truncation is judged the way it parses. Cache
+    misses go through the process-wide rate limiter
+    (services.rate_limiter), which also retries throttled / transient
+    failures.
+    """
+    use_cache = cache_enabled()
+    key = make_cache_key(model, prompt, config)
+
+    if use_cache:
+        cached = get_cache().get(key, accept=_complete(expect))
+        if cached is not None:
+            return parse(cached)
+
+    response = get_limiter().call(
+        lambda: client.models.generate_content(
+            model=model,
+            contents=[prompt],
+            config=config,
+        )
+    )
+
+    raw_output = response.text
+    parsed = parse(raw_output)
+    _keep(key, model, raw_output, use_cache, expect)
+    return parsed
+
+
+def generate_json_stream(
+    client: Any,
+    model: str,
+    prompt: str,
+    config: Any = None,
+    on_event: Optional[Callable[[str, Any, Any], None]] = None,
+    parse: Callable[[str], Any] = parse_json,
+    expect: Optional[Type] = None,
+) -> Any:
+    """
+    generate_json over streaming generation. `on_event(kind, key, value)`
+    is called for every top-level array element ("item", index) or
+    object member ("field", key) as soon as it is complete (see
+    services.json_stream); the parsed full response is returned as
+    with generate_json. Cache hits replay the stored text through the
+    same parser, so callers see the same events either way.
+
+    A stream that fails and is retried by the rate limiter resumes
+    event delivery after the events already delivered.
+    """
+    use_cache = cache_enabled()
+    key = make_cache_key(model, prompt, config)
+    delivered = [0]
+
+    def consume(chunks) -> str:
+        parser = JSONStreamParser()
+        seen = 0
+        for chunk in chunks:
+            for event in parser.feed(chunk):
+                seen += 1
+                if seen > delivered[0]:
+                    delivered[0] = seen
+                    if on_event is not None:
+                        on_event(*event)
+        return parser.text()
+
+    if use_cache:
+        cached = get_cache().get(key, accept=_complete(expect))
+        if cached is not None:
+            consume([cached])
+            return parse(cached)
+
+    raw_output = get_limiter().call(
+        lambda: consume(
+            chunk.text or ""
+            for chunk in client.models.generate_content_stream(
+                model=model,
+                contents=[prompt],
+                config=config,
+            )
+        )
+    )
+    parsed = parse(raw_output)
+    _keep(key, model, raw_output, use_cache, expect)
+    return parsed
+
@@ -0,0 +1,108 @@
+# backend/services/llm_client.py
+#
+# One process-wide Gemini client, created on first use.
+#
+# Every agent used to build its own genai.Client() (some per call),
+# each with its own HTTP connection pool, so calls kept paying client
+# setup and TLS handshakes. get_client() returns a single client whose
+# httpx pools keep connections alive (HTTP/2 when the `h2` package is
+# installed). The sync client is safe to share across threads; use
+# `get_client().aio` from asyncio code.
+
+import importlib.util
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+load_dotenv()
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+MAX_CONNECTIONS = int(os.getenv("RFP_LLM_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("RFP_LLM_MAX_KEEPALIVE", "16"))
+KEEPALIVE_EXPIRY_S = float(os.getenv("RFP_LLM_KEEPALIVE_EXPIRY", "120"))
+# "auto": HTTP/2 when the h2 package is available
+HTTP2_SETTING = os.getenv("RFP_LLM_HTTP2", "auto").lower()
+# Alternative API endpoint, e.g. the local stand-in (services.gemini_standin)
+BASE_URL = os.getenv("RFP_LLM_BASE_URL")
+
+
+def http2_enabled() -> bool:
+    if HTTP2_SETTING in ("0", "false", "off"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def http_client_args() -> Dict[str, Any]:
+    """httpx client settings shared by the sync and async pools."""
+    return {
+        "http2": http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_S,
+        ),
+    }
+
+
+def _has_api_key() -> bool:
+    return bool(os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY"))
+
+
+# -------------------------------------------------
+# PROVIDER
+# -------------------------------------------------
+_client: Optional[genai.Client] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    """
+    The shared Gemini client, created lazily. A forked child process
+    gets its own (pooled connections must not cross processes).
+    """
+    global _client, _client_pid
+    client = _client
+    if client is not None and _client_pid == os.getpid():
+        return client
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            try:
+                _client = genai.Client(
+                    # The stand-in does not check keys
+                    api_key=None if _has_api_key() or not BASE_URL else "standin",
+                    http_options=types.HttpOptions(
+                        base_url=BASE_URL,
+                        client_args=http_client_args(),
+                        async_client_args=http_client_args(),
+                    )
+                )
+            except Exception as e:
+                raise RuntimeError("Failed to initialize Gemini client. Check API key.") from e
+            _client_pid = os.getpid()
+            print(
+                f"🔌 Gemini client ready (http2={http2_enabled()}, max {MAX_CONNECTIONS} connections"
+                + (f", base URL {BASE_URL})" if BASE_URL else ")")
+            )
+        return _client
+
+
+def close_client() -> None:
+    """Close the shared client's connection pools (e.g. on shutdown)."""
+    global _client, _client_pid
+    with _client_lock:
+        client, _client, _client_pid = _client, None, None
+
+    if client is not None and hasattr(client, "close"):
+        try:
+            client.close()
+        except Exception as e:
+            print(f"⚠️ Closing Gemini client failed: {e}")
@@ -0,0 +1,150 @@
+# backend/services/offline_bench.py
+#
+# End-to-end pipeline benchmark against the local Gemini stand-in
+# (services.gemini_standin): no API key, no network. Run from backend/:
+#
+#   python -m services.offline_bench --docs samples/rfp_2024.pdf --repeat 8 \
+#       --concurrency 4 --latency lognormal:1.0,0.4 --burst-every 20 --burst-length 3
+#
+# Two passes over the same jobs:
+#   - cold: empty LLM response cache + stage cache (fresh temp dirs)
+#   - warm: same jobs again, caches kept (what caching saves)
+# Each pass reports wall time, per-document latency, rate limiter
+# counters (retries / throttling) and what the stand-in served and
+# injected. Stand-in faults and latencies are seeded per call, so a
+# given --seed reproduces the same run.
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from services.gemini_standin import StandinServer, add_arguments, standin_from_args
+
+
+def _delta(after: Dict[str, Any], before: Dict[str, Any], counters: List[str]) -> Dict[str, Any]:
+    """Counters as the change during the pass; other fields as they are now."""
+    return {
+        key: value - before.get(key, 0) if key in counters else value
+        for key, value in after.items()
+        if key != "by_stage"
+    }
+
+
+def run_pass(label: str, docs: List[str], concurrency: int, standin) -> Dict[str, Any]:
+    from agents.main_agent.main_agent import run_pipeline
+    from services.llm_cache import cache_enabled, get_cache
+    from services.rate_limiter import get_limiter
+
+    limiter_before = get_limiter().stats()
+    standin_before = standin.stats()
+    cache_before = get_cache().stats() if cache_enabled() else {}
+
+    def timed(pdf: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            run_pipeline(pdf)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return {"doc": pdf, "elapsed_s": time.perf_counter() - t0, "error": error}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, docs))
+    wall_s = time.perf_counter() - started
+
+    latencies = sorted(r["elapsed_s"] for r in results)
+    report = {
+        "pass": label,
+        "docs": len(docs),
+        "failed": sum(1 for r in results if r["error"]),
+        "errors": sorted({r["error"] for r in results if r["error"]}),
+        "wall_s": round(wall_s, 3),
+        "docs_per_min": round(60 * len(docs) / wall_s, 2) if wall_s else None,
+        "latency_s": {
+            "p50": round(statistics.median(latencies), 3),
+            "p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3),
+            "max": round(latencies[-1], 3),
+        },
+        "limiter": _delta(get_limiter().stats(), limiter_before, ["calls", "retries", "throttled", "failed"]),
+        "standin": _delta(standin.stats(), standin_before, [
+            "requests", "streamed", "errors_injected", "truncated",
+            "replayed_exact", "replayed_route", "recorded", "unmatched",
+        ]),
+    }
+    if cache_before:
+        report["llm_cache"] = _delta(get_cache().stats(), cache_before, ["hits", "misses", "evictions"])
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    lat = report["latency_s"]
+    print(
+        f"⏱️ {report['pass']}: {report['docs']} docs in {report['wall_s']:.2f}s "
+        f"({report['docs_per_min']} docs/min), latency p50 {lat['p50']:.2f}s p95 {lat['p95']:.2f}s, "
+        f"{report['failed']} failed"
+    )
+    standin, limiter = report["standin"], report["limiter"]
+    print(
+        f"   Gemini requests {standin['requests']} (injected errors {standin['errors_injected']}, "
+        f"truncated {standin['truncated']}), limiter retries {limiter['retries']}, "
+        f"throttled {limiter['throttled']}, concurrency limit {limiter['concurrency_limit']}"
+    )
+    if "llm_cache" in report:
+        cache = report["llm_cache"]
+        print(f"   LLM cache hits {cache['hits']}, misses {cache['misses']}")
+    for error in report["errors"]:
+        print(f"   ❌ {error}")
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark (Gemini stand-in)")
+    parser.add_argument("--docs", nargs="+", default=["samples/rfp_2024.pdf"])
+    parser.add_argument("--repeat", type=int, default=4, help="Times each document is submitted per pass")
+    parser.add_argument("--concurrency", type=int, default=4, help="Documents processed at once")
+    parser.add_argument("--stream", action="store_true", help="RFP_LLM_STREAM=1 (streamed spec normalization)")
+    parser.add_argument("--no-stage-cache", action="store_true", help="Warm pass uses only the LLM cache")
+    parser.add_argument("--save", help="Write both pass reports here (JSON)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = StandinServer(standin_from_args(args)).start()
+    cache_dir = tempfile.mkdtemp(prefix="rfp-offline-bench-")
+
+    # Before the agents are imported: the client, caches and pipeline
+    # read these at import / first use
+    os.environ.update({
+        "RFP_LLM_BASE_URL": server.base_url,
+        "RFP_LLM_CACHE_PATH": os.path.join(cache_dir, "llm_cache.sqlite"),
+        "RFP_STAGE_CACHE_DIR": os.path.join(cache_dir, "stages"),
+        "RFP_LLM_STREAM": "1" if args.stream else "0",
+    })
+    if args.no_stage_cache:
+        os.environ["RFP_STAGE_CACHE"] = "0"
+
+    docs = [doc for doc in args.docs for _ in range(args.repeat)]
+    print(f"🧪 Gemini stand-in on {server.base_url}, cache dir {cache_dir}")
+
+    reports = []
+    try:
+        for label in ("cold", "warm"):
+            report = run_pass(label, docs, args.concurrency, server.standin)
+            print_report(report)
+            reports.append(report)
+    finally:
+        server.stop()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "passes": reports}, f, indent=2)
+
+    sys.exit(1 if any(r["failed"] for r in reports) else 0)
@@ -0,0 +1,139 @@
+# backend/services/pdf_utils.py
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import fitz  # PyMuPDF
+
+# -------------------------------------------------
+# CONSTANTS
+# -------------------------------------------------
+PAGES_PER_TASK = 16
+# Below this size a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 48
+# Total across all concurrent jobs: one shared pool of this size
+DEFAULT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+# -------------------------------------------------
+# PAGE EXTRACTION
+# -------------------------------------------------
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[Dict[str, Any]]:
+    """Worker: extract pages [start, stop). Opens its own document handle."""
+    pages = []
+    with fitz.open(pdf_path) as doc:
+        for page_number in range(start, stop):
+            t0 = time.perf_counter()
+            text = doc[page_number].get_text("text")
+            pages.append({
+                "page_number": page_number + 1,
+                "text": text,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+            })
+    return pages
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by every extraction, created on first use so
+    workers (and their PyMuPDF import) are spawned once per process,
+    not once per document.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: safe when called from the API's worker threads
+            _pool = ProcessPoolExecutor(
+                max_workers=DEFAULT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def page_count(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def iter_pages(
+    pdf_path: str,
+    workers: Optional[int] = None,
+    pages_per_task: int = PAGES_PER_TASK,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield pages in document order as
+    {"page_number", "text", "elapsed_ms"}.
+
+    Large documents are split into page ranges and parsed on the
+    shared process pool; ranges are yielded as soon as they (and every
+    range before them) are done, so callers can start chunking
+    before the whole document is parsed. `workers=1` parses in the
+    calling process.
+    """
+    pdf_path = str(pdf_path)
+    workers = DEFAULT_WORKERS if workers is None else workers
+    total = page_count(pdf_path)
+
+    if workers <= 1 or total < PARALLEL_MIN_PAGES:
+        for start in range(0, total, pages_per_task):
+            yield from _extract_page_range(pdf_path, start, min(start + pages_per_task, total))
+        return
+
+    futures = [
+        _get_pool().submit(_extract_page_range, pdf_path, start, min(start + pages_per_task, total))
+        for start in range(0, total, pages_per_task)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Caller stopped early: drop this document's queued ranges only
+        for future in futures:
+            future.cancel()
+
+
+def parse_document(pdf_path: str) -> List[Dict[str, Any]]:
+    """All pages of one PDF, parsed in the calling process (pool worker)."""
+    return list(iter_pages(pdf_path, workers=1))
+
+
+def extract_text(pdf_path: str, workers: Optional[int] = None) -> str:
+    """Full document text, one page per line block (joined once)."""
+    return "\n".join(
+        page["text"] for page in iter_pages(pdf_path, workers=workers)
+    ).strip()
+
+
+# -------------------------------------------------
+# TIMING REPORT
+# -------------------------------------------------
+def timing_report(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarize per-page extraction timings."""
+    if not pages:
+        return {"pages": 0, "total_ms": 0.0, "avg_ms": 0.0, "slowest_page": None}
+
+    slowest = max(pages, key=lambda p: p["elapsed_ms"])
+    total_ms = sum(p["elapsed_ms"] for p in pages)
+    return {
+        "pages": len(pages),
+        "total_ms": round(total_ms, 3),
+        "avg_ms": round(total_ms / len(pages), 3),
+        "slowest_page": slowest["page_number"],
+        "slowest_ms": slowest["elapsed_ms"],
+    }
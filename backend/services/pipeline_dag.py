@@ -0,0 +1,389 @@
+# backend/services/pipeline_dag.py
+#
+# Incremental pipeline: stages form a DAG over named artifacts, and
+# each stage output is stored under a fingerprint of
+#   - the content of its input artifacts
+#   - the source files of the code it runs
+#   - the prompt / schema files it reads
+#   - any extra version string (e.g. the OEM catalog version)
+# A stage re-runs only when its fingerprint changes; otherwise the
+# stored output is reused. Editing the pricing prompt therefore re-runs
+# pricing only, and a catalog change re-runs scoring (and downstream
+# stages only if the scoring output actually changed).
+#
+# Stages start as soon as their inputs exist, so independent stages
+# (e.g. two LLM calls on the same extracted RFP) run concurrently.
+
+import contextvars
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+STAGE_CACHE_ENABLED = os.getenv("RFP_STAGE_CACHE", "1").lower() not in ("0", "false", "off")
+STAGE_CACHE_DIR = Path(os.getenv("RFP_STAGE_CACHE_DIR", str(PROJECT_ROOT / ".cache" / "stages")))
+# Stored outputs kept per stage (oldest dropped first)
+STAGE_CACHE_MAX_ENTRIES = int(os.getenv("RFP_STAGE_CACHE_MAX_ENTRIES", "200"))
+# Stages of one run that may execute at the same time
+STAGE_CONCURRENCY = int(os.getenv("RFP_STAGE_CONCURRENCY", "4"))
+
+
+# Reasons the running stage's output must not be stored. A context
+# variable, so threads a stage starts with contextvars.copy_context()
+# (chunk pools, nested DAGs) report to the same stage
+_incomplete: contextvars.ContextVar = contextvars.ContextVar("rfp_stage_incomplete", default=None)
+
+
+def mark_incomplete(reason: str) -> None:
+    """
+    Called from inside a running stage (e.g. services.llm_cache on a
+    truncated LLM response): the output is used for this run but not
+    stored, so the next run computes it again. Neither are the stages
+    downstream of it in the same run.
+    """
+    reasons = _incomplete.get()
+    if reasons is not None:
+        reasons.append(reason)
+
+
+# -------------------------------------------------
+# HASHING
+# -------------------------------------------------
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_artifact(value: Any) -> str:
+    """Content hash of an artifact (files by their bytes, the rest as canonical JSON)."""
+    if isinstance(value, Path):
+        return _sha(value.read_bytes())
+    if isinstance(value, bytes):
+        return _sha(value)
+    return _sha(json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+_file_hashes: Dict[Path, tuple] = {}
+
+
+def hash_file(path: Path) -> str:
+    """File content hash, memoized on (mtime, size)."""
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return "missing"
+
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_hashes.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, _sha(path.read_bytes()))
+        _file_hashes[path] = cached
+    return cached[1]
+
+
+def code_version(modules: Iterable[str]) -> str:
+    """Hash of the source files of `modules` (dotted names)."""
+    digest = hashlib.sha256()
+    for name in sorted(modules):
+        source = inspect.getsourcefile(importlib.import_module(name))
+        digest.update(name.encode("utf-8"))
+        digest.update(hash_file(Path(source)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _display_path(path: Path) -> str:
+    # Project-relative, so fingerprints survive moving the checkout
+    try:
+        return str(path.resolve().relative_to(PROJECT_ROOT))
+    except ValueError:
+        return str(path)
+
+
+# -------------------------------------------------
+# STAGE
+# -------------------------------------------------
+class Stage:
+    """
+    One pipeline step producing the artifact `name`.
+
+    `fn` is called with the input artifacts as keyword arguments.
+    `code` lists the modules whose source defines the stage's behaviour,
+    `files` the prompt / schema files it reads, and `version` an
+    optional callable for anything else (evaluated per run).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        inputs: List[str],
+        code: Iterable[str] = (),
+        files: Iterable[Path] = (),
+        version: Optional[Callable[[], str]] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.code = list(code)
+        self.files = [Path(f) for f in files]
+        self.version = version
+
+    def static_parts(self) -> Dict[str, Any]:
+        """Everything but the inputs: code, files and extra version."""
+        return {
+            "stage": self.name,
+            "code": code_version(self.code),
+            "files": {_display_path(f): hash_file(f) for f in self.files},
+            "version": self.version() if self.version else None,
+        }
+
+    def fingerprint(self, input_hashes: Dict[str, str]) -> str:
+        parts = self.static_parts()
+        parts["inputs"] = {name: input_hashes[name] for name in self.inputs}
+        return hash_artifact(parts)
+
+
+# -------------------------------------------------
+# OUTPUT STORE
+# -------------------------------------------------
+class StageStore:
+    """Stage outputs on disk: <dir>/<stage>/<fingerprint>.json."""
+
+    def __init__(self, root: Path = STAGE_CACHE_DIR, max_entries: int = STAGE_CACHE_MAX_ENTRIES):
+        self.root = Path(root)
+        self.max_entries = max_entries
+
+    def _path(self, stage: str, fingerprint: str) -> Path:
+        return self.root / stage / f"{fingerprint}.json"
+
+    def get(self, stage: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        path = self._path(stage, fingerprint)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # Touch so pruning drops the least recently used entries
+        os.utime(path)
+        return entry
+
+    def put(self, stage: str, fingerprint: str, value: Any) -> None:
+        path = self._path(stage, fingerprint)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stage": stage, "created_at": time.time(), "value": value}, f)
+        tmp_path.replace(path)
+        self._prune(path.parent)
+
+    def _prune(self, stage_dir: Path) -> None:
+        entries = sorted(stage_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in entries[:max(0, len(entries) - self.max_entries)]:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for path in self.root.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+
+# -------------------------------------------------
+# DAG RUNNER
+# -------------------------------------------------
+class PipelineDAG:
+    """
+    Runs stages as soon as their inputs are ready: independent stages
+    (e.g. the scope-of-supply and spec-normalization LLM calls) run
+    concurrently on a thread pool, so latency follows the longest
+    dependency chain rather than the sum of all stages.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        store: Optional[StageStore] = None,
+        enabled: bool = STAGE_CACHE_ENABLED,
+        max_workers: int = STAGE_CONCURRENCY,
+    ):
+        self.stages = {stage.name: stage for stage in stages}
+        self.store = store or StageStore()
+        self.enabled = enabled
+        self.max_workers = max(1, max_workers)
+
+    def version(self) -> str:
+        """
+        Hash of every stage's code, files and extra version: two runs on
+        the same initial artifacts with the same version produce the
+        same outputs (up to LLM nondeterminism).
+        """
+        return hash_artifact([
+            self.stages[name].static_parts() for name in sorted(self.stages)
+        ])
+
+    def stored_output(self, name: str, artifacts: Dict[str, Any]) -> Optional[Any]:
+        """Stored output of stage `name` for these input artifacts, if any."""
+        if not self.enabled:
+            return None
+        stage = self.stages[name]
+        fingerprint = stage.fingerprint({i: hash_artifact(artifacts[i]) for i in stage.inputs})
+        entry = self.store.get(name, fingerprint)
+        return entry["value"] if entry is not None else None
+
+    def needed(self, targets: Iterable[str], available: Iterable[str] = ()) -> set:
+        """Names of the stages `targets` depend on (themselves included), short of `available`."""
+        ready = set(available)
+        names: set = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in ready or name in names:
+                continue
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            names.add(name)
+            stack.extend(self.stages[name].inputs)
+        return names
+
+    def order(self, available: Iterable[str], targets: Optional[Iterable[str]] = None) -> List[Stage]:
+        """
+        Stages in dependency order (inputs before consumers). Stages
+        whose artifact is already available are not run, and with
+        `targets` only the stages those artifacts depend on are.
+        """
+        ready = set(available)
+        wanted = self.needed(targets, ready) if targets is not None else set(self.stages)
+        pending = [s for s in self.stages.values() if s.name not in ready and s.name in wanted]
+        ordered: List[Stage] = []
+
+        while pending:
+            runnable = [s for s in pending if all(i in ready for i in s.inputs)]
+            if not runnable:
+                missing = {i for s in pending for i in s.inputs if i not in ready}
+                raise ValueError(f"Unsatisfiable stage inputs: {sorted(missing)}")
+            for stage in runnable:
+                ordered.append(stage)
+                ready.add(stage.name)
+                pending.remove(stage)
+        return ordered
+
+    def run(
+        self,
+        initial: Dict[str, Any],
+        on_stage: Optional[Callable[[str], None]] = None,
+        on_result: Optional[Callable[[str, Any, bool], None]] = None,
+        targets: Optional[Iterable[str]] = None,
+        incomplete: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Run (or reuse) every stage, or with `targets` only the stages
+        those artifacts need (e.g. one step of services.batch, with the
+        earlier artifacts in `initial`). Returns all artifacts plus
+        "_stages": [{"stage", "fingerprint", "cached", "incomplete",
+        "started_s", "elapsed_s"}] in completion order.
+
+        A stage that calls mark_incomplete, or has an incomplete input
+        (including the `incomplete` names among `initial`), is neither
+        stored nor reused from the store.
+
+        `on_stage(stage)` is called (from a worker thread) as each
+        computed stage starts; `on_result(stage, value, cached)` as soon
+        as each stage output is available, so callers can stream
+        partial results.
+        """
+        report = on_stage or (lambda stage: None)
+        artifacts = dict(initial)
+        hashes = {name: hash_artifact(value) for name, value in initial.items()}
+        unstored = set(incomplete)
+        stage_log = []
+        run_started = time.perf_counter()
+
+        def finish(
+            stage: Stage, fingerprint: str, value: Any, cached: bool, t0: float, partial: bool = False,
+        ) -> None:
+            artifacts[stage.name] = value
+            hashes[stage.name] = hash_artifact(value)
+            stage_log.append({
+                "stage": stage.name,
+                "fingerprint": fingerprint[:16],
+                "cached": cached,
+                "incomplete": partial,
+                "started_s": round(t0 - run_started, 3),
+                "elapsed_s": round(time.perf_counter() - t0, 3),
+            })
+            if on_result is not None:
+                on_result(stage.name, value, cached)
+
+        def compute(stage: Stage, inputs: Dict[str, Any]) -> tuple:
+            report(stage.name)
+            # Set when this DAG runs inside another DAG's stage
+            enclosing = _incomplete.get()
+            reasons: List[str] = []
+            token = _incomplete.set(reasons)
+            try:
+                return stage.fn(**inputs), reasons
+            finally:
+                _incomplete.reset(token)
+                if enclosing is not None:
+                    enclosing.extend(reasons)
+
+        pending = self.order(artifacts, targets)
+        running: Dict[Future, tuple] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rfp-stage") as pool:
+            try:
+                while pending or running:
+                    # Start every stage whose inputs are ready; reused
+                    # outputs may unblock further stages right away
+                    ready = [s for s in pending if all(i in artifacts for i in s.inputs)]
+                    while ready:
+                        for stage in ready:
+                            pending.remove(stage)
+                            t0 = time.perf_counter()
+                            fingerprint = stage.fingerprint(hashes)
+                            reusable = self.enabled and not unstored.intersection(stage.inputs)
+
+                            entry = self.store.get(stage.name, fingerprint) if reusable else None
+                            if entry is not None:
+                                print(f"♻️ {stage.name}: unchanged, reusing stored output")
+                                finish(stage, fingerprint, entry["value"], True, t0)
+                            else:
+                                inputs = {name: artifacts[name] for name in stage.inputs}
+                                # Copied context: mark_incomplete from the stage
+                                # reaches an enclosing DAG's stage too
+                                future = pool.submit(contextvars.copy_context().run, compute, stage, inputs)
+                                running[future] = (stage, fingerprint, t0)
+                        ready = [s for s in pending if all(i in artifacts for i in s.inputs)]
+
+                    if not running:
+                        continue
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage, fingerprint, t0 = running.pop(future)
+                        value, reasons = future.result()
+                        upstream = sorted(unstored.intersection(stage.inputs))
+                        if upstream:
+                            reasons = [*reasons, f"input {', '.join(upstream)} not stored"]
+                        if reasons:
+                            print(f"⚠️ {stage.name}: not stored ({'; '.join(reasons)})")
+                            unstored.add(stage.name)
+                        elif self.enabled:
+                            self.store.put(stage.name, fingerprint, value)
+                        finish(stage, fingerprint, value, False, t0, partial=bool(reasons))
+            except BaseException:
+                # Don't start anything else; running stages finish on exit
+                for future in running:
+                    future.cancel()
+                raise
+
+        artifacts["_stages"] = stage_log
+        return artifacts
@@ -0,0 +1,172 @@
+# backend/services/prompt_builder.py
+#
+# One prompt-building layer for every agent.
+#
+#   - JSON is embedded compactly (no indentation / spaces after
+#     separators): whitespace was a large share of the prompt tokens
+#   - Dynamic JSON (extracted RFP, summaries, agent output) is pruned
+#     of null / empty fields before embedding
+#   - Static parts (instructions + schemas) are rendered once per
+#     template and reused until the template or schema object changes
+#   - Every rendered prompt is recorded per stage (characters and
+#     estimated tokens), see prompt_stats() / GET /llm-prompts/stats
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.chunker import estimate_tokens
+
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+
+
+# -------------------------------------------------
+# SERIALIZATION
+# -------------------------------------------------
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def prune_empty(value: Any) -> Any:
+    """Drop None / "" / [] / {} recursively (0 and False are kept)."""
+    if isinstance(value, dict):
+        pruned = {k: prune_empty(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if not _is_empty(v)}
+    if isinstance(value, list):
+        pruned = [prune_empty(v) for v in value]
+        return [v for v in pruned if not _is_empty(v)]
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def embed(value: Any, prune: bool = True) -> str:
+    """Text for a placeholder: strings as-is, everything else as compact JSON."""
+    if isinstance(value, str):
+        return value
+    return compact_json(prune_empty(value) if prune else value)
+
+
+# -------------------------------------------------
+# PROMPT SIZE ACCOUNTING
+# -------------------------------------------------
+class PromptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, stage: str, prompt: str) -> Tuple[int, int]:
+        chars, tokens = len(prompt), estimate_tokens(prompt)
+        with self._lock:
+            s = self._stages.setdefault(stage, {
+                "prompts": 0, "chars": 0, "tokens": 0, "max_chars": 0, "max_tokens": 0,
+            })
+            s["prompts"] += 1
+            s["chars"] += chars
+            s["tokens"] += tokens
+            s["max_chars"] = max(s["max_chars"], chars)
+            s["max_tokens"] = max(s["max_tokens"], tokens)
+            s["last_chars"], s["last_tokens"] = chars, tokens
+        return chars, tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                stage: {
+                    **s,
+                    "avg_chars": round(s["chars"] / s["prompts"]),
+                    "avg_tokens": round(s["tokens"] / s["prompts"]),
+                }
+                for stage, s in self._stages.items()
+            }
+        return {
+            "stages": stages,
+            "total_chars": sum(s["chars"] for s in stages.values()),
+            "total_tokens": sum(s["tokens"] for s in stages.values()),
+        }
+
+
+_stats = PromptStats()
+
+
+def prompt_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+# -------------------------------------------------
+# TEMPLATES
+# -------------------------------------------------
+class PromptTemplate:
+    """
+    Template with {{NAME}} placeholders. `static` values (schemas,
+    fixed instructions) are rendered once here; render() only fills
+    the dynamic placeholders. Unknown placeholders are left as-is.
+    """
+
+    def __init__(self, stage: str, template: str, static: Optional[Dict[str, Any]] = None):
+        self.stage = stage
+        self.template = template
+        self.static = dict(static or {})
+
+        # Pre-render: literal text with the static values filled in,
+        # split around the remaining (dynamic) placeholders
+        rendered = {name: embed(value, prune=False) for name, value in self.static.items()}
+        self._parts: List[str] = []
+        self._slots: List[str] = []
+        literal, pos = [], 0
+        for match in PLACEHOLDER_RE.finditer(template):
+            literal.append(template[pos:match.start()])
+            name = match.group(1)
+            if name in rendered:
+                literal.append(rendered[name])
+            else:
+                self._parts.append("".join(literal))
+                self._slots.append(name)
+                literal = []
+            pos = match.end()
+        literal.append(template[pos:])
+        self._parts.append("".join(literal))
+
+    @property
+    def placeholders(self) -> List[str]:
+        return list(self._slots)
+
+    def render(self, prune: bool = True, **values: Any) -> str:
+        """Fill the dynamic placeholders and record the prompt's size."""
+        out = [self._parts[0]]
+        for name, part in zip(self._slots, self._parts[1:]):
+            out.append(embed(values[name], prune=prune) if name in values else "{{" + name + "}}")
+            out.append(part)
+        prompt = "".join(out)
+
+        chars, tokens = _stats.record(self.stage, prompt)
+        print(f"📏 {self.stage} prompt: {chars} chars, ~{tokens} tokens")
+        return prompt
+
+
+_templates: Dict[str, PromptTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(stage: str, template: str, **static: Any) -> PromptTemplate:
+    """
+    Pre-rendered template for `stage`, reused while the template text
+    and the static objects are unchanged (schemas from
+    services.resources stay the same object until the file changes).
+    """
+    cached = _templates.get(stage)
+    if (
+        cached is not None
+        and cached.template == template
+        and cached.static.keys() == static.keys()
+        and all(cached.static[k] is v for k, v in static.items())
+    ):
+        return cached
+
+    built = PromptTemplate(stage, template, static)
+    with _templates_lock:
+        _templates[stage] = built
+    return built
@@ -0,0 +1,345 @@
+# backend/services/rate_limiter.py
+#
+# Process-wide adaptive rate limiting for Gemini calls.
+#
+#   - Token bucket: caps the request rate (RFP_LLM_RPM, burst
+#     RFP_LLM_BURST). With RFP_LLM_RATE_FILE set, the bucket lives in
+#     a file guarded by an exclusive lock (POSIX), so every worker
+#     process on the host draws from the same quota.
+#   - AIMD concurrency: the number of in-flight calls grows by one per
+#     "window" of successes and halves on 429 / 503, so throughput
+#     settles just under the quota ceiling.
+#   - Retries: exponential backoff with full jitter; a Retry-After
+#     header (or the RetryInfo delay in the error body) pauses the
+#     whole bucket, so callers do not all retry at the same moment.
+#
+# Sync callers use limiter.call(fn); asyncio callers use
+# `await limiter.acall(coro_fn)`, which never blocks the event loop.
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # Windows: per-process bucket only
+    fcntl = None
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+REQUESTS_PER_MINUTE = float(os.getenv("RFP_LLM_RPM", "600"))  # 0 = no rate cap
+BURST = int(os.getenv("RFP_LLM_BURST", "10"))
+RATE_FILE = os.getenv("RFP_LLM_RATE_FILE")  # shared bucket across processes
+
+INITIAL_CONCURRENCY = float(os.getenv("RFP_LLM_INITIAL_CONCURRENCY", "4"))
+MIN_CONCURRENCY = float(os.getenv("RFP_LLM_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = float(os.getenv("RFP_LLM_MAX_CONCURRENCY", "16"))
+DECREASE_FACTOR = 0.5
+
+MAX_RETRIES = int(os.getenv("RFP_LLM_MAX_RETRIES", "5"))
+BACKOFF_BASE_S = float(os.getenv("RFP_LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_CAP_S = float(os.getenv("RFP_LLM_BACKOFF_CAP", "60"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+_RETRY_DELAY_RE = re.compile(r"'retryDelay':\s*'([\d.]+)s'|\"retryDelay\":\s*\"([\d.]+)s\"")
+
+
+# -------------------------------------------------
+# TOKEN BUCKET
+# -------------------------------------------------
+class TokenBucket:
+    """
+    Reservation-style bucket: reserve() always takes a token (the
+    balance may go negative) and returns how long the caller has to
+    wait before using it, so the same bucket serves sync and async
+    callers. pause(until) holds every reservation until `until`.
+    """
+
+    def __init__(self, rate_per_s: float, burst: int, state_file: Optional[str] = None):
+        self.rate = rate_per_s
+        self.burst = max(1, burst)
+        self.state_file = Path(state_file) if state_file and fcntl is not None else None
+        self._lock = threading.Lock()
+        self._state = {"tokens": float(self.burst), "last": time.time(), "pause_until": 0.0}
+
+    def _update(self, fn: Callable[[Dict[str, float], float], float]) -> float:
+        with self._lock:
+            if self.state_file is None:
+                return fn(self._state, time.time())
+
+            # Shared state: read-modify-write under an exclusive file lock
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_file, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = {**self._state, **json.loads(f.read() or "{}")}
+                    except ValueError:
+                        state = dict(self._state)
+                    result = fn(state, time.time())
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            return result
+
+    def reserve(self) -> float:
+        """Take one token; returns the wait (seconds) before it may be used."""
+        def take(state, now):
+            wait = max(0.0, state["pause_until"] - now)
+            if self.rate <= 0:
+                return wait
+            state["tokens"] = min(self.burst, state["tokens"] + (now - state["last"]) * self.rate)
+            state["last"] = now
+            state["tokens"] -= 1
+            if state["tokens"] < 0:
+                wait = max(wait, -state["tokens"] / self.rate)
+            return wait
+
+        return self._update(take)
+
+    def pause(self, until: float) -> None:
+        def extend(state, now):
+            state["pause_until"] = max(state["pause_until"], until)
+            return 0.0
+
+        self._update(extend)
+
+
+# -------------------------------------------------
+# AIMD CONCURRENCY
+# -------------------------------------------------
+class AIMDConcurrency:
+    """
+    In-flight call limit: +1 per `limit` successes, x0.5 on throttling.
+
+    acquire() returns a ticket (the current window). Only a throttled
+    call that started after the last decrease shrinks the limit again,
+    so a burst of 429s from calls already in flight counts as one
+    congestion signal (as in TCP).
+    """
+
+    def __init__(
+        self,
+        initial: float = INITIAL_CONCURRENCY,
+        minimum: float = MIN_CONCURRENCY,
+        maximum: float = MAX_CONCURRENCY,
+    ):
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.inflight = 0
+        self._window = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> Optional[int]:
+        with self._cond:
+            if self.inflight < int(self.limit):
+                self.inflight += 1
+                return self._window
+            return None
+
+    def acquire(self) -> int:
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+            return self._window
+
+    async def acquire_async(self, poll_s: float = 0.05) -> int:
+        while True:
+            ticket = self.try_acquire()
+            if ticket is not None:
+                return ticket
+            await asyncio.sleep(poll_s)
+
+    def release(self, ticket: int, throttled: bool = False, completed: bool = True) -> None:
+        """`completed=False` (cancelled call): free the slot, leave the limit as is."""
+        with self._cond:
+            self.inflight -= 1
+            if throttled:
+                if ticket == self._window:
+                    self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+                    self._window += 1
+            elif completed:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+# -------------------------------------------------
+# ERROR CLASSIFICATION
+# -------------------------------------------------
+def _retry_after(error: Exception) -> Optional[float]:
+    """Server-requested delay: Retry-After header, else Gemini RetryInfo."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+
+    match = _RETRY_DELAY_RE.search(str(getattr(error, "details", "") or ""))
+    if match:
+        return float(match.group(1) or match.group(2))
+    return None
+
+
+def classify(error: Exception) -> Tuple[bool, bool, Optional[float]]:
+    """(retryable, throttled, retry_after seconds) for a failed call."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS, code in THROTTLE_STATUS, _retry_after(error)
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+        return True, False, None
+    return False, False, None
+
+
+# -------------------------------------------------
+# LIMITER
+# -------------------------------------------------
+class RateLimiter:
+    def __init__(
+        self,
+        bucket: Optional[TokenBucket] = None,
+        concurrency: Optional[AIMDConcurrency] = None,
+        max_retries: int = MAX_RETRIES,
+        backoff_base_s: float = BACKOFF_BASE_S,
+        backoff_cap_s: float = BACKOFF_CAP_S,
+    ):
+        self.bucket = bucket or TokenBucket(REQUESTS_PER_MINUTE / 60.0, BURST, RATE_FILE)
+        self.concurrency = concurrency or AIMDConcurrency()
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_cap_s = backoff_cap_s
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "throttled": 0, "failed": 0}
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            # Honour the server's delay; jitter spreads the wake-ups
+            return retry_after + random.uniform(0, self.backoff_base_s)
+        # Full jitter
+        return random.uniform(0, min(self.backoff_cap_s, self.backoff_base_s * 2 ** attempt))
+
+    def _on_error(self, error: Exception, ticket: int, attempt: int) -> Optional[float]:
+        """Release the slot; returns the retry delay, or None to give up."""
+        retryable, throttled, retry_after = classify(error)
+        self.concurrency.release(ticket, throttled=throttled)
+        if throttled:
+            self._count("throttled")
+
+        if not retryable or attempt >= self.max_retries:
+            self._count("failed")
+            return None
+
+        delay = self.backoff(attempt, retry_after)
+        if retry_after is not None:
+            self.bucket.pause(time.time() + retry_after)
+        self._count("retries")
+        print(
+            f"⚠️ Gemini {getattr(error, 'code', type(error).__name__)}: "
+            f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s "
+            f"(concurrency limit {self.concurrency.limit:.1f})"
+        )
+        return delay
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run `fn` under the limits, retrying throttled / transient failures."""
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            ticket = self.concurrency.acquire()
+            try:
+                wait = self.bucket.reserve()
+                if wait > 0:
+                    time.sleep(wait)
+                result = fn()
+            except Exception as e:
+                delay = self._on_error(e, ticket, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # KeyboardInterrupt / SystemExit: the slot must not leak
+                self.concurrency.release(ticket, completed=False)
+                raise
+
+            self.concurrency.release(ticket)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of call(): waits with asyncio.sleep only."""
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            ticket = await self.concurrency.acquire_async()
+            try:
+                wait = self.bucket.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                result = await fn()
+            except Exception as e:
+                delay = self._on_error(e, ticket, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # CancelledError (task cancelled, wait_for timeout): the
+                # slot must not leak, or the limiter deadlocks for everyone
+                self.concurrency.release(ticket, completed=False)
+                raise
+
+            self.concurrency.release(ticket)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "inflight": self.concurrency.inflight,
+            "requests_per_minute": REQUESTS_PER_MINUTE,
+            "shared_bucket": self.bucket.state_file is not None,
+        })
+        return stats
+
+
+# -------------------------------------------------
+# PROCESS-WIDE LIMITER
+# -------------------------------------------------
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,68 @@
+# backend/services/resources.py
+#
+# Prompt / schema files, read once and kept in memory.
+#
+# Entries are keyed on the file's (mtime, size), so an edited prompt
+# is picked up on the next read without a restart. Returned JSON
+# objects are shared: treat them as read-only.
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PROMPT_DIR = PROJECT_ROOT / "prompts"
+SCHEMA_DIR = PROJECT_ROOT / "schemas"
+
+_cache: Dict[Tuple[Path, str], Tuple[tuple, Any]] = {}
+_lock = threading.Lock()
+
+
+def _load(path: Path, kind: str) -> Any:
+    path = Path(path).resolve()
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _cache.get((path, kind))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        value = json.load(f) if kind == "json" else f.read()
+    with _lock:
+        _cache[(path, kind)] = (stamp, value)
+    return value
+
+
+def read_text(path: Path) -> str:
+    return _load(path, "text")
+
+
+def read_json(path: Path) -> Any:
+    return _load(path, "json")
+
+
+def prompt(name: str) -> str:
+    """prompts/<name>"""
+    return read_text(PROMPT_DIR / name)
+
+
+def schema(name: str) -> Any:
+    """schemas/<name> (parsed)"""
+    return read_json(SCHEMA_DIR / name)
+
+
+def preload(dirs: Iterable[Path] = (PROMPT_DIR, SCHEMA_DIR)) -> int:
+    """Read every prompt (*.txt) and schema (*.json) file. Returns the count."""
+    count = 0
+    for directory in dirs:
+        for path in sorted(Path(directory).iterdir()):
+            if path.suffix == ".json":
+                read_json(path)
+            elif path.suffix == ".txt":
+                read_text(path)
+            else:
+                continue
+            count += 1
+    return count
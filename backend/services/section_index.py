@@ -0,0 +1,219 @@
+# backend/services/section_index.py
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Set, Tuple, Union
+
+from services.chunker import estimate_tokens, is_heading, split_blocks
+
+# -------------------------------------------------
+# CONSTANTS
+# -------------------------------------------------
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_SECTION_TOKENS = 800
+# A heading only opens a new section once the current one holds this
+# much: clause labels and their table values stay in one section
+MIN_SECTION_TOKENS = 150
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "shall", "should", "the", "this", "to",
+    "will", "with", "all", "any", "be", "been", "which", "such", "per",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        w for w in _WORD_RE.findall(text.lower())
+        if w not in STOPWORDS and len(w) > 1
+    ]
+
+
+# -------------------------------------------------
+# SECTION BUILDING
+# -------------------------------------------------
+def _running_lines(pages: List[Tuple[int, str]], top_lines: int = 4) -> Set[str]:
+    """Page header lines repeated on most pages ("REQUEST FOR PROPOSAL")."""
+    if len(pages) < 3:
+        return set()
+    counts: Counter = Counter()
+    for _, text in pages:
+        top = [line.strip() for line in text.splitlines() if line.strip()][:top_lines]
+        counts.update(set(top))
+    return {line for line, n in counts.items() if n >= len(pages) / 2}
+
+
+def build_sections(
+    pages: Iterable[Union[str, Dict[str, Any]]],
+    max_section_tokens: int = MAX_SECTION_TOKENS,
+    min_section_tokens: int = MIN_SECTION_TOKENS,
+) -> List[Dict[str, Any]]:
+    """
+    Group page blocks into sections: a heading opens a new section
+    (once the current one has `min_section_tokens`), and a section is
+    closed once it reaches `max_section_tokens`. Running page headers
+    are not headings.
+
+    Returns [{"section_id", "page_number", "text", "tokens", "continued"}]
+    in document order; `continued` marks a section that carries on the
+    previous one (size split or page break, no heading of its own).
+    """
+    page_texts: List[Tuple[int, str]] = []
+    for page_index, page in enumerate(pages, start=1):
+        if isinstance(page, dict):
+            page_texts.append((page.get("page_number", page_index), page["text"]))
+        else:
+            page_texts.append((page_index, page))
+    running = _running_lines(page_texts)
+
+    sections: List[Dict[str, Any]] = []
+    current: List[str] = []
+    current_tokens = 0
+    current_page = 1
+    continued = False
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            sections.append({
+                "section_id": len(sections),
+                "page_number": current_page,
+                "text": "\n".join(current),
+                "tokens": current_tokens,
+                "continued": continued,
+            })
+        current, current_tokens = [], 0
+
+    for page_number, page_text in page_texts:
+        for block in split_blocks(page_text):
+            block_tokens = estimate_tokens(block)
+            first_line = block.splitlines()[0]
+            starts_section = is_heading(first_line) and first_line.strip() not in running
+
+            if current and (
+                (starts_section and current_tokens >= min_section_tokens)
+                or current_tokens + block_tokens > max_section_tokens
+            ):
+                flush()
+                continued = not starts_section
+
+            if not current:
+                current_page = page_number
+            current.append(block)
+            current_tokens += block_tokens
+
+    flush()
+    return sections
+
+
+# -------------------------------------------------
+# BM25 INDEX
+# -------------------------------------------------
+class SectionIndex:
+    """
+    In-memory BM25 index over document sections.
+    """
+
+    def __init__(self, sections: List[Dict[str, Any]]):
+        self.sections = sections
+        self.term_freqs = [Counter(tokenize(s["text"])) for s in sections]
+        self.doc_lens = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_len = (sum(self.doc_lens) / len(self.doc_lens)) if sections else 0.0
+
+        doc_freq: Counter = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+
+        n = len(sections)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Union[str, Dict[str, Any]]]) -> "SectionIndex":
+        return cls(build_sections(pages))
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(s["tokens"] for s in self.sections)
+
+    def score(self, query: str) -> List[float]:
+        terms = set(tokenize(query))
+        scores = []
+        for tf, doc_len in zip(self.term_freqs, self.doc_lens):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / (self.avg_len or 1))
+            s = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    s += self.idf[term] * freq * (BM25_K1 + 1) / (freq + norm)
+            scores.append(s)
+        return scores
+
+    def _with_continuations(self, section: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """A section plus the sections that carry it on (its table rows)."""
+        group = [section]
+        for following in self.sections[section["section_id"] + 1:]:
+            if not following.get("continued"):
+                break
+            group.append(following)
+        return group
+
+    def select(
+        self,
+        queries: Dict[str, str],
+        token_budget: int,
+        always_include: int = 1,
+        required: Iterable[int] = (),
+    ) -> List[Dict[str, Any]]:
+        """
+        Sections relevant to any of `queries` within one total
+        `token_budget`, returned in document order.
+
+        The first `always_include` sections (usually the tender
+        metadata) and the `required` section ids are kept whatever the
+        budget. Every other section is ranked by its best score against
+        any query, relative to that query's top score, so the best match
+        for each field comes first whether its words are rare or common;
+        ties go to sections that match more queries. Sections (with
+        their continuation sections) are then added in that order while
+        they fit the budget.
+        """
+        chosen = {s["section_id"]: s for s in self.sections[:always_include]}
+        for section_id in required:
+            for s in self._with_continuations(self.sections[section_id]):
+                chosen[s["section_id"]] = s
+        used = sum(s["tokens"] for s in chosen.values())
+
+        relative = []
+        for query in queries.values():
+            scores = self.score(query)
+            top = max(scores, default=0.0)
+            if top > 0:
+                relative.append([score / top for score in scores])
+        ranked = sorted(
+            (
+                (max(column), sum(column), section)
+                for column, section in zip(zip(*relative), self.sections)
+                if max(column) > 0
+            ),
+            key=lambda item: item[:2],
+            reverse=True,
+        )
+
+        for _, _, section in ranked:
+            if section["section_id"] in chosen:
+                continue
+            group = [s for s in self._with_continuations(section) if s["section_id"] not in chosen]
+            group_tokens = sum(s["tokens"] for s in group)
+            if used + group_tokens > token_budget:
+                continue
+            for s in group:
+                chosen[s["section_id"]] = s
+            used += group_tokens
+        return [chosen[k] for k in sorted(chosen)]
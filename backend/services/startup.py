@@ -0,0 +1,144 @@
+# backend/services/startup.py
+#
+# Startup prewarm + readiness.
+#
+# main.py imports only FastAPI and the job manager, so a worker comes up
+# quickly. The heavy pieces (PyMuPDF, google-genai, NumPy, the agents)
+# load here, together with the prompts, schemas, OEM catalog index and
+# Gemini client, before GET /ready reports the worker as ready.
+
+import importlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# -------------------------------------------------
+# CONFIG
+# -------------------------------------------------
+# 1: serve immediately and warm up in the background (GET /ready says
+# when done); 0: block application startup until warm
+PREWARM_IN_BACKGROUND = os.getenv("RFP_PREWARM_BACKGROUND", "1").lower() not in ("0", "false", "off")
+
+HEAVY_MODULES = [
+    "agents.main_agent.main_agent",
+    "agents.extractor_agent.extractor_agent",
+    "agents.technical_agent.product_recommender",
+    "services.batch",
+]
+
+
+# -------------------------------------------------
+# PREWARM STEPS
+# -------------------------------------------------
+def _import_modules() -> Dict[str, Any]:
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    return {"modules": len(HEAVY_MODULES)}
+
+
+def _load_resources() -> Dict[str, Any]:
+    from services import resources
+    return {"files": resources.preload()}
+
+
+def _load_catalog() -> Dict[str, Any]:
+    from services.catalog import get_catalog, get_catalog_service
+
+    get_catalog_service().start()
+    catalog = get_catalog()
+    # Family index is built lazily; build it now, not on the first RFP
+    catalog.recommender
+    return {"version": catalog.version, "skus": catalog.engine.n_skus}
+
+
+def _create_llm_client() -> Dict[str, Any]:
+    from services.llm_client import get_client, http2_enabled
+    get_client()
+    return {"http2": http2_enabled()}
+
+
+def _open_llm_cache() -> Dict[str, Any]:
+    from services.llm_cache import get_cache
+    get_cache()
+    return {}
+
+
+PREWARM_STEPS: List[tuple] = [
+    ("imports", _import_modules),
+    ("prompts_schemas", _load_resources),
+    ("catalog", _load_catalog),
+    ("llm_client", _create_llm_client),
+    ("llm_cache", _open_llm_cache),
+]
+
+
+# -------------------------------------------------
+# READINESS STATE
+# -------------------------------------------------
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "error": self.error,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "prewarm_s": (
+                    round(self.finished_at - self.started_at, 3)
+                    if self.started_at and self.finished_at else None
+                ),
+                "steps": list(self.steps),
+            }
+
+    def prewarm(self, steps: List[tuple] = PREWARM_STEPS) -> bool:
+        """Run every step in order. Returns readiness; errors are recorded, not raised."""
+        with self._lock:
+            self.ready, self.error, self.steps = False, None, []
+            self.started_at, self.finished_at = time.time(), None
+
+        for name, step in steps:
+            t0 = time.perf_counter()
+            try:
+                detail = step() or {}
+            except Exception as e:
+                with self._lock:
+                    self.error = f"{name}: {type(e).__name__}: {e}"
+                    self.finished_at = time.time()
+                print(f"❌ Prewarm failed at {name}: {e}")
+                return False
+
+            with self._lock:
+                self.steps.append({"step": name, "elapsed_s": round(time.perf_counter() - t0, 3), **detail})
+
+        with self._lock:
+            self.ready = True
+            self.finished_at = time.time()
+        print(f"🔥 Prewarm done in {self.finished_at - self.started_at:.2f}s")
+        return True
+
+    def start(self, background: bool = PREWARM_IN_BACKGROUND) -> None:
+        if not background:
+            self.prewarm()
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.prewarm, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+
+readiness = Readiness()
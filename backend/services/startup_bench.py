@@ -0,0 +1,162 @@
+# backend/services/startup_bench.py
+#
+# Import-time / cold-start benchmark (run from backend/):
+#
+#   python -m services.startup_bench                         # 5 fresh interpreters
+#   python -m services.startup_bench --save startup_baseline.json
+#   python -m services.startup_bench --baseline startup_baseline.json
+#
+# Every run is a new Python process, so nothing is cached in memory:
+#   - import_s:  `import main`
+#   - prewarm_s: services.startup prewarm (modules, prompts, catalog, client)
+#   - process_s: whole process wall time (interpreter start + both)
+# With --baseline, exits 1 when a median regresses by more than
+# --max-regression (fraction) plus --min-delta seconds of noise margin.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+METRICS = ["import_s", "prewarm_s", "process_s"]
+
+_CHILD = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from services.startup import readiness
+ok = readiness.prewarm()
+t2 = time.perf_counter()
+print("@@" + json.dumps({"import_s": t1 - t0, "prewarm_s": t2 - t1, "ready": ok, "error": readiness.error}))
+"""
+
+
+def _child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # Client construction needs a key, not a valid one (no network)
+    env.setdefault("GEMINI_API_KEY", "startup-bench")
+    return env
+
+
+def run_once() -> Dict[str, Any]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", _CHILD],
+        cwd=BACKEND_DIR,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+    )
+    process_s = time.perf_counter() - started
+
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("@@")]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"Benchmark child failed:\n{proc.stderr[-2000:]}")
+
+    result = json.loads(lines[-1][2:])
+    if not result["ready"]:
+        raise RuntimeError(f"Prewarm failed: {result['error']}")
+    result["process_s"] = process_s
+    return result
+
+
+def import_profile(top: int = 10) -> List[Dict[str, Any]]:
+    """
+    Modules imported directly by main, slowest first (cumulative
+    time from `python -X importtime`): what lazy imports control.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue  # header line
+        # Two spaces of indentation per nesting level
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if depth == 1:
+            rows.append({"module": raw_name.strip(), "cumulative_s": int(cumulative_us) / 1e6})
+
+    rows.sort(key=lambda r: r["cumulative_s"], reverse=True)
+    return rows[:top]
+
+
+def benchmark(runs: int = 5) -> Dict[str, Any]:
+    # One untimed run warms the OS file cache / bytecode
+    run_once()
+    samples = [run_once() for _ in range(runs)]
+
+    summary = {}
+    for metric in METRICS:
+        values = [s[metric] for s in samples]
+        summary[metric] = {
+            "median": round(statistics.median(values), 4),
+            "min": round(min(values), 4),
+            "max": round(max(values), 4),
+        }
+    return {
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "metrics": summary,
+        "slowest_imports": import_profile(),
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], max_regression: float, min_delta: float) -> List[str]:
+    """Metrics whose median regressed beyond the allowed margin."""
+    regressions = []
+    for metric in METRICS:
+        old = baseline["metrics"][metric]["median"]
+        new = result["metrics"][metric]["median"]
+        if new > old * (1 + max_regression) + min_delta:
+            regressions.append(f"{metric}: {old:.3f}s -> {new:.3f}s")
+    return regressions
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time / cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", help="Write the result JSON here (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="Compare against a saved result")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown fraction")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Noise margin in seconds")
+    args = parser.parse_args()
+
+    result = benchmark(args.runs)
+
+    print(f"⏱️ Cold start over {result['runs']} runs (Python {result['python']})")
+    for metric, s in result["metrics"].items():
+        print(f"  {metric:<10} median {s['median']:.3f}s  (min {s['min']:.3f}s, max {s['max']:.3f}s)")
+    print("  slowest imports:")
+    for row in result["slowest_imports"]:
+        print(f"    {row['cumulative_s']:.3f}s  {row['module']}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.max_regression, args.min_delta)
+        if regressions:
+            print("❌ Startup regression: " + "; ".join(regressions))
+            sys.exit(1)
+        print("✅ No startup regression vs baseline")